@@ -0,0 +1,152 @@
+"""
+Dashboard Stats Benchmark
+
+Seeds a scratch database with one large tenant and compares the old
+get_dashboard_stats (load four collections into Python, sum there) with the
+financial rollups it reads now: the first view (rebuild_rollups, server-side
+$group) and every later one (one rollup document). Reports latency, Python
+peak memory (tracemalloc) and whether the numbers agree.
+
+Needs a running MongoDB (MONGO_URL); the scratch database is dropped
+afterwards unless --keep is given.
+
+Usage (from backend/):
+    python benchmarks/bench_dashboard_stats.py --invoices 100000 --repeat 5
+"""
+
+import argparse
+import asyncio
+import math
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'benchmark')
+
+import server  # noqa: E402
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+from rollups import dashboard_stats_from_rollup, get_rollup, rebuild_rollups  # noqa: E402
+
+from bench_doc_codecs import make_invoice  # noqa: E402
+
+COMPANY_ID = "company-1"
+STATUSES = ["draft", "sent", "paid", "overdue", "cancelled"]
+
+
+async def legacy_dashboard_stats(db, company_id: str) -> dict:
+    """get_dashboard_stats as it was before the aggregation rewrite"""
+    invoices = await db.invoices.find({"company_id": company_id}, {"_id": 0}).to_list(10000)
+    bills = await db.bills.find({"company_id": company_id}, {"_id": 0}).to_list(10000)
+    customers = await db.customers.find({"company_id": company_id}, {"_id": 0}).to_list(10000)
+    vendors = await db.vendors.find({"company_id": company_id}, {"_id": 0}).to_list(10000)
+
+    total_revenue = sum(inv['total'] for inv in invoices if inv['status'] == 'paid')
+    total_expenses = sum(bill['amount'] for bill in bills if bill['status'] == 'paid')
+    outstanding_receivables = sum(inv['total'] - inv.get('paid_amount', 0) for inv in invoices if inv['status'] in ['sent', 'overdue'])
+    outstanding_payables = sum(bill['amount'] - bill.get('paid_amount', 0) for bill in bills if bill['status'] in ['sent', 'overdue'])
+
+    return {
+        "total_revenue": total_revenue,
+        "total_expenses": total_expenses,
+        "outstanding_receivables": outstanding_receivables,
+        "outstanding_payables": outstanding_payables,
+        "total_customers": len(customers),
+        "total_vendors": len(vendors),
+        "total_invoices": len(invoices),
+        "paid_invoices": len([inv for inv in invoices if inv['status'] == 'paid']),
+        "overdue_invoices": len([inv for inv in invoices if inv['status'] == 'overdue'])
+    }
+
+
+async def seed(db, invoices: int):
+    batch = []
+    for i in range(invoices):
+        doc = make_invoice(i)
+        doc["status"] = STATUSES[i % len(STATUSES)]
+        doc["paid_amount"] = 100.0 if doc["status"] == "overdue" else 0.0
+        batch.append(doc)
+        if len(batch) == 10000:
+            await db.invoices.insert_many(batch)
+            batch = []
+    if batch:
+        await db.invoices.insert_many(batch)
+
+    bills = max(1, invoices // 5)
+    await db.bills.insert_many([{
+        "id": str(uuid.uuid4()), "company_id": COMPANY_ID, "bill_number": f"BILL-{i:06d}",
+        "vendor_id": f"vendor-{i % 200}", "vendor_name": f"Vendor {i % 200}", "amount": 250.0 + i % 97,
+        "due_date": "2026-02-01T00:00:00+00:00", "status": STATUSES[i % len(STATUSES)],
+        "paid_amount": 0.0, "created_at": "2026-01-01T00:00:00+00:00", "created_by": "user-1"
+    } for i in range(bills)])
+    await db.customers.insert_many([
+        {"id": str(uuid.uuid4()), "company_id": COMPANY_ID, "name": f"Customer {i}", "email": f"c{i}@example.com"}
+        for i in range(500)
+    ])
+    await db.vendors.insert_many([
+        {"id": str(uuid.uuid4()), "company_id": COMPANY_ID, "name": f"Vendor {i}", "email": f"v{i}@example.com"}
+        for i in range(200)
+    ])
+
+
+async def measure(fn, repeat: int):
+    best = float("inf")
+    peak = 0
+    result = None
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = await fn()
+        best = min(best, time.perf_counter() - start)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return result, best, peak
+
+
+async def main(invoices: int, repeat: int, keep: bool):
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db_name = f"bench_dashboard_{uuid.uuid4().hex[:8]}"
+    db = client[db_name]
+
+    try:
+        print(f"Seeding {invoices} invoices into {db_name} ...")
+        await seed(db, invoices)
+        await server.ensure_indexes(db)
+
+        legacy, legacy_s, legacy_peak = await measure(lambda: legacy_dashboard_stats(db, COMPANY_ID), repeat)
+        _, rebuild_s, rebuild_peak = await measure(lambda: rebuild_rollups(db, COMPANY_ID), repeat)
+
+        async def read_stats():
+            return dashboard_stats_from_rollup(await get_rollup(db, COMPANY_ID))
+
+        current, current_s, current_peak = await measure(read_stats, repeat)
+
+        print(f"best of {repeat}")
+        print(f"  legacy (find + Python)  {legacy_s * 1000:9.1f} ms   peak {legacy_peak / 1e6:8.1f} MB")
+        print(f"  rollup rebuild          {rebuild_s * 1000:9.1f} ms   peak {rebuild_peak / 1e6:8.1f} MB")
+        print(f"  rollup read             {current_s * 1000:9.1f} ms   peak {current_peak / 1e6:8.1f} MB")
+        print(f"  first view x{legacy_s / rebuild_s:.1f} faster, later views x{legacy_s / current_s:.0f} faster")
+
+        if invoices > 10000:
+            print("  note: legacy stops at 10,000 documents per collection, so its numbers are truncated")
+        for key in current:
+            same = math.isclose(legacy[key], current[key], rel_tol=1e-9, abs_tol=0.005)
+            print(f"  {key:25s} legacy {legacy[key]:>16,.2f}  rollup {current[key]:>16,.2f}"
+                  f"{'' if same else '   DIFFERS'}")
+    finally:
+        if not keep:
+            await client.drop_database(db_name)
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--invoices", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch database")
+    args = parser.parse_args()
+    asyncio.run(main(args.invoices, args.repeat, args.keep))
@@ -0,0 +1,118 @@
+"""
+Document Codec Micro-benchmark
+
+Compares the generic serialize_doc / deserialize_doc walkers with the
+per-model DocCodec instances on the documents the hot list endpoints return
+(GST period invoices, invoices with line items).
+
+Usage (from backend/):
+    python benchmarks/bench_doc_codecs.py --rows 10000 --repeat 5
+"""
+
+import argparse
+import copy
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# server.py reads these at import; the Motor client connects lazily so no DB is needed
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'benchmark')
+
+import server  # noqa: E402
+
+
+def make_gst_invoice(i: int) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "company_id": "company-1",
+        "gstin": "27AABCU9603R1ZM",
+        "period": "01-2026",
+        "invoice_number": f"INV-{i:06d}",
+        "invoice_date": "2026-01-15",
+        "document_type": "invoice",
+        "supply_type": "intra",
+        "invoice_type": "B2C_SMALL",
+        "recipient_gstin": None,
+        "recipient_name": f"Customer {i % 500}",
+        "place_of_supply": "27",
+        "taxable_value": 1000.0 + i,
+        "gst_rate": 18,
+        "cgst": (1000.0 + i) * 0.09,
+        "sgst": (1000.0 + i) * 0.09,
+        "igst": 0.0,
+        "cess": 0.0,
+        "total_value": (1000.0 + i) * 1.18,
+        "hsn_sac": "9983",
+        "created_at": (datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=i)).isoformat()
+    }
+
+
+def make_invoice(i: int) -> dict:
+    now = datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=i)
+    return {
+        "id": str(uuid.uuid4()),
+        "company_id": "company-1",
+        "invoice_number": f"INV-{i:06d}",
+        "customer_id": f"cust-{i % 500}",
+        "customer_name": f"Customer {i % 500}",
+        "items": [
+            {"description": f"Item {n}", "quantity": 2, "unit_price": 50.0, "amount": 100.0}
+            for n in range(5)
+        ],
+        "subtotal": 500.0,
+        "tax": 90.0,
+        "total": 590.0,
+        "status": "sent",
+        "issue_date": now.isoformat(),
+        "due_date": (now + timedelta(days=30)).isoformat(),
+        "paid_amount": 0.0,
+        "notes": None,
+        "ai_verified": False,
+        "ai_flags": [],
+        "created_at": now.isoformat(),
+        "created_by": "user-1"
+    }
+
+
+def timed(fn, docs, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        batch = copy.deepcopy(docs)
+        start = time.perf_counter()
+        fn(batch)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(rows: int, repeat: int):
+    cases = [
+        ("gst_invoices", [make_gst_invoice(i) for i in range(rows)], server.gst_invoice_codec),
+        ("invoices", [make_invoice(i) for i in range(rows)], server.invoice_codec)
+    ]
+    print(f"{rows} documents, best of {repeat}")
+    for name, docs, codec in cases:
+        generic_decode = timed(lambda b: [server.deserialize_doc(d) for d in b], docs, repeat)
+        codec_decode = timed(codec.decode_many, docs, repeat)
+
+        decoded = codec.decode_many(copy.deepcopy(docs))
+        generic_encode = timed(lambda b: [server.serialize_doc(d) for d in b], decoded, repeat)
+        codec_encode = timed(lambda b: [codec.encode(d) for d in b], decoded, repeat)
+
+        print(f"  {name}")
+        print(f"    decode  generic {generic_decode * 1000:8.2f} ms   codec {codec_decode * 1000:8.2f} ms   "
+              f"x{generic_decode / codec_decode:.1f}")
+        print(f"    encode  generic {generic_encode * 1000:8.2f} ms   codec {codec_encode * 1000:8.2f} ms   "
+              f"x{generic_encode / codec_encode:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.rows, args.repeat)
@@ -0,0 +1,118 @@
+"""
+GST Invoice Add Benchmark
+
+Adds invoices one at a time to a single GSTR-1 period through
+add_gst_invoice (duplicate check by the unique invoice_number_key index)
+and compares per-insert latency with the old path, which loaded the whole
+period with find().to_list(10000) and scanned it for the invoice number
+before every insert. Latency is reported as the period fills up; the
+legacy path is quadratic in the period size, so it runs on fewer invoices.
+
+Needs a running MongoDB (MONGO_URL); the scratch database is dropped
+afterwards unless --keep is given.
+
+Usage (from backend/):
+    python benchmarks/bench_gst_add_invoice.py --invoices 20000 --legacy-invoices 3000
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'benchmark')
+
+import server  # noqa: E402
+from motor.motor_asyncio import AsyncIOMotorClient  # noqa: E402
+
+from db_indexes import INDEX_SPECS  # noqa: E402
+from gst_engine.orchestrator import GSTOrchestrator  # noqa: E402
+
+COMPANY_ID = "company-1"
+GSTIN = "27AABCU9603R1ZM"
+PERIOD = "01-2026"
+CHECKPOINTS = 10
+
+
+def make_invoice(i: int) -> server.GSTInvoiceCreate:
+    return server.GSTInvoiceCreate(
+        invoice_number=f"INV-{i:06d}", invoice_date="2026-01-15", supply_type="intra",
+        place_of_supply="27", taxable_value=1000.0, gst_rate=18.0, cgst=90.0, sgst=90.0
+    )
+
+
+async def legacy_add_invoice(db, invoice_data: server.GSTInvoiceCreate) -> dict:
+    """add_gst_invoice's duplicate check and insert before the unique index"""
+    existing_invoices = await db.gst_invoices.find(
+        {"company_id": COMPANY_ID, "gstin": GSTIN, "period": PERIOD}, {"_id": 0}
+    ).to_list(10000)
+    invoice_dict = {**invoice_data.model_dump(), "gstin": GSTIN, "period": PERIOD}
+    result = GSTOrchestrator.add_invoice(invoice_dict, existing_invoices)
+    if result['valid']:
+        invoice = server.GSTInvoice(company_id=COMPANY_ID, **result['invoice'])
+        await db.gst_invoices.insert_one(server.gst_invoice_codec.encode(invoice.model_dump()))
+    return {"success": result['valid'], "errors": result['errors']}
+
+
+async def fill(label: str, add, count: int) -> float:
+    """Add `count` invoices, print latency per checkpoint; returns total seconds"""
+    step = max(1, count // CHECKPOINTS)
+    latencies = []
+    started = time.perf_counter()
+    print(f"{label}: {count} invoices")
+    for i in range(count):
+        start = time.perf_counter()
+        result = await add(make_invoice(i))
+        latencies.append(time.perf_counter() - start)
+        assert result["success"], result["errors"]
+        if (i + 1) % step == 0 or i + 1 == count:
+            window = latencies[-step:]
+            print(f"  {i + 1:>7} in period   mean {statistics.mean(window) * 1000:7.2f} ms"
+                  f"   max {max(window) * 1000:7.2f} ms")
+    total = time.perf_counter() - started
+    print(f"  total {total:.1f} s, {count / total:,.0f} inserts/s")
+    return total
+
+
+async def main(invoices: int, legacy_invoices: int, keep: bool):
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db_name = f"bench_gst_add_{uuid.uuid4().hex[:8]}"
+    db = client[db_name]
+    server.db = db  # add_gst_invoice reads the module-level handle
+    current_user = {"company": {"id": COMPANY_ID}}
+
+    try:
+        await server.ensure_indexes(db)
+        await db.gst_profiles.insert_one({"company_id": COMPANY_ID, "gstin": GSTIN, "is_complete": True})
+
+        await fill("unique index", lambda inv: server.add_gst_invoice(GSTIN, PERIOD, inv, current_user), invoices)
+
+        duplicate = await server.add_gst_invoice(GSTIN, PERIOD, make_invoice(0), current_user)
+        assert not duplicate["success"] and duplicate["errors"][0]["code"] == "INVOICE_DUPLICATE"
+        print("  re-adding INV-000000 is rejected as INVOICE_DUPLICATE")
+
+        if legacy_invoices:
+            await db.gst_invoices.drop()
+            await db.gst_invoices.create_indexes(INDEX_SPECS["gst_invoices"])
+            await fill("legacy (load period + scan)", lambda inv: legacy_add_invoice(db, inv), legacy_invoices)
+            if legacy_invoices > 10000:
+                print("  note: legacy loads at most 10,000 invoices, so later duplicates go unnoticed")
+    finally:
+        if not keep:
+            await client.drop_database(db_name)
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--invoices", type=int, default=20000)
+    parser.add_argument("--legacy-invoices", type=int, default=3000, help="0 to skip the legacy path")
+    parser.add_argument("--keep", action="store_true", help="keep the scratch database")
+    args = parser.parse_args()
+    asyncio.run(main(args.invoices, args.legacy_invoices, args.keep))
@@ -0,0 +1,94 @@
+"""
+GSTR-1 Generator Benchmark
+
+Times GSTR1Generator.generate over a synthetic sales register (--invoices,
+default 200k) and compares the old generator on a smaller register
+(--legacy-invoices): it rescanned the whole B2C Small list for every B2C
+Small invoice (quadratic) and emitted one B2B block per invoice instead of
+per recipient.
+
+Runs in memory; no MongoDB needed.
+
+Usage (from backend/):
+    python benchmarks/bench_gstr1_generator.py --invoices 200000 --legacy-invoices 5000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from gst_engine import GSTR1Generator  # noqa: E402
+
+
+def make_register(count: int) -> list:
+    return [{
+        "invoice_no": f"INV-{n:06d}", "invoice_date": "15-01-2026",
+        "customer_gstin": f"29AABCA{n // 4 % 500:04d}F1Z5" if n % 4 == 0 else "",
+        "invoice_value": 1180 + n % 100, "taxable_value": 1000 + n % 100, "gst_rate": (5, 12, 18)[n % 3],
+        "place_of_supply": f"{n % 37 + 1:02d}", "is_interstate": n % 2 == 0, "hsn_code": str(9900 + n % 50),
+    } for n in range(count)]
+
+
+def legacy_generate(sales_register: list) -> dict:
+    """The B2B / B2C Small sections as GSTR1Generator.generate built them before the rewrite"""
+    b2b, b2cs = [], []
+    for invoice in sales_register:
+        customer_gstin = invoice.get('customer_gstin', '')
+        value = float(invoice.get('invoice_value', 0))
+        taxable = float(invoice.get('taxable_value', 0))
+        rate = float(invoice.get('gst_rate', 18))
+        tax = taxable * rate / 100
+        if customer_gstin:
+            b2b.append({'ctin': customer_gstin, 'inv': [{'inum': invoice.get('invoice_no', ''), 'val': value}]})
+        elif value > 250000 and invoice.get('is_interstate'):
+            continue
+        else:
+            key = f"{invoice.get('place_of_supply', '')}_{rate}"
+            if key not in b2cs:  # always true: b2cs holds dicts
+                b2cs.append({'pos': invoice.get('place_of_supply', ''), 'rt': rate, 'txval': 0, 'iamt': 0,
+                             'camt': 0, 'samt': 0})
+            for item in b2cs:
+                if item['pos'] == invoice.get('place_of_supply', '') and item['rt'] == rate:
+                    item['txval'] += taxable
+                    if invoice.get('is_interstate'):
+                        item['iamt'] += tax
+                    else:
+                        item['camt'] += tax / 2
+                        item['samt'] += tax / 2
+    return {'b2b': b2b, 'b2cs': b2cs}
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main(invoices: int, legacy_invoices: int):
+    register = make_register(invoices)
+    result, elapsed = timed(lambda: GSTR1Generator.generate("27AABCU9603R1ZM", "012026", register))
+    print(f"generate over {invoices} invoices: {elapsed * 1000:.0f} ms ({invoices / elapsed:,.0f} invoices/s)")
+    print(f"  b2b blocks {len(result['b2b'])}, b2cs rows {len(result['b2cs'])}, hsn rows {len(result['hsn']['data'])}")
+
+    if legacy_invoices:
+        small = make_register(legacy_invoices)
+        legacy, legacy_s = timed(lambda: legacy_generate(small))
+        current, current_s = timed(lambda: GSTR1Generator.generate("27AABCU9603R1ZM", "012026", small))
+        b2cs_taxable = sum(inv["taxable_value"] for inv in small if not inv["customer_gstin"])
+        print(f"{legacy_invoices} invoices, legacy vs current")
+        print(f"  time        {legacy_s * 1000:9.0f} ms  {current_s * 1000:9.0f} ms   x{legacy_s / current_s:.0f}")
+        print(f"  b2b blocks  {len(legacy['b2b']):9d}     {len(current['b2b']):9d}")
+        print(f"  b2cs rows   {len(legacy['b2cs']):9d}     {len(current['b2cs']):9d}")
+        print(f"  b2cs txval  {sum(r['txval'] for r in legacy['b2cs']):12,.0f}  "
+              f"{sum(r['txval'] for r in current['b2cs']):12,.0f}   (register: {b2cs_taxable:,.0f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--invoices", type=int, default=200000)
+    parser.add_argument("--legacy-invoices", type=int, default=5000, help="0 to skip the legacy comparison")
+    args = parser.parse_args()
+    main(args.invoices, args.legacy_invoices)
@@ -0,0 +1,96 @@
+"""
+GSTR-1 Validation Cache Benchmark
+
+Validates one period of --invoices invoices with GSTOrchestrator.validate_gstr1
+without the cache, then with InvoiceValidationCache: cold, unchanged, after
+editing one invoice and after deleting one. Invoices carry content_hash as
+saved by add_gst_invoice. Checks every cached run returns the same result as
+an uncached run over the same invoices.
+
+Runs in memory; no MongoDB needed.
+
+Usage (from backend/):
+    python benchmarks/bench_gstr1_validation.py --invoices 50000 --repeat 5
+"""
+
+import argparse
+import copy
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from gst_engine.orchestrator import GSTOrchestrator  # noqa: E402
+from gst_engine.validators.validation_cache import InvoiceValidationCache  # noqa: E402
+
+GSTIN = "27AABCU9603R1ZM"
+PERIOD = "01-2026"
+
+
+def make_invoice(i: int) -> dict:
+    taxable = 1000.0 + i % 500
+    invoice = {
+        "id": f"gi-{i}", "invoice_number": f"INV-{i:06d}", "invoice_date": f"2026-01-{i % 28 + 1:02d}",
+        "supply_type": "intra", "recipient_gstin": "29AABCU9603R1ZM" if i % 4 == 0 else None,
+        "taxable_value": taxable, "gst_rate": 18.0, "cgst": taxable * 0.09, "sgst": taxable * 0.09,
+        "igst": 0.0, "cess": 0.0, "total_value": taxable * 1.18,
+        "invoice_type": "B2B" if i % 4 == 0 else "B2C_SMALL", "gstin": GSTIN, "period": PERIOD,
+    }
+    if i % 1000 == 7:
+        invoice["cgst"] += 5  # a few invoices with errors
+    invoice["content_hash"] = InvoiceValidationCache.content_hash(invoice)
+    return invoice
+
+
+def timed(fn, repeat: int):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return result, best
+
+
+def main(invoices: int, repeat: int):
+    period = [make_invoice(i) for i in range(invoices)]
+    cache = InvoiceValidationCache(max_entries=invoices * 2)
+
+    def run(cached: bool):
+        return GSTOrchestrator.validate_gstr1(period, GSTIN, PERIOD, validation_cache=cache if cached else None)
+
+    full, full_s = timed(lambda: run(False), repeat)
+    cold, cold_s = timed(lambda: (cache.clear(), run(True))[1], 1)
+    _, warm_s = timed(lambda: run(True), repeat)
+
+    edited = copy.deepcopy(period[invoices // 2])
+    edited["taxable_value"] += 100.0
+    edited["content_hash"] = InvoiceValidationCache.content_hash(edited)
+    period[invoices // 2] = edited
+    misses = cache.misses
+    edit, edit_s = timed(lambda: run(True), 1)
+    edit_misses = cache.misses - misses
+    edit_expected = run(False)
+    del period[0]
+    delete, delete_s = timed(lambda: run(True), 1)
+
+    print(f"validate_gstr1 over {invoices} invoices")
+    print(f"  no cache             {full_s * 1000:8.1f} ms")
+    print(f"  cache, cold          {cold_s * 1000:8.1f} ms")
+    print(f"  cache, unchanged     {warm_s * 1000:8.1f} ms   x{full_s / warm_s:.1f}")
+    print(f"  cache, one edit      {edit_s * 1000:8.1f} ms   x{full_s / edit_s:.1f}   ({edit_misses} revalidated)")
+    print(f"  cache, one delete    {delete_s * 1000:8.1f} ms")
+    print(f"  {len(edit['errors'])} errors after the edit")
+
+    assert cold == full
+    assert edit == edit_expected
+    assert delete == run(False)
+    print("  cached results match uncached validation")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--invoices", type=int, default=50000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.invoices, args.repeat)
@@ -0,0 +1,76 @@
+"""
+List Response Encoding Benchmark
+
+Compares, for 1k and 10k invoice rows:
+1. fastapi: response_model validation + jsonable_encoder + JSONResponse
+   (what FastAPI does when a route returns a list of dicts)
+2. model: page_response, the list routes' default (one validation,
+   pydantic-core writes the JSON; same body as 1)
+3. fast: FastJSONResponse on the raw documents (orjson when installed),
+   what the list routes send with FAST_LIST_RESPONSES=true
+
+Usage (from backend/):
+    python benchmarks/bench_json_responses.py --repeat 5
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'benchmark')
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+import server  # noqa: E402
+from bench_doc_codecs import make_invoice  # noqa: E402
+
+invoice_list = TypeAdapter(List[server.Invoice])
+
+
+def fastapi_path(docs):
+    decoded = server.invoice_codec.decode_many([dict(d) for d in docs])
+    validated = invoice_list.validate_python(decoded)
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def model_path(docs):
+    adapter = server.list_adapter(server.Invoice)
+    return adapter.dump_json(adapter.validate_python(docs), by_alias=True)
+
+
+def fast_path(docs):
+    return server.FastJSONResponse(docs).body
+
+
+def best_of(fn, docs, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn(docs)
+        best = min(best, time.perf_counter() - start)
+    return best, len(body)
+
+
+def main(repeat: int):
+    print(f"orjson available: {server.ORJSON_AVAILABLE}; best of {repeat}")
+    for rows in (1000, 10000):
+        docs = [make_invoice(i) for i in range(rows)]
+        slow, slow_size = best_of(fastapi_path, docs, repeat)
+        model, model_size = best_of(model_path, docs, repeat)
+        fast, fast_size = best_of(fast_path, docs, repeat)
+        print(f"  {rows:>6} rows  fastapi {slow * 1000:8.1f} ms ({slow_size / 1024:.0f} KiB)   "
+              f"model {model * 1000:7.1f} ms ({model_size / 1024:.0f} KiB)   x{slow / model:.1f}   "
+              f"fast {fast * 1000:7.1f} ms ({fast_size / 1024:.0f} KiB)   x{slow / fast:.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args().repeat)
@@ -0,0 +1,118 @@
+"""
+Login Throughput Benchmark
+
+Shows that concurrent logins are no longer serialized on the event loop.
+
+Modes:
+1. In-process (default): N concurrent bcrypt verifications run inline on the
+   event loop vs. on the bounded password executor, while a heartbeat task
+   measures how long the loop is blocked.
+2. HTTP (--http): N concurrent POST /api/auth/login against a running server
+   (REACT_APP_BACKEND_URL, same as the API tests).
+
+Usage:
+    python benchmarks/bench_login_throughput.py --concurrency 32 --workers 4
+    python benchmarks/bench_login_throughput.py --http --concurrency 32
+"""
+
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+TEST_EMAIL = "testuser@example.com"
+TEST_PASSWORD = "testpassword"
+
+
+async def _heartbeat(stop: asyncio.Event, interval: float, lags: list):
+    """Record how late each tick fires; large lags mean the loop was blocked"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def _run(concurrency: int, verify, executor=None) -> dict:
+    stop = asyncio.Event()
+    lags = []
+    probe = asyncio.create_task(_heartbeat(stop, 0.005, lags))
+    await asyncio.sleep(0)
+
+    loop = asyncio.get_running_loop()
+
+    async def one_login():
+        if executor is None:
+            return verify()
+        return await loop.run_in_executor(executor, verify)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_login() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await probe
+    return {
+        "elapsed_s": elapsed,
+        "logins_per_s": concurrency / elapsed,
+        "max_loop_block_ms": max(lags, default=0) * 1000
+    }
+
+
+def bench_in_process(concurrency: int, workers: int):
+    from passlib.context import CryptContext
+
+    pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    hashed = pwd_context.hash(TEST_PASSWORD)
+
+    def verify():
+        return pwd_context.verify(TEST_PASSWORD, hashed)
+
+    inline = asyncio.run(_run(concurrency, verify))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash") as executor:
+        offloaded = asyncio.run(_run(concurrency, verify, executor))
+
+    print(f"{concurrency} concurrent logins, {workers} executor workers")
+    for name, result in (("inline (old)", inline), ("executor (new)", offloaded)):
+        print(f"  {name:15s} {result['elapsed_s']:.3f}s  "
+              f"{result['logins_per_s']:.1f} logins/s  "
+              f"max loop block {result['max_loop_block_ms']:.1f} ms")
+
+
+def bench_http(concurrency: int):
+    import requests
+
+    base_url = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+    def login(_):
+        start = time.perf_counter()
+        response = requests.post(
+            f"{base_url}/api/auth/login",
+            json={"email": TEST_EMAIL, "password": TEST_PASSWORD}
+        )
+        return response.status_code, time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(login, range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for _, latency in results)
+    ok = sum(1 for code, _ in results if code == 200)
+    print(f"{concurrency} concurrent logins against {base_url}: {ok} ok")
+    print(f"  wall {elapsed:.3f}s  {concurrency / elapsed:.1f} logins/s  "
+          f"p50 {latencies[len(latencies) // 2] * 1000:.0f} ms  "
+          f"max {latencies[-1] * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get('PASSWORD_HASH_WORKERS', '4')))
+    parser.add_argument("--http", action="store_true", help="benchmark a running server instead")
+    args = parser.parse_args()
+
+    if args.http:
+        bench_http(args.concurrency)
+    else:
+        bench_in_process(args.concurrency, args.workers)
@@ -0,0 +1,61 @@
+"""
+Per-Company Change Versions
+
+One document per company in `change_versions` with a counter per
+collection, bumped by every write route:
+
+    {"id": "<company_id>", "invoices": 12, "bills": 3, "customers": 7, ...}
+
+List and dashboard routes derive a weak ETag from the versions of the
+collections they read (plus the request path and query), so a poll whose
+If-None-Match still matches is answered 304 after one small indexed read,
+without querying or serialising the data.
+
+Routes read the versions before the data and writers bump them after the
+write, so a response can only carry an ETag older than its body (costing
+one extra 200 later), never a newer one.
+"""
+
+import hashlib
+from typing import Dict, Iterable, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+VERSIONS_COLLECTION = "change_versions"
+
+
+async def bump_versions(db, company_id: str, *kinds: str):
+    """Mark `kinds` (collection names) as changed for a company"""
+    if not kinds:
+        return
+    update = {"$inc": {kind: 1 for kind in kinds}}
+    try:
+        await db[VERSIONS_COLLECTION].update_one({"id": company_id}, update, upsert=True)
+    except DuplicateKeyError:
+        # A concurrent first bump created the document; it exists now
+        await db[VERSIONS_COLLECTION].update_one({"id": company_id}, update)
+
+
+async def get_versions(db, company_id: str, kinds: Iterable[str]) -> Dict[str, int]:
+    kinds = list(kinds)
+    doc = await db[VERSIONS_COLLECTION].find_one(
+        {"id": company_id}, {"_id": 0, **{kind: 1 for kind in kinds}}
+    ) or {}
+    return {kind: doc.get(kind, 0) for kind in kinds}
+
+
+def make_etag(company_id: str, resource: str, versions: Dict[str, int]) -> str:
+    """Weak ETag for `resource` (path + query) of a company at the given versions"""
+    state = "|".join(f"{kind}={versions[kind]}" for kind in sorted(versions))
+    digest = hashlib.sha1(f"{company_id}|{resource}|{state}".encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check with weak comparison (RFC 9110 13.1.2)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
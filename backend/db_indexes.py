@@ -0,0 +1,217 @@
+"""
+MongoDB Index Bootstrap
+
+Declares the indexes every hot query in server.py relies on and creates
+them at startup. Nearly every query is tenant-scoped, so compound indexes
+lead with company_id; GST documents are addressed by (company_id, gstin,
+period).
+
+create_index is idempotent, so running the bootstrap on every start is
+cheap. A failure on one index is logged and does not stop the others or the
+app. Before a missing unique index is built, the documents that would
+violate it are looked up and logged with their ids (they have to be fixed
+by hand, the index is not built until then).
+"""
+
+import logging
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+
+def _tenant_scoped_id() -> IndexModel:
+    return IndexModel([("company_id", ASCENDING), ("id", ASCENDING)], unique=True)
+
+
+def _gst_period(unique: bool = False) -> IndexModel:
+    return IndexModel(
+        [("company_id", ASCENDING), ("gstin", ASCENDING), ("period", ASCENDING)],
+        unique=unique
+    )
+
+
+def _tenant_sorted(field: str) -> IndexModel:
+    # Serves keyset pages ordered by (field, id) in either direction
+    return IndexModel([("company_id", ASCENDING), (field, ASCENDING), ("id", ASCENDING)])
+
+
+def _gst_period_sorted(field: str) -> IndexModel:
+    return IndexModel([
+        ("company_id", ASCENDING), ("gstin", ASCENDING), ("period", ASCENDING),
+        (field, ASCENDING), ("id", ASCENDING)
+    ])
+
+
+INDEX_SPECS: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("email", ASCENDING)], unique=True),
+        IndexModel([("company_id", ASCENDING), ("is_active", ASCENDING)]),
+    ],
+    "companies": [
+        IndexModel([("id", ASCENDING)], unique=True),
+    ],
+    "customers": [_tenant_scoped_id(), _tenant_sorted("created_at"), _tenant_sorted("name")],
+    "vendors": [_tenant_scoped_id(), _tenant_sorted("created_at"), _tenant_sorted("name")],
+    "invoices": [
+        _tenant_scoped_id(),
+        # Also serves the duplicate invoice_number check and the monthly created_at count
+        _tenant_sorted("invoice_number"),
+        _tenant_sorted("created_at"),
+        _tenant_sorted("issue_date"),
+        _tenant_sorted("due_date"),
+        # Also serves the status counts; created_at bounds the revenue chart window
+        IndexModel([("company_id", ASCENDING), ("status", ASCENDING), ("created_at", ASCENDING)]),
+        # Analysis sweep (InvoiceAnalysisQueue._claimable). Every invoice stores
+        # ai_status (None without analysis), so only the claimable states are indexed
+        IndexModel(
+            [("ai_status", ASCENDING), ("ai_started_at", ASCENDING)], name="ai_status_claimable",
+            partialFilterExpression={"ai_status": {"$in": ["pending", "running"]}}
+        ),
+    ],
+    "payments": [_tenant_scoped_id(), _tenant_sorted("created_at"), _tenant_sorted("payment_date")],
+    "bills": [
+        _tenant_scoped_id(),
+        _tenant_sorted("created_at"),
+        _tenant_sorted("due_date"),
+        IndexModel([("company_id", ASCENDING), ("status", ASCENDING), ("created_at", ASCENDING)]),
+    ],
+    "news": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("is_active", ASCENDING), ("published_date", DESCENDING)]),
+    ],
+    "itr_filings": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "gst_profiles": [
+        IndexModel([("company_id", ASCENDING), ("gstin", ASCENDING)], unique=True),
+    ],
+    "gst_invoices": [
+        # The created_at one doubles as the plain (company_id, gstin, period) index
+        _gst_period_sorted("created_at"),
+        _gst_period_sorted("invoice_date"),
+        _gst_period_sorted("invoice_number"),
+        IndexModel([("id", ASCENDING)], unique=True),
+        # Duplicate invoice numbers per return (GSTValidator.normalize_invoice_number)
+        IndexModel(
+            [("company_id", ASCENDING), ("gstin", ASCENDING), ("period", ASCENDING), ("invoice_number_key", ASCENDING)],
+            name="gst_invoice_number_unique", unique=True,
+            partialFilterExpression={"invoice_number_key": {"$type": "string"}}
+        ),
+    ],
+    "gst_gstr1_filings": [_gst_period(unique=True)],
+    "gst_gstr3b_filings": [_gst_period(unique=True)],
+    "gst_filings_v2": [
+        _tenant_scoped_id(),
+        IndexModel([("company_id", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "gst_filings": [
+        IndexModel([("gstin", ASCENDING), ("period", ASCENDING)]),
+    ],
+    "gstn_configs": [
+        IndexModel([("company_id", ASCENDING)], unique=True),
+    ],
+    "financial_rollups": [
+        IndexModel([("id", ASCENDING)], unique=True),
+    ],
+    "usage_counters": [
+        IndexModel([("id", ASCENDING)], unique=True),
+    ],
+    "change_versions": [
+        IndexModel([("id", ASCENDING)], unique=True),
+    ],
+    "customer_invoice_stats": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("company_id", ASCENDING)]),
+    ],
+    "gst_period_totals": [
+        IndexModel([("id", ASCENDING)], unique=True),
+        IndexModel([("company_id", ASCENDING)]),
+    ],
+    "gstn_audit_logs": [
+        IndexModel([("company_id", ASCENDING), ("gstin", ASCENDING), ("timestamp", DESCENDING)]),
+    ],
+}
+
+# Fields an index is built on, filled in for documents saved before the field
+# existed: index name -> (collection, filter, update pipeline). Runs server-side
+# in one update_many, and only while the index is still missing.
+INDEX_BACKFILLS = {
+    "gst_invoice_number_unique": (
+        "gst_invoices",
+        {"invoice_number_key": {"$exists": False}, "invoice_number": {"$type": "string"}},
+        [{"$set": {"invoice_number_key": {"$toUpper": {"$trim": {"input": "$invoice_number"}}}}}],
+    ),
+}
+
+
+async def _backfill(db, collection: str, indexes: List[IndexModel]):
+    pending = [index.document["name"] for index in indexes if index.document["name"] in INDEX_BACKFILLS]
+    if not pending:
+        return
+    existing = await db[collection].index_information()
+    for name in pending:
+        if name in existing:
+            continue
+        _, query, pipeline = INDEX_BACKFILLS[name]
+        result = await db[collection].update_many(query, pipeline)
+        if result.modified_count:
+            logger.info(f"Backfilled {result.modified_count} {collection} documents for index {name}")
+
+
+# Conflicting keys listed per unique index that cannot be built
+MAX_REPORTED_CONFLICTS = 20
+
+
+async def duplicate_keys(db, collection: str, index: IndexModel) -> List[dict]:
+    """
+    Key values held by more than one document, which keep the unique `index`
+    from being built: [{"_id": {field: value}, "count", "ids"}], at most
+    MAX_REPORTED_CONFLICTS.
+    """
+    fields = [field for field, _ in index.document["key"].items()]
+    pipeline = []
+    if "partialFilterExpression" in index.document:
+        pipeline.append({"$match": index.document["partialFilterExpression"]})
+    pipeline += [
+        {"$group": {"_id": {field: f"${field}" for field in fields}, "count": {"$sum": 1}, "ids": {"$push": "$id"}}},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$limit": MAX_REPORTED_CONFLICTS},
+    ]
+    return await db[collection].aggregate(pipeline, allowDiskUse=True).to_list(None)
+
+
+async def ensure_indexes(db) -> Dict[str, List[str]]:
+    """
+    Create every index in INDEX_SPECS on a Motor database.
+
+    Returns:
+        Dict of collection name -> names of the indexes now in place
+        (indexes that failed to build are left out and logged)
+    """
+    created: Dict[str, List[str]] = {}
+    for collection, indexes in INDEX_SPECS.items():
+        names = []
+        await _backfill(db, collection, indexes)
+        existing = await db[collection].index_information()
+        # One at a time: a batched createIndexes fails as a whole
+        for index in indexes:
+            name = index.document["name"]
+            if index.document.get("unique") and name not in existing:
+                conflicts = await duplicate_keys(db, collection, index)
+                if conflicts:
+                    logger.error(
+                        f"Index {name} on {collection} not created: duplicate keys (first "
+                        f"{len(conflicts)}): " + "; ".join(f"{c['_id']} in {c['ids']}" for c in conflicts)
+                    )
+                    continue
+            try:
+                names.extend(await db[collection].create_indexes([index]))
+            except OperationFailure as e:
+                logger.error(f"Index {index.document['name']} on {collection} not created: {e}")
+        created[collection] = names
+    return created
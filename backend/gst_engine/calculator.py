@@ -366,18 +366,30 @@ class GSTR3BGenerator:
 class GSTR1Generator:
     """Generate GSTR-1 return data"""
     
+    # Summed amounts in aggregated sections, rounded to the paisa at the end
+    AGGREGATE_AMOUNTS = ('val', 'txval', 'iamt', 'camt', 'samt')
+    
     @staticmethod
     def generate(
         gstin: str,
         period: str,
         sales_register: List[Dict]
     ) -> Dict[str, Any]:
-        """Generate GSTR-1 JSON format"""
+        """
+        Generate GSTR-1 JSON format
+        
+        One pass over the sales register, accumulating into dicts:
+        - b2b: one block per recipient GSTIN (ctin) with its invoices
+        - b2cl: one block per place of supply with its invoices
+        - b2cs: one row per (place of supply, rate)
+        - hsn: one row per HSN/SAC code
+        Blocks and rows keep the order of their first invoice.
+        """
         
-        b2b = []  # B2B invoices
-        b2cl = []  # B2C Large (> ₹2.5L interstate)
-        b2cs = []  # B2C Small
-        hsn_summary = {}
+        b2b = {}  # ctin -> B2B block
+        b2cl = {}  # pos -> B2C Large (> ₹2.5L interstate) block
+        b2cs = {}  # (pos, rate) -> B2C Small row
+        hsn_summary = {}  # hsn -> HSN row
         
         for invoice in sales_register:
             customer_gstin = invoice.get('customer_gstin', '')
@@ -385,72 +397,72 @@ class GSTR1Generator:
             taxable = float(invoice.get('taxable_value', 0))
             rate = float(invoice.get('gst_rate', 18))
             hsn = invoice.get('hsn_code', '9983')
+            pos = invoice.get('place_of_supply', '')
+            interstate = bool(invoice.get('is_interstate'))
             
             tax = taxable * rate / 100
+            iamt = tax if interstate else 0
+            camt = samt = tax/2 if not interstate else 0
             
             if customer_gstin:  # B2B
-                b2b.append({
-                    'ctin': customer_gstin,
-                    'inv': [{
-                        'inum': invoice.get('invoice_no', ''),
-                        'idt': invoice.get('invoice_date', ''),
-                        'val': value,
-                        'pos': invoice.get('place_of_supply', ''),
-                        'rchrg': 'N',
-                        'itms': [{
-                            'num': 1,
-                            'itm_det': {
-                                'rt': rate,
-                                'txval': taxable,
-                                'iamt': tax if invoice.get('is_interstate') else 0,
-                                'camt': tax/2 if not invoice.get('is_interstate') else 0,
-                                'samt': tax/2 if not invoice.get('is_interstate') else 0
-                            }
-                        }]
+                block = b2b.get(customer_gstin)
+                if block is None:
+                    block = b2b[customer_gstin] = {'ctin': customer_gstin, 'inv': []}
+                block['inv'].append({
+                    'inum': invoice.get('invoice_no', ''),
+                    'idt': invoice.get('invoice_date', ''),
+                    'val': value,
+                    'pos': pos,
+                    'rchrg': 'N',
+                    'itms': [{
+                        'num': 1,
+                        'itm_det': {
+                            'rt': rate,
+                            'txval': taxable,
+                            'iamt': iamt,
+                            'camt': camt,
+                            'samt': samt
+                        }
                     }]
                 })
-            elif value > 250000 and invoice.get('is_interstate'):  # B2C Large
-                b2cl.append({
-                    'pos': invoice.get('place_of_supply', ''),
-                    'inv': [{
-                        'inum': invoice.get('invoice_no', ''),
-                        'idt': invoice.get('invoice_date', ''),
-                        'val': value,
-                        'itms': [{
-                            'num': 1,
-                            'itm_det': {
-                                'rt': rate,
-                                'txval': taxable,
-                                'iamt': tax
-                            }
-                        }]
+            elif value > 250000 and interstate:  # B2C Large
+                block = b2cl.get(pos)
+                if block is None:
+                    block = b2cl[pos] = {'pos': pos, 'inv': []}
+                block['inv'].append({
+                    'inum': invoice.get('invoice_no', ''),
+                    'idt': invoice.get('invoice_date', ''),
+                    'val': value,
+                    'itms': [{
+                        'num': 1,
+                        'itm_det': {
+                            'rt': rate,
+                            'txval': taxable,
+                            'iamt': tax
+                        }
                     }]
                 })
             else:  # B2C Small - aggregate
-                key = f"{invoice.get('place_of_supply', '')}_{rate}"
-                if key not in b2cs:
-                    b2cs.append({
-                        'pos': invoice.get('place_of_supply', ''),
+                row = b2cs.get((pos, rate))
+                if row is None:
+                    row = b2cs[(pos, rate)] = {
+                        'pos': pos,
                         'rt': rate,
                         'typ': 'OE',
                         'txval': 0,
                         'iamt': 0,
                         'camt': 0,
                         'samt': 0
-                    })
-                # Find and update
-                for item in b2cs:
-                    if item['pos'] == invoice.get('place_of_supply', '') and item['rt'] == rate:
-                        item['txval'] += taxable
-                        if invoice.get('is_interstate'):
-                            item['iamt'] += tax
-                        else:
-                            item['camt'] += tax/2
-                            item['samt'] += tax/2
+                    }
+                row['txval'] += taxable
+                row['iamt'] += iamt
+                row['camt'] += camt
+                row['samt'] += samt
             
             # HSN Summary
-            if hsn not in hsn_summary:
-                hsn_summary[hsn] = {
+            row = hsn_summary.get(hsn)
+            if row is None:
+                row = hsn_summary[hsn] = {
                     'hsn_sc': hsn,
                     'desc': invoice.get('description', 'Goods/Services'),
                     'uqc': 'NOS',
@@ -461,21 +473,24 @@ class GSTR1Generator:
                     'camt': 0,
                     'samt': 0
                 }
-            hsn_summary[hsn]['qty'] += float(invoice.get('quantity', 1))
-            hsn_summary[hsn]['val'] += value
-            hsn_summary[hsn]['txval'] += taxable
-            if invoice.get('is_interstate'):
-                hsn_summary[hsn]['iamt'] += tax
-            else:
-                hsn_summary[hsn]['camt'] += tax/2
-                hsn_summary[hsn]['samt'] += tax/2
+            row['qty'] += float(invoice.get('quantity', 1))
+            row['val'] += value
+            row['txval'] += taxable
+            row['iamt'] += iamt
+            row['camt'] += camt
+            row['samt'] += samt
+        
+        for row in [*b2cs.values(), *hsn_summary.values()]:
+            for field in GSTR1Generator.AGGREGATE_AMOUNTS:
+                if field in row:
+                    row[field] = round(row[field], 2)
         
         return {
             'gstin': gstin,
             'fp': period,
-            'b2b': b2b,
-            'b2cl': b2cl,
-            'b2cs': b2cs,
+            'b2b': list(b2b.values()),
+            'b2cl': list(b2cl.values()),
+            'b2cs': list(b2cs.values()),
             'hsn': {
                 'data': list(hsn_summary.values())
             },
@@ -48,6 +48,27 @@ class InvoiceManager:
         
         return totals
     
+    @staticmethod
+    def totals_from_period(period_totals: Dict[str, Any]) -> Dict[str, float]:
+        """
+        calculate_gstr1_totals from a running gst_period_totals document
+        (rounded to the paisa: repeated $inc of floats leaves sub-paisa noise)
+        """
+        stored = period_totals.get('totals', {})
+        return {
+            name: round(stored.get(name, 0.0), 2)
+            for name in ("total_taxable_value", "total_cgst", "total_sgst", "total_igst", "total_invoice_value")
+        }
+    
+    @staticmethod
+    def category_counts_from_period(period_totals: Dict[str, Any]) -> Dict[str, int]:
+        """Invoice count per category (B2B/B2C_LARGE/B2C_SMALL) from a gst_period_totals document"""
+        categories = period_totals.get('categories', {})
+        return {
+            category: categories.get(category, {}).get('count', 0)
+            for category in ('B2B', 'B2C_LARGE', 'B2C_SMALL')
+        }
+    
     @staticmethod
     def categorize_invoice(invoice: Dict[str, Any]) -> str:
         """
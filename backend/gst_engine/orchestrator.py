@@ -18,6 +18,7 @@ from typing import Dict, Any, List, Optional
 from datetime import datetime
 from .profile.gst_profile import GSTProfile
 from .validators.gst_validator import GSTValidator
+from .validators.validation_cache import InvoiceValidationCache
 from .gstr1.invoice_manager import InvoiceManager
 from .gstr3b.return_generator import GSTR3BGenerator
 
@@ -70,10 +71,15 @@ class GSTOrchestrator:
         }
     
     @staticmethod
-    def add_invoice(invoice_data: Dict[str, Any], existing_invoices: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def add_invoice(invoice_data: Dict[str, Any], existing_invoices: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
         """
         Add and validate a new invoice for GSTR-1
         
+        Args:
+            invoice_data: Invoice to add
+            existing_invoices: Invoices to check for a duplicate number; None
+                when the caller enforces uniqueness itself (unique index)
+        
         Returns:
             {
                 "valid": bool,
@@ -89,17 +95,13 @@ class GSTOrchestrator:
         errors = GSTValidator.validate_invoice(invoice_data, supply_type)
         
         # Check for duplicates
-        if GSTValidator.check_duplicate_invoice(
+        if existing_invoices is not None and GSTValidator.check_duplicate_invoice(
             invoice_data.get('invoice_number', ''),
             invoice_data.get('gstin', ''),
             invoice_data.get('period', ''),
             existing_invoices
         ):
-            errors.append({
-                "code": "INVOICE_DUPLICATE",
-                "severity": "BLOCKER",
-                "message": f"Invoice {invoice_data.get('invoice_number')} already exists for this period"
-            })
+            errors.append(GSTValidator.duplicate_invoice_error(invoice_data.get('invoice_number')))
         
         if errors:
             return {
@@ -129,7 +131,35 @@ class GSTOrchestrator:
         }
     
     @staticmethod
-    def validate_gstr1(invoices: List[Dict[str, Any]], gstin: str, period: str, is_nil: bool = False) -> Dict[str, Any]:
+    def add_invoices(invoices: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        add_invoice for a batch (bulk import), validated column-wise by
+        BulkGSTValidator. Duplicates are left to the unique index.
+        
+        Returns:
+            One add_invoice result per invoice, in order
+        """
+        from .validators.bulk_validator import BulkGSTValidator
+        
+        cols = BulkGSTValidator.columns(invoices)
+        categories = BulkGSTValidator.categorize(cols)
+        errors = BulkGSTValidator.validate(cols, categories)
+        totals = BulkGSTValidator.computed_totals(cols).tolist()
+        
+        results = []
+        for invoice_data, supply_type, invoice_errors, total in zip(invoices, categories.tolist(), errors, totals):
+            if invoice_errors:
+                results.append({"valid": False, "errors": invoice_errors, "invoice": None, "category": supply_type})
+                continue
+            if not invoice_data.get('total_value'):
+                invoice_data['total_value'] = total
+            invoice_data['invoice_type'] = supply_type
+            results.append({"valid": True, "errors": [], "invoice": invoice_data, "category": supply_type})
+        return results
+    
+    @staticmethod
+    def validate_gstr1(invoices: List[Dict[str, Any]], gstin: str, period: str, is_nil: bool = False,
+                       validation_cache: Optional[InvoiceValidationCache] = None) -> Dict[str, Any]:
         """
         Validate complete GSTR-1
         
@@ -138,6 +168,10 @@ class GSTOrchestrator:
         - All invoices valid
         - Totals computed correctly
         
+        Args:
+            validation_cache: Reuse per-invoice results of earlier runs, so only
+                invoices added or changed since then are validated again
+        
         Returns:
             {
                 "valid": bool,
@@ -161,11 +195,12 @@ class GSTOrchestrator:
         # Validate each invoice
         all_invoice_errors = []
         for idx, invoice in enumerate(invoices):
-            inv_errors = GSTValidator.validate_invoice(invoice, invoice.get('invoice_type', 'B2B'))
-            if inv_errors:
-                for err in inv_errors:
-                    err['invoice_number'] = invoice.get('invoice_number', f'Invoice #{idx+1}')
-                    all_invoice_errors.append(err)
+            if validation_cache is not None:
+                inv_errors = validation_cache.errors_for(invoice)
+            else:
+                inv_errors = GSTValidator.validate_invoice(invoice, invoice.get('invoice_type', 'B2B'))
+            for err in inv_errors:
+                all_invoice_errors.append({**err, 'invoice_number': invoice.get('invoice_number', f'Invoice #{idx+1}')})
         
         if all_invoice_errors:
             errors.extend(all_invoice_errors)
@@ -154,16 +154,35 @@ class GSTValidator:
         
         return errors
     
+    @staticmethod
+    def normalize_invoice_number(invoice_number: str) -> str:
+        """
+        Key for duplicate detection: GSTN treats invoice numbers
+        case-insensitively, and surrounding whitespace is not significant.
+        Stored as invoice_number_key (unique per company, GSTIN and period).
+        """
+        return (invoice_number or '').strip().upper()
+    
+    @staticmethod
+    def duplicate_invoice_error(invoice_number: str) -> Dict[str, Any]:
+        return {
+            "code": "INVOICE_DUPLICATE",
+            "severity": "BLOCKER",
+            "message": f"Invoice {invoice_number} already exists for this period"
+        }
+    
     @staticmethod
     def check_duplicate_invoice(invoice_number: str, gstin: str, period: str, existing_invoices: List[Dict]) -> bool:
         """
-        Check for duplicate invoice number
+        Check for duplicate invoice number in an in-memory list (stored
+        invoices are protected by the unique invoice_number_key index)
         
         Returns:
             True if duplicate found
         """
+        key = GSTValidator.normalize_invoice_number(invoice_number)
         for inv in existing_invoices:
-            if (inv.get('invoice_number') == invoice_number and 
+            if (GSTValidator.normalize_invoice_number(inv.get('invoice_number')) == key and
                 inv.get('period') == period):
                 return True
         return False
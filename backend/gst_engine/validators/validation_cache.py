@@ -0,0 +1,71 @@
+"""
+GSTR-1 Invoice Validation Cache
+
+validate_gstr1 re-checks every invoice of the period on each call, although
+between two calls usually only a few invoices were added or deleted. This
+cache keeps GSTValidator.validate_invoice results keyed by a content hash of
+the fields the rules read, so a re-validation only runs the rules for new or
+changed invoices; deleted invoices simply stop being looked up.
+
+Invoices are saved with their content_hash (add_gst_invoice, bulk import),
+so a warm lookup costs one dict access. Documents without one are hashed on
+the fly.
+
+Results with FUTURE_INVOICE_DATE are not cached: they depend on the day the
+check runs, not only on the invoice.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from typing import Any, Dict, Sequence
+
+from .gst_validator import GSTValidator
+
+# Everything validate_invoice reads, plus the category it is called with
+VALIDATED_FIELDS = ('invoice_number', 'invoice_date', 'recipient_gstin', 'supply_type', 'taxable_value',
+                    'gst_rate', 'cgst', 'sgst', 'igst', 'invoice_type')
+
+TIME_DEPENDENT_CODES = {"FUTURE_INVOICE_DATE"}
+
+
+class InvoiceValidationCache:
+    """In-process LRU of content hash -> validate_invoice errors"""
+
+    def __init__(self, max_entries: int = 200000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    @staticmethod
+    def content_hash(invoice: Dict[str, Any]) -> str:
+        """Stable hash of the fields validation depends on"""
+        values = [invoice.get(name) for name in VALIDATED_FIELDS]
+        raw = json.dumps(values, separators=(",", ":"), default=str)
+        return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+    def errors_for(self, invoice: Dict[str, Any]) -> Sequence[Dict[str, Any]]:
+        """
+        validate_invoice(invoice, invoice_type) through the cache
+
+        Returns:
+            Errors (a tuple shared with the cache; copy before changing them)
+        """
+        key = invoice.get('content_hash') or InvoiceValidationCache.content_hash(invoice)
+        errors = self._entries.get(key)
+        if errors is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return errors
+        self.misses += 1
+        errors = tuple(GSTValidator.validate_invoice(invoice, invoice.get('invoice_type', 'B2B')))
+        if self.max_entries > 0 and not any(err['code'] in TIME_DEPENDENT_CODES for err in errors):
+            self._entries[key] = errors
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return errors
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.misses = 0
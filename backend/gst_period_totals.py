@@ -0,0 +1,265 @@
+"""
+GSTR-1 Period Totals
+
+One document per (company, GSTIN, period) in `gst_period_totals` with the
+running GSTR-1 totals, so the draft status screen reads the summary in one
+lookup instead of summing every invoice of the period (validate_gstr1 and
+the filing record still sum the invoices they load):
+
+    {"id": "<company_id>:<gstin>:<period>", "company_id", "gstin", "period",
+     "invoice_count",
+     "totals": {"total_taxable_value", "total_cgst", "total_sgst",
+                "total_igst", "total_invoice_value"},
+     "categories": {"B2B": {"count", "rates": {"18": {"count", "taxable_value"}}}},
+     "seq", "writers", "built_at", "updated_at"}
+
+Rate keys are the rate with "." written as "_" ("0_25") since Mongo field
+names cannot contain dots.
+
+Maintained like the financial rollups: add_gst_invoice, the bulk import
+and delete_gst_invoice write inside gst_totals_write and $inc the
+contribution of the invoices they insert or delete (in the same
+transaction as the invoice write when GST_TRANSACTIONS is on). The same
+write fence as rollups.rollup_write (see write_fence.py) keeps
+rebuild_gst_totals from losing or double-counting writes that overlap it;
+the first read of a period (no built_at yet) builds it. Drift is found and
+repaired with:
+
+    python gst_period_totals.py check|rebuild [--company-id ID]
+"""
+
+import argparse
+import asyncio
+import logging
+import math
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from write_fence import FenceBusy, begin_write, end_write, fenced_rebuild
+
+logger = logging.getLogger(__name__)
+
+TOTALS_COLLECTION = "gst_period_totals"
+
+# summary total -> invoice field
+AMOUNT_FIELDS = {
+    "total_taxable_value": "taxable_value",
+    "total_cgst": "cgst",
+    "total_sgst": "sgst",
+    "total_igst": "igst",
+    "total_invoice_value": "total_value",
+}
+
+
+def _totals_id(company_id: str, gstin: str, period: str) -> str:
+    return f"{company_id}:{gstin}:{period}"
+
+
+def _on_insert(company_id: str, gstin: str, period: str) -> dict:
+    return {"company_id": company_id, "gstin": gstin, "period": period}
+
+
+def rate_key(rate) -> str:
+    return f"{float(rate or 0):g}".replace(".", "_")
+
+
+def _empty(company_id: str, gstin: str, period: str) -> dict:
+    return {
+        "id": _totals_id(company_id, gstin, period), "company_id": company_id, "gstin": gstin, "period": period,
+        "invoice_count": 0, "totals": {name: 0.0 for name in AMOUNT_FIELDS}, "categories": {},
+    }
+
+
+def _contribution(doc: dict, sign: int) -> Dict[str, float]:
+    """$inc paths an invoice adds to (sign=1) or removes from (sign=-1) the totals"""
+    category = doc.get("invoice_type") or "UNKNOWN"
+    rate = f"categories.{category}.rates.{rate_key(doc.get('gst_rate'))}"
+    inc = {
+        "invoice_count": sign,
+        f"categories.{category}.count": sign,
+        f"{rate}.count": sign,
+        f"{rate}.taxable_value": sign * (doc.get("taxable_value", 0) or 0),
+    }
+    for name, field in AMOUNT_FIELDS.items():
+        inc[f"totals.{name}"] = sign * (doc.get(field, 0) or 0)
+    return inc
+
+
+def _delta(added: Iterable[dict], removed: Iterable[dict]) -> Dict[str, float]:
+    inc: Dict[str, float] = {}
+    for docs, sign in ((added, 1), (removed, -1)):
+        for doc in docs:
+            for path, value in _contribution(doc, sign).items():
+                inc[path] = inc.get(path, 0) + value
+    return {path: value for path, value in inc.items() if value}
+
+
+class GSTTotalsWrite:
+    """One fenced write to a period's invoices, opened by gst_totals_write"""
+
+    def __init__(self, db, company_id: str, gstin: str, period: str, token: str):
+        self.db = db
+        self.id = _totals_id(company_id, gstin, period)
+        self.token = token
+        self.session = None
+        self.applied = False
+
+    async def apply(self, added: Iterable[dict] = (), removed: Iterable[dict] = (), session=None):
+        """
+        $inc the invoices in `added` and take out those in `removed`, closing
+        the fence in the same update. Call once; pass the session when the
+        invoice write runs in a transaction so both commit together.
+        """
+        update = {"$set": {"updated_at": datetime.now(timezone.utc).isoformat()}, "$unset": end_write(self.token)}
+        inc = _delta(added, removed)
+        if inc:
+            update["$inc"] = inc
+        await self.db[TOTALS_COLLECTION].update_one({"id": self.id}, update, session=session)
+        self.session = session
+        self.applied = True
+
+
+@asynccontextmanager
+async def gst_totals_write(db, company_id: str, gstin: str, period: str):
+    """
+    Fence one write to a period's invoices. Yields a GSTTotalsWrite whose
+    apply() records the change; if the block exits without it (or with the
+    transaction it was part of aborted), the fence is closed with no change.
+    """
+    token, _ = await begin_write(
+        db[TOTALS_COLLECTION], {"id": _totals_id(company_id, gstin, period)}, _on_insert(company_id, gstin, period)
+    )
+    write = GSTTotalsWrite(db, company_id, gstin, period, token)
+    try:
+        yield write
+    except BaseException:
+        if write.session is not None:
+            write.applied = False
+        raise
+    finally:
+        if not write.applied:
+            await write.apply()
+
+
+async def compute_gst_totals(db, company_id: str, gstin: str, period: str) -> dict:
+    """Totals document for a period, summed from gst_invoices (not stored)"""
+    group = {"_id": {"category": "$invoice_type", "rate": "$gst_rate"}, "count": {"$sum": 1}}
+    for name, field in AMOUNT_FIELDS.items():
+        group[name] = {"$sum": f"${field}"}
+    rows = await db.gst_invoices.aggregate([
+        {"$match": {"company_id": company_id, "gstin": gstin, "period": period}},
+        {"$group": group},
+    ]).to_list(None)
+
+    doc = _empty(company_id, gstin, period)
+    for row in rows:
+        category = row["_id"].get("category") or "UNKNOWN"
+        bucket = doc["categories"].setdefault(category, {"count": 0, "rates": {}})
+        rate = bucket["rates"].setdefault(rate_key(row["_id"].get("rate")), {"count": 0, "taxable_value": 0.0})
+        doc["invoice_count"] += row["count"]
+        bucket["count"] += row["count"]
+        rate["count"] += row["count"]
+        rate["taxable_value"] += row["total_taxable_value"]
+        for name in AMOUNT_FIELDS:
+            doc["totals"][name] += row[name]
+    return doc
+
+
+async def rebuild_gst_totals(db, company_id: str, gstin: str, period: str) -> dict:
+    """
+    Recompute a period's totals from gst_invoices and store them once no
+    write overlaps the aggregation.
+
+    Raises:
+        FenceBusy: writes overlapped every attempt (nothing was stored)
+    """
+    async def compute(fence: dict) -> dict:
+        return await compute_gst_totals(db, company_id, gstin, period)
+
+    return await fenced_rebuild(
+        db[TOTALS_COLLECTION], {"id": _totals_id(company_id, gstin, period)}, _on_insert(company_id, gstin, period),
+        compute, f"GST totals for {company_id}:{gstin}:{period}"
+    )
+
+
+async def get_gst_totals(db, company_id: str, gstin: str, period: str) -> dict:
+    """
+    The period's totals document, built on first use. While writes keep
+    the first build from being stored, the totals are summed for each read.
+    """
+    doc = await db[TOTALS_COLLECTION].find_one({"id": _totals_id(company_id, gstin, period)}, {"_id": 0})
+    if doc is None or "built_at" not in doc:
+        try:
+            doc = await rebuild_gst_totals(db, company_id, gstin, period)
+        except FenceBusy as e:
+            logger.warning(f"{e}; serving unstored totals")
+            doc = await compute_gst_totals(db, company_id, gstin, period)
+    return doc
+
+
+def _drift(stored: dict, actual: dict, path: str = "") -> list:
+    """Paths where two totals documents disagree (money compared to the paisa)"""
+    differences = []
+    for key in set(stored) | set(actual):
+        if key in ("_id", "updated_at", "built_at", "seq", "writers"):
+            continue
+        a, b = stored.get(key), actual.get(key)
+        if isinstance(a, dict) or isinstance(b, dict):
+            differences += _drift(a or {}, b or {}, f"{path}{key}.")
+        elif isinstance(a, (int, float)) or isinstance(b, (int, float)):
+            if not math.isclose(a or 0, b or 0, abs_tol=0.005):
+                differences.append(f"{path}{key}: stored {a}, actual {b}")
+        elif a != b:
+            differences.append(f"{path}{key}: stored {a}, actual {b}")
+    return differences
+
+
+async def _maintenance_command(command: str, company_id: Optional[str]):
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    try:
+        match = {"company_id": company_id} if company_id else {}
+        periods = {(row["_id"]["company_id"], row["_id"]["gstin"], row["_id"]["period"]) for row in
+                   await db.gst_invoices.aggregate([
+                       {"$match": match},
+                       {"$group": {"_id": {"company_id": "$company_id", "gstin": "$gstin", "period": "$period"}}}
+                   ]).to_list(None)}
+        stored = {(doc["company_id"], doc["gstin"], doc["period"]): doc
+                  for doc in await db[TOTALS_COLLECTION].find(match, {"_id": 0}).to_list(None)}
+        drifted = failed = 0
+        for key in sorted(periods | set(stored)):
+            if command == "rebuild":
+                try:
+                    await rebuild_gst_totals(db, *key)
+                except FenceBusy as e:
+                    failed += 1
+                    logger.error(f"{e}; not rebuilt, run again later")
+                continue
+            if "built_at" not in stored.get(key, {}):
+                continue  # built on first read
+            differences = _drift(stored[key], await compute_gst_totals(db, *key))
+            if differences:
+                drifted += 1
+                logger.warning(f"GST totals for {':'.join(key)} drifted: {'; '.join(sorted(differences))}")
+        if command == "rebuild":
+            logger.info(f"Rebuilt GST totals for {len(periods | set(stored)) - failed} periods, {failed} busy")
+        else:
+            logger.info(f"Checked {sum('built_at' in doc for doc in stored.values())} periods, {drifted} drifted")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="GSTR-1 period totals maintenance")
+    parser.add_argument("command", choices=["check", "rebuild"])
+    parser.add_argument("--company-id", help="only this company (default: all companies)")
+    args = parser.parse_args()
+    asyncio.run(_maintenance_command(args.command, args.company_id))
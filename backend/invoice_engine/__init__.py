@@ -0,0 +1,15 @@
+"""Invoice Analysis Engine
+
+Deterministic, local checks for sales invoices:
+1. Anomaly Engine - arithmetic, duplicates, per-customer amount outliers
+2. Reconciliation - match bank receipts to open invoices
+"""
+
+from .anomaly_engine import InvoiceAnomalyEngine, CustomerStats
+from .reconciliation import ReceivablesReconciler
+
+__all__ = [
+    'InvoiceAnomalyEngine',
+    'CustomerStats',
+    'ReceivablesReconciler'
+]
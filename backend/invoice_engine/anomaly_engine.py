@@ -0,0 +1,190 @@
+"""
+Invoice Anomaly Engine
+
+Cheap, deterministic analysis run on every invoice before (and usually
+instead of) the LLM.
+
+Checks:
+1. Arithmetic - item amount = quantity x unit price, items sum to subtotal,
+   subtotal + tax = total, no negative amounts
+2. Duplicates - another invoice with the same number (looked up by the
+   caller on the indexed company_id + invoice_number)
+3. Outliers - invoice total against the customer's amount history
+   (mean / standard deviation, z-score), and large first invoices for
+   customers with little history against the company-wide history
+
+Amount history is kept as count / sum / sum of squares so it can be
+maintained with atomic $inc on every insert, update and delete.
+
+The result says whether the engine is `uncertain` (borderline z-score, or
+no usable history at all); only then is the LLM worth consulting.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+
+AMOUNT_TOLERANCE = 0.01          # rupees; rounding slack for arithmetic checks
+MIN_HISTORY = 5                  # invoices needed before a customer's stats are trusted
+Z_OUTLIER = 3.0                  # |z| at or above this is flagged
+Z_BORDERLINE = 2.0               # |z| in [Z_BORDERLINE, Z_OUTLIER) is uncertain
+NEW_CUSTOMER_MULTIPLE = 5.0      # first invoices above this x company mean are flagged
+
+
+@dataclass
+class CustomerStats:
+    """Amount history for one customer (or the whole company)"""
+    count: int = 0
+    total: float = 0.0
+    total_sq: float = 0.0
+
+    @classmethod
+    def from_doc(cls, doc: Optional[Dict[str, Any]]) -> 'CustomerStats':
+        if not doc:
+            return cls()
+        return cls(doc.get('count', 0), doc.get('sum', 0.0), doc.get('sum_sq', 0.0))
+
+    @staticmethod
+    def increments(amount: float, sign: int = 1) -> Dict[str, float]:
+        """$inc document adding (sign=1) or removing (sign=-1) one invoice amount"""
+        return {'count': sign, 'sum': sign * amount, 'sum_sq': sign * amount * amount}
+
+    def without(self, amount: float) -> 'CustomerStats':
+        """These stats minus one invoice (the one being analysed, already recorded)"""
+        if self.count <= 0:
+            return CustomerStats()
+        return CustomerStats(self.count - 1, self.total - amount, self.total_sq - amount * amount)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def stddev(self) -> float:
+        if self.count < 2:
+            return 0.0
+        # Sample variance; clamp float noise from the running sums
+        variance = (self.total_sq - self.count * self.mean ** 2) / (self.count - 1)
+        return math.sqrt(max(variance, 0.0))
+
+
+class InvoiceAnomalyEngine:
+    """Local invoice verification and anomaly detection"""
+
+    @staticmethod
+    def check_arithmetic(invoice: Dict[str, Any]) -> List[str]:
+        """
+        Verify invoice arithmetic
+
+        Returns:
+            List of human-readable issues (empty if the invoice adds up)
+        """
+        issues = []
+        items = invoice.get('items') or []
+
+        items_total = 0.0
+        for n, item in enumerate(items, 1):
+            quantity = item.get('quantity', 0) or 0
+            unit_price = item.get('unit_price', 0) or 0
+            amount = item.get('amount', 0) or 0
+            if quantity < 0 or unit_price < 0 or amount < 0:
+                issues.append(f"Item {n} ({item.get('description', '')}) has a negative quantity, price or amount")
+            if abs(quantity * unit_price - amount) > AMOUNT_TOLERANCE:
+                issues.append(
+                    f"Item {n} ({item.get('description', '')}): {quantity} x {unit_price} = "
+                    f"{quantity * unit_price:.2f}, but amount is {amount:.2f}"
+                )
+            items_total += amount
+
+        subtotal = invoice.get('subtotal', 0) or 0
+        tax = invoice.get('tax', 0) or 0
+        total = invoice.get('total', 0) or 0
+
+        if items and abs(items_total - subtotal) > AMOUNT_TOLERANCE:
+            issues.append(f"Items sum to {items_total:.2f}, but subtotal is {subtotal:.2f}")
+        if abs(subtotal + tax - total) > AMOUNT_TOLERANCE:
+            issues.append(f"Subtotal {subtotal:.2f} + tax {tax:.2f} = {subtotal + tax:.2f}, but total is {total:.2f}")
+        if tax < 0 or total < 0:
+            issues.append("Tax and total must not be negative")
+
+        return issues
+
+    @staticmethod
+    def check_outlier(amount: float, customer: CustomerStats, company: CustomerStats) -> Dict[str, Any]:
+        """
+        Compare an invoice amount with the customer's (or company's) history
+
+        Returns:
+            {"anomalies": [...], "uncertain": bool, "z_score": float or None}
+        """
+        anomalies = []
+        uncertain = False
+        z_score = None
+
+        if customer.count >= MIN_HISTORY:
+            stddev = customer.stddev
+            if stddev > 0:
+                z_score = (amount - customer.mean) / stddev
+                if abs(z_score) >= Z_OUTLIER:
+                    anomalies.append(
+                        f"Amount {amount:.2f} is {abs(z_score):.1f} standard deviations from this customer's "
+                        f"average of {customer.mean:.2f} over {customer.count} invoices"
+                    )
+                elif abs(z_score) >= Z_BORDERLINE:
+                    uncertain = True
+            elif abs(amount - customer.mean) > AMOUNT_TOLERANCE:
+                # Every past invoice had the same amount; any change is worth a look
+                uncertain = True
+        elif company.count >= MIN_HISTORY:
+            if company.mean > 0 and amount > NEW_CUSTOMER_MULTIPLE * company.mean:
+                anomalies.append(
+                    f"Amount {amount:.2f} for a customer with {customer.count} previous invoices is more than "
+                    f"{NEW_CUSTOMER_MULTIPLE:.0f}x the company average of {company.mean:.2f}"
+                )
+        else:
+            # No usable history anywhere (new tenant)
+            uncertain = True
+
+        return {"anomalies": anomalies, "uncertain": uncertain, "z_score": z_score}
+
+    @staticmethod
+    def analyze(invoice: Dict[str, Any],
+                duplicate: Optional[Dict[str, Any]],
+                customer: CustomerStats,
+                company: CustomerStats) -> Dict[str, Any]:
+        """
+        Full local analysis
+
+        Args:
+            invoice: Invoice document
+            duplicate: Another invoice with the same number, if any
+            customer: Customer amount history, excluding this invoice
+            company: Company-wide amount history, excluding this invoice
+
+        Returns:
+            Dict shaped like AIAnalysisResult plus `uncertain` and `z_score`
+        """
+        calculation_issues = InvoiceAnomalyEngine.check_arithmetic(invoice)
+        outlier = InvoiceAnomalyEngine.check_outlier(invoice.get('total', 0) or 0, customer, company)
+
+        recommendations = []
+        if duplicate:
+            recommendations.append(f"Check whether this duplicates invoice {duplicate.get('invoice_number')}")
+        if calculation_issues:
+            recommendations.append("Correct the invoice arithmetic before sending")
+        if outlier["anomalies"]:
+            recommendations.append("Confirm the amount with the customer")
+
+        return {
+            "is_duplicate": duplicate is not None,
+            "duplicate_invoice_id": duplicate.get('id') if duplicate else None,
+            "calculation_verified": not calculation_issues,
+            "calculation_issues": calculation_issues,
+            "anomaly_detected": bool(outlier["anomalies"]),
+            "anomaly_details": outlier["anomalies"],
+            "recommendations": recommendations,
+            "confidence_score": 0.6 if outlier["uncertain"] else 0.95,
+            "uncertain": outlier["uncertain"],
+            "z_score": outlier["z_score"]
+        }
@@ -0,0 +1,200 @@
+"""
+Receivables Reconciliation
+
+Matches bank receipts (amount, date, reference, payer) to open invoices.
+
+The open invoices are indexed once per run, in memory:
+- by normalised invoice number (receipt references such as "NEFT INV-2025/001")
+- by normalised customer name (receipt payer)
+- by outstanding amount, sorted, so a tolerance window is a bisect
+
+Receipts are matched in three passes, strongest first, so a weak match can
+never take an invoice a stronger one needs:
+1. Reference  - the reference names an open invoice (full or partial payment)
+2. Payer      - the payer is a customer; prefer an invoice whose outstanding
+                amount matches, else the oldest one the receipt fits (partial)
+3. Amount     - exactly one open invoice has a matching outstanding amount
+                (several: reported as ambiguous with the candidates)
+
+Only invoices due within `date_window_days` of the receipt date are
+considered, and every invoice is matched at most once per run.
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+# Words dropped when comparing payer and customer names
+NAME_STOPWORDS = {"m", "s", "ms", "mr", "mrs", "pvt", "private", "ltd", "limited", "llp", "inc", "co", "company", "the"}
+
+CONFIDENCE = {
+    "reference": 0.99,
+    "payer": 0.9,
+    "payer_partial": 0.75,
+    "amount": 0.6,
+}
+
+MAX_CANDIDATES = 5
+REFERENCE_PARTS = 6
+
+
+def normalize_reference(value: str) -> str:
+    return re.sub(r"[^A-Z0-9]", "", value.upper())
+
+
+def normalize_name(value: Optional[str]) -> str:
+    words = re.findall(r"[a-z0-9]+", (value or "").lower())
+    return " ".join(word for word in words if word not in NAME_STOPWORDS)
+
+
+def _day(value) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    if isinstance(value, str) and value:
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00")).date()
+        except ValueError:
+            return None
+    return None
+
+
+def _paise(amount: float) -> int:
+    return int(round(amount * 100))
+
+
+class ReceivablesReconciler:
+    """In-memory index over one company's open invoices"""
+
+    def __init__(self, invoices: List[Dict[str, Any]], amount_tolerance: float = 1.0, date_window_days: int = 90):
+        """
+        Args:
+            invoices: Open invoice documents (id, invoice_number, customer_id,
+                customer_name, total, paid_amount, due_date)
+            amount_tolerance: Largest difference (rupees) still counted as the same amount
+            date_window_days: Largest distance between receipt date and due date
+        """
+        self.tolerance = _paise(amount_tolerance)
+        self.window = timedelta(days=date_window_days)
+        self.invoices = []
+        self.by_reference: Dict[str, int] = {}
+        self.by_customer: Dict[str, List[int]] = {}
+        for invoice in invoices:
+            outstanding = _paise((invoice.get("total", 0) or 0) - (invoice.get("paid_amount", 0) or 0))
+            if outstanding <= 0:
+                continue
+            n = len(self.invoices)
+            self.invoices.append({**invoice, "outstanding": outstanding, "due": _day(invoice.get("due_date"))})
+            self.by_reference.setdefault(normalize_reference(invoice.get("invoice_number", "")), n)
+            self.by_customer.setdefault(normalize_name(invoice.get("customer_name")), []).append(n)
+        for indexes in self.by_customer.values():
+            indexes.sort(key=lambda n: self.invoices[n]["due"] or date.max)  # oldest due first
+        self.by_amount = sorted((inv["outstanding"], n) for n, inv in enumerate(self.invoices))
+        self.amount_keys = [amount for amount, _ in self.by_amount]
+        self.matched = set()
+
+    def _in_window(self, n: int, when: Optional[date]) -> bool:
+        due = self.invoices[n]["due"]
+        return when is None or due is None or abs(when - due) <= self.window
+
+    def _fits(self, n: int, amount: int) -> bool:
+        return amount <= self.invoices[n]["outstanding"] + self.tolerance
+
+    def _exact(self, n: int, amount: int) -> bool:
+        return abs(self.invoices[n]["outstanding"] - amount) <= self.tolerance
+
+    def _by_reference(self, receipt: dict, amount: int, when: Optional[date]) -> Optional[int]:
+        # Invoice numbers are looked up as every run of up to REFERENCE_PARTS consecutive
+        # alphanumeric parts ("NEFT/ACME/INV-2026/002" -> "NEFTACME...", ..., "INV2026002", ...)
+        parts = re.findall(r"[A-Za-z0-9]+", (receipt.get("reference") or "").upper())
+        for start in range(len(parts)):
+            for end in range(min(len(parts), start + REFERENCE_PARTS), start, -1):
+                n = self.by_reference.get("".join(parts[start:end]))
+                if n is not None and n not in self.matched and self._fits(n, amount) and self._in_window(n, when):
+                    return n
+        return None
+
+    def _by_payer(self, receipt: dict, amount: int, when: Optional[date]):
+        name = normalize_name(receipt.get("payer"))
+        if not name:
+            return None, None
+        candidates = [
+            n for n in self.by_customer.get(name, [])
+            if n not in self.matched and self._fits(n, amount) and self._in_window(n, when)
+        ]
+        if not candidates:
+            return None, None
+        for n in candidates:
+            if self._exact(n, amount):
+                return n, "payer"
+        return candidates[0], "payer_partial"
+
+    def _by_amount(self, amount: int, when: Optional[date]) -> List[int]:
+        lo = bisect_left(self.amount_keys, amount - self.tolerance)
+        hi = bisect_right(self.amount_keys, amount + self.tolerance)
+        return [n for _, n in self.by_amount[lo:hi] if n not in self.matched and self._in_window(n, when)]
+
+    def _proposal(self, index: int, receipt: dict, n: int, match: str) -> dict:
+        invoice = self.invoices[n]
+        self.matched.add(n)
+        amount = _paise(receipt["amount"])
+        return {
+            "receipt_index": index,
+            "reference": receipt.get("reference"),
+            "status": "matched",
+            "match": match,
+            "confidence": CONFIDENCE[match],
+            "invoice_id": invoice["id"],
+            "invoice_number": invoice.get("invoice_number"),
+            "customer_id": invoice.get("customer_id"),
+            "customer_name": invoice.get("customer_name"),
+            "amount": receipt["amount"],
+            "outstanding": invoice["outstanding"] / 100,
+            "partial": amount < invoice["outstanding"] - self.tolerance,
+        }
+
+    def _candidate(self, n: int) -> dict:
+        invoice = self.invoices[n]
+        return {"invoice_id": invoice["id"], "invoice_number": invoice.get("invoice_number"),
+                "customer_name": invoice.get("customer_name"), "outstanding": invoice["outstanding"] / 100}
+
+    def match(self, receipts: List[Dict[str, Any]]) -> List[dict]:
+        """
+        Match receipts (dicts with amount, date, reference, payer) to invoices
+
+        Returns:
+            One result per receipt, in input order: status "matched" (with the
+            invoice, match kind and confidence), "ambiguous" (with candidates)
+            or "unmatched"
+        """
+        results: List[Optional[dict]] = [None] * len(receipts)
+        keys = [(_paise(r["amount"]), _day(r.get("date"))) for r in receipts]
+
+        for i, receipt in enumerate(receipts):
+            n = self._by_reference(receipt, *keys[i])
+            if n is not None:
+                results[i] = self._proposal(i, receipt, n, "reference")
+
+        for i, receipt in enumerate(receipts):
+            if results[i] is None and receipt.get("payer"):
+                n, match = self._by_payer(receipt, *keys[i])
+                if n is not None:
+                    results[i] = self._proposal(i, receipt, n, match)
+
+        for i, receipt in enumerate(receipts):
+            if results[i] is not None:
+                continue
+            candidates = self._by_amount(*keys[i])
+            if len(candidates) == 1:
+                results[i] = self._proposal(i, receipt, candidates[0], "amount")
+            else:
+                results[i] = {
+                    "receipt_index": i,
+                    "reference": receipt.get("reference"),
+                    "status": "ambiguous" if candidates else "unmatched",
+                    "amount": receipt["amount"],
+                    "candidates": [self._candidate(n) for n in candidates[:MAX_CANDIDATES]],
+                }
+        return results
@@ -0,0 +1,287 @@
+"""
+Bulk Invoice Import
+
+Row parsing for POST /invoices/import. Files are read incrementally (CSV
+through csv.reader, JSON Lines one line at a time, a JSON array one element
+at a time), so an import of tens of thousands of invoices never has to be
+held in memory; the route validates and inserts them in batches.
+
+CSV: one line item per row; consecutive rows with the same invoice_number
+form one invoice. Columns (header names are case-insensitive):
+
+    invoice_number, customer_id | customer_email | customer_name,
+    issue_date, due_date, description, quantity, unit_price,
+    [amount], [tax], [status], [paid_amount], [notes]
+
+Invoice-level columns (customer, dates, tax, status, paid_amount, notes)
+are taken from the invoice's first row.
+
+JSON Lines: one invoice object per line, shaped like InvoiceCreate, with
+customer_id optional when customer_email or customer_name is given and
+amount / subtotal / total optional (computed from the items).
+
+JSON: a top-level array of the same objects; `row` is the element's
+position in the array. Decoding stops at the first malformed element.
+
+Dates may be ISO 8601, DD-MM-YYYY, DD/MM/YYYY or D-Mon-YYYY (Tally).
+
+POST /gst/{gstin}/{period}/invoices/import reads the same formats with
+group_items=False: one GSTR-1 invoice per CSV row, JSON line or array element, with the
+GSTInvoiceCreate fields as columns.
+"""
+
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from itertools import islice
+from typing import IO, Iterable, Iterator, List, Optional
+
+IMPORT_FORMATS = ("csv", "jsonl", "json")
+JSON_CHUNK_SIZE = 1 << 16
+
+INVOICE_COLUMNS = ("invoice_number", "customer_id", "customer_email", "customer_name",
+                   "issue_date", "due_date", "tax", "status", "paid_amount", "notes")
+ITEM_COLUMNS = ("description", "quantity", "unit_price", "amount")
+
+DATE_FORMATS = ("%d-%m-%Y", "%d/%m/%Y", "%d-%b-%Y", "%d-%b-%y")
+
+
+@dataclass
+class ImportRow:
+    """One invoice read from an import file"""
+    row: int                     # line of the file the invoice starts on
+    data: dict
+    errors: List[str] = field(default_factory=list)
+
+    def report(self) -> dict:
+        return {"row": self.row, "invoice_number": self.data.get("invoice_number"), "errors": self.errors}
+
+
+def detect_format(filename: Optional[str], content_type: Optional[str]) -> Optional[str]:
+    name = (filename or "").lower()
+    if name.endswith(".csv") or content_type in ("text/csv", "application/vnd.ms-excel"):
+        return "csv"
+    if name.endswith((".jsonl", ".ndjson")) or content_type in ("application/x-ndjson", "application/jsonl"):
+        return "jsonl"
+    if name.endswith(".json") or content_type == "application/json":
+        return "json"
+    return None
+
+
+def _header(name: str) -> str:
+    return name.strip().lower().replace(" ", "_")
+
+
+def _cell(value) -> Optional[str]:
+    if value is None:
+        return None
+    value = value.strip()
+    return value or None
+
+
+def iter_csv_invoices(stream: IO[bytes]) -> Iterator[ImportRow]:
+    reader = csv.reader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = [_header(name) for name in header]
+
+    current: Optional[ImportRow] = None
+    for values in reader:
+        if not any(v.strip() for v in values):
+            continue
+        cells = {column: _cell(value) for column, value in zip(columns, values)}
+        number = cells.get("invoice_number")
+        item = {key: cells.get(key) for key in ITEM_COLUMNS if cells.get(key) is not None}
+
+        if current is not None and number is not None and number == current.data.get("invoice_number"):
+            current.data["items"].append(item)
+            continue
+        if current is not None:
+            yield current
+        data = {key: cells[key] for key in INVOICE_COLUMNS if cells.get(key) is not None}
+        data["items"] = [item]
+        current = ImportRow(row=reader.line_num, data=data)
+    if current is not None:
+        yield current
+
+
+def iter_csv_rows(stream: IO[bytes]) -> Iterator[ImportRow]:
+    """One record per CSV row, keyed by normalised header (GST invoices have no line items)"""
+    reader = csv.reader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = [_header(name) for name in header]
+    for values in reader:
+        if not any(v.strip() for v in values):
+            continue
+        cells = {column: _cell(value) for column, value in zip(columns, values)}
+        yield ImportRow(row=reader.line_num, data={k: v for k, v in cells.items() if v is not None})
+
+
+def iter_jsonl_invoices(stream: IO[bytes]) -> Iterator[ImportRow]:
+    for line_number, line in enumerate(io.TextIOWrapper(stream, encoding="utf-8-sig"), 1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield ImportRow(row=line_number, data={}, errors=[f"Invalid JSON: {e.msg}"])
+            continue
+        if not isinstance(data, dict):
+            yield ImportRow(row=line_number, data={}, errors=["Each line must be a JSON object"])
+            continue
+        yield ImportRow(row=line_number, data=data)
+
+
+def iter_json_array_invoices(stream: IO[bytes]) -> Iterator[ImportRow]:
+    """Elements of a top-level JSON array, decoded one at a time from JSON_CHUNK_SIZE reads"""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig")
+    decoder = json.JSONDecoder()
+    buffer, eof = "", False
+
+    def peek() -> Optional[str]:
+        """Drop leading whitespace (reading more as needed); next character or None at the end"""
+        nonlocal buffer, eof
+        buffer = buffer.lstrip()
+        while not buffer and not eof:
+            chunk = text.read(JSON_CHUNK_SIZE)
+            eof = not chunk
+            buffer = chunk.lstrip()
+        return buffer[:1] or None
+
+    if peek() is None:
+        return
+    if peek() != "[":
+        yield ImportRow(row=1, data={}, errors=["Expected a JSON array of invoice objects"])
+        return
+    buffer = buffer[1:]
+
+    position = 0
+    while True:
+        char = peek()
+        if char == "]":
+            return
+        if position:
+            if char != ",":
+                yield ImportRow(row=position + 1, data={}, errors=["Invalid JSON: expected ',' between elements"])
+                return
+            buffer = buffer[1:]
+            char = peek()
+        if char is None:
+            yield ImportRow(row=position + 1, data={}, errors=["Invalid JSON: unexpected end of file"])
+            return
+
+        position += 1
+        while True:
+            try:
+                data, end = decoder.raw_decode(buffer)
+                # A value that ends with the buffer (a number) may continue in the next chunk
+                if end < len(buffer) or eof:
+                    break
+            except json.JSONDecodeError as e:
+                if eof:
+                    yield ImportRow(row=position, data={}, errors=[f"Invalid JSON: {e.msg}"])
+                    return
+            chunk = text.read(JSON_CHUNK_SIZE)
+            eof = not chunk
+            buffer += chunk
+        buffer = buffer[end:]
+        if not isinstance(data, dict):
+            yield ImportRow(row=position, data={}, errors=["Each array element must be a JSON object"])
+            continue
+        yield ImportRow(row=position, data=data)
+
+
+def iter_import_rows(stream: IO[bytes], fmt: str, group_items: bool = True) -> Iterator[ImportRow]:
+    if fmt == "csv":
+        return iter_csv_invoices(stream) if group_items else iter_csv_rows(stream)
+    if fmt == "json":
+        return iter_json_array_invoices(stream)
+    return iter_jsonl_invoices(stream)
+
+
+def batched(rows: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(rows)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _date(value):
+    """ISO or Tally/Excel date -> datetime; dates without an offset are taken as UTC"""
+    if not isinstance(value, str):
+        return value
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised date '{value}'")
+
+
+def _number(value, name: str) -> float:
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    try:
+        return float(str(value).replace(",", ""))
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be a number, got '{value}'")
+
+
+def normalize_invoice(data: dict) -> List[str]:
+    """
+    Parse numbers and dates and fill computed amounts, in place.
+
+    Returns:
+        List of errors (empty if the row can go on to model validation)
+    """
+    errors = []
+    items = data.get("items")
+    if not isinstance(items, list) or not items:
+        return ["Invoice has no items"]
+
+    for n, item in enumerate(items, 1):
+        if not isinstance(item, dict):
+            errors.append(f"Item {n}: must be an object")
+            continue
+        try:
+            item["quantity"] = _number(item.get("quantity", 1), "quantity")
+            if item.get("unit_price") is None and item.get("amount") is not None and item["quantity"]:
+                item["unit_price"] = _number(item["amount"], "amount") / item["quantity"]
+            item["unit_price"] = _number(item.get("unit_price"), "unit_price")
+            if item.get("amount") is None:
+                item["amount"] = round(item["quantity"] * item["unit_price"], 2)
+            else:
+                item["amount"] = _number(item["amount"], "amount")
+        except ValueError as e:
+            errors.append(f"Item {n}: {e}")
+    if errors:
+        return errors
+
+    try:
+        data["tax"] = _number(data.get("tax", 0), "tax")
+        data["subtotal"] = _number(data["subtotal"], "subtotal") if data.get("subtotal") is not None \
+            else round(sum(item["amount"] for item in items), 2)
+        data["total"] = _number(data["total"], "total") if data.get("total") is not None \
+            else round(data["subtotal"] + data["tax"], 2)
+        if data.get("paid_amount") is not None:
+            data["paid_amount"] = _number(data["paid_amount"], "paid_amount")
+    except ValueError as e:
+        errors.append(str(e))
+
+    if isinstance(data.get("status"), str):
+        data["status"] = data["status"].strip().lower()
+    for name in ("issue_date", "due_date"):
+        try:
+            data[name] = _date(data.get(name))
+        except ValueError as e:
+            errors.append(f"{name}: {e}")
+    return errors
@@ -0,0 +1,200 @@
+"""
+Per-Customer Invoice Statistics
+
+Running amount statistics per customer in `customer_invoice_stats`, read by
+the local anomaly engine (invoice_engine) instead of scanning invoice history.
+One company-wide document (customer_id "*") heads the customer documents of
+the build it points to:
+
+    {"id": "<company_id>:*", "company_id", "customer_id": "*",
+     "count", "sum", "sum_sq", "build", "generation",
+     "seq", "writers", "built_at", "updated_at"}
+    {"id": "<company_id>:<build>:<customer_id>", "company_id", "customer_id",
+     "build", "generation", "count", "sum", "sum_sq", "updated_at"}
+
+count / sum / sum_sq give mean and standard deviation of invoice totals.
+
+Maintained like the financial rollups: every invoice write runs inside
+invoice_stats_write and reports the document before and after, and the
+difference is $inc'ed into the company-wide document and the customer's
+document of the current build. The company-wide document holds the write
+fence (see write_fence.py): rebuild_invoice_stats writes the customer
+documents of a new build, then switches the head to it only if no write
+overlapped, and drops older builds afterwards. The first analysis (no
+built_at yet) builds the statistics.
+"""
+
+import logging
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from invoice_engine import CustomerStats
+from write_fence import FenceBusy, begin_write, end_write, fenced_rebuild, mark_unbuilt
+
+logger = logging.getLogger(__name__)
+
+STATS_COLLECTION = "customer_invoice_stats"
+COMPANY_WIDE = "*"
+STAT_FIELDS = ("count", "sum", "sum_sq")
+
+
+def _stats_id(company_id: str) -> str:
+    return f"{company_id}:{COMPANY_WIDE}"
+
+
+def _customer_stats_id(company_id: str, build: str, customer_id: str) -> str:
+    return f"{company_id}:{build}:{customer_id}"
+
+
+def _on_insert(company_id: str) -> dict:
+    return {"company_id": company_id, "customer_id": COMPANY_WIDE}
+
+
+def _merge(target: Dict[str, Dict[str, float]], customer_id: str, inc: Dict[str, float]):
+    bucket = target.setdefault(customer_id, {})
+    for path, value in inc.items():
+        bucket[path] = bucket.get(path, 0) + value
+
+
+@asynccontextmanager
+async def invoice_stats_write(db, company_id: str, changes: List[Tuple[str, Optional[dict], Optional[dict]]]):
+    """
+    Fence one invoice write. The caller appends (kind, before, after) to
+    `changes` once the invoice changed (entries of other kinds are ignored);
+    the deltas are applied when the block exits, also if it raised.
+    """
+    token, head = await begin_write(
+        db[STATS_COLLECTION], {"id": _stats_id(company_id)}, _on_insert(company_id), fields=("build", "generation")
+    )
+    try:
+        yield
+    finally:
+        await apply_invoice_stats_delta(db, company_id, token, head, [
+            (before, after) for kind, before, after in changes if kind == "invoices"
+        ])
+
+
+async def apply_invoice_stats_delta(db, company_id: str, token: str, head: dict,
+                                    changes: List[Tuple[Optional[dict], Optional[dict]]]):
+    """
+    Move each invoice's amount from `before` to `after` (None for
+    insert/delete) in the customer documents of the build the write began
+    on, then close the invoice_stats_write holding `token`.
+    """
+    deltas: Dict[str, Dict[str, float]] = {}
+    for before, after in changes:
+        for doc, sign in ((before, -1), (after, 1)):
+            if not doc:
+                continue
+            inc = CustomerStats.increments(doc.get("total", 0) or 0, sign)
+            _merge(deltas, COMPANY_WIDE, inc)
+            _merge(deltas, doc.get("customer_id") or "", inc)
+
+    now = datetime.now(timezone.utc).isoformat()
+    company_inc = {path: value for path, value in deltas.pop(COMPANY_WIDE, {}).items() if value}
+    build = head.get("build")
+    for customer_id, inc in deltas.items():
+        inc = {path: value for path, value in inc.items() if value}
+        if not inc or build is None:
+            continue
+        await db[STATS_COLLECTION].update_one(
+            {"id": _customer_stats_id(company_id, build, customer_id)},
+            {"$inc": inc, "$set": {"updated_at": now},
+             "$setOnInsert": {"company_id": company_id, "customer_id": customer_id,
+                              "build": build, "generation": head.get("generation")}},
+            upsert=True
+        )
+
+    update = {"$set": {"updated_at": now}, "$unset": end_write(token)}
+    if company_inc:
+        update["$inc"] = company_inc
+    await db[STATS_COLLECTION].update_one({"id": _stats_id(company_id)}, update)
+
+
+async def _customer_totals(db, company_id: str) -> list:
+    return await db.invoices.aggregate([
+        {"$match": {"company_id": company_id}},
+        {"$group": {
+            "_id": "$customer_id",
+            "count": {"$sum": 1},
+            "sum": {"$sum": "$total"},
+            "sum_sq": {"$sum": {"$multiply": ["$total", "$total"]}}
+        }}
+    ]).to_list(None)
+
+
+async def rebuild_invoice_stats(db, company_id: str) -> dict:
+    """
+    Recompute a company's statistics from the invoices collection as a new
+    build and switch to it once no write overlaps the aggregation.
+
+    Returns:
+        The company-wide statistics
+
+    Raises:
+        FenceBusy: writes overlapped every attempt (the current build is kept)
+    """
+    async def compute(fence: dict) -> dict:
+        build, generation = uuid.uuid4().hex, fence["seq"]
+        now = datetime.now(timezone.utc).isoformat()
+        company = {**_on_insert(company_id), **{field: 0 for field in STAT_FIELDS},
+                   "build": build, "generation": generation}
+        docs = []
+        for row in await _customer_totals(db, company_id):
+            customer_id = row["_id"] or ""
+            docs.append({"id": _customer_stats_id(company_id, build, customer_id), "company_id": company_id,
+                         "customer_id": customer_id, "build": build, "generation": generation,
+                         **{field: row[field] for field in STAT_FIELDS}, "updated_at": now})
+            for field in STAT_FIELDS:
+                company[field] += row[field]
+        if docs:
+            await db[STATS_COLLECTION].insert_many(docs, ordered=False)
+        return company
+
+    company = await fenced_rebuild(
+        db[STATS_COLLECTION], {"id": _stats_id(company_id)}, _on_insert(company_id),
+        compute, f"Invoice statistics for {company_id}"
+    )
+    # Earlier builds, and those of attempts that lost to this one
+    await db[STATS_COLLECTION].delete_many({
+        "company_id": company_id, "customer_id": {"$ne": COMPANY_WIDE},
+        "build": {"$ne": company["build"]}, "generation": {"$not": {"$gt": company["generation"]}}
+    })
+    return company
+
+
+async def refresh_invoice_stats(db, company_id: str):
+    """
+    Rebuild after a bulk write that bypassed the deltas (made inside an
+    invoice_stats_write). If writes keep the rebuild from being stored, the
+    next analysis rebuilds.
+    """
+    try:
+        await rebuild_invoice_stats(db, company_id)
+    except FenceBusy as e:
+        logger.warning(f"{e}; left for the next read")
+        await mark_unbuilt(db[STATS_COLLECTION], {"id": _stats_id(company_id)})
+
+
+async def get_invoice_stats(db, company_id: str, customer_id: str) -> Tuple[CustomerStats, CustomerStats]:
+    """
+    (customer, company-wide) statistics, building the company's stats on
+    first use. While writes keep the first build from being stored, both are
+    summed from the invoices for each read.
+    """
+    company = await db[STATS_COLLECTION].find_one({"id": _stats_id(company_id)}, {"_id": 0})
+    if company is None or "built_at" not in company:
+        try:
+            company = await rebuild_invoice_stats(db, company_id)
+        except FenceBusy as e:
+            logger.warning(f"{e}; summing invoices for this read")
+            rows = await _customer_totals(db, company_id)
+            customer = next((row for row in rows if (row["_id"] or "") == customer_id), None)
+            totals = {field: sum(row[field] for row in rows) for field in STAT_FIELDS}
+            return CustomerStats.from_doc(customer), CustomerStats.from_doc(totals)
+    customer = await db[STATS_COLLECTION].find_one(
+        {"id": _customer_stats_id(company_id, company["build"], customer_id)}, {"_id": 0}
+    )
+    return CustomerStats.from_doc(customer), CustomerStats.from_doc(company)
@@ -0,0 +1,399 @@
+"""
+Performance Metrics
+
+Lightweight in-process metrics for capacity planning, rendered in the
+Prometheus text exposition format (served at /api/metrics).
+
+Recorded:
+- Per-route HTTP latency, plus Mongo operations and Mongo time per request
+- Mongo command counts and durations (pymongo command monitoring)
+- LLM call latency per provider/model
+- PDF render time per report
+- GST validation time per return type
+- Mongo connection pool usage and checkout wait (pymongo pool monitoring)
+
+Metrics are per process; with several workers, scrape each one (or
+aggregate at the Prometheus side).
+"""
+
+import contextvars
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    """Monotonic counter keyed by label values"""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values"""
+
+    def __init__(self, name: str, help_text: str, label_names: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], list] = {}  # key -> [bucket_counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.label_names)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the block; adds outcome="ok"/"error" when that label exists"""
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            yield
+        except BaseException:
+            outcome = "error"
+            raise
+        finally:
+            if "outcome" in self.label_names:
+                labels["outcome"] = outcome
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (bucket_counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    cumulative += bucket_count
+                    le = _format_labels(self.label_names, key, f'le="{bound}"')
+                    lines.append(f"{self.name}_bucket{le} {cumulative}")
+                inf = _format_labels(self.label_names, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{inf} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {count}")
+        return lines
+
+
+class Gauge:
+    """Point-in-time values read from a callback at render time"""
+
+    def __init__(self, name: str, help_text: str, collect: Callable[[], Dict[Tuple[str, ...], float]],
+                 label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.collect = collect
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        for key, value in sorted(self.collect().items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class MetricsRegistry:
+    """Holds every metric and renders the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def counter(self, name: str, help_text: str, label_names: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, help_text, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, help_text: str, label_names: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, label_names, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, help_text: str, collect: Callable[[], Dict[Tuple[str, ...], float]],
+              label_names: Tuple[str, ...] = ()) -> Gauge:
+        metric = Gauge(name, help_text, collect, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+HTTP_REQUEST_DURATION = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route",
+    ("method", "route", "status")
+)
+HTTP_REQUEST_MONGO_OPERATIONS = registry.histogram(
+    "http_request_mongo_operations", "Mongo commands issued per HTTP request",
+    ("method", "route"), buckets=COUNT_BUCKETS
+)
+HTTP_REQUEST_MONGO_DURATION = registry.histogram(
+    "http_request_mongo_duration_seconds", "Total Mongo command time per HTTP request",
+    ("method", "route")
+)
+MONGO_COMMAND_DURATION = registry.histogram(
+    "mongo_command_duration_seconds", "Mongo command latency",
+    ("command", "collection", "outcome")
+)
+LLM_CALL_DURATION = registry.histogram(
+    "llm_call_duration_seconds", "LLM call latency",
+    ("provider", "model", "outcome")
+)
+PDF_RENDER_DURATION = registry.histogram(
+    "pdf_render_duration_seconds", "PDF render time",
+    ("report", "outcome")
+)
+VALIDATION_DURATION = registry.histogram(
+    "validation_duration_seconds", "GST return validation time",
+    ("stage", "outcome")
+)
+
+
+class RequestStats:
+    """Mongo activity attributed to the current HTTP request"""
+
+    __slots__ = ("mongo_operations", "mongo_seconds", "_lock")
+
+    def __init__(self):
+        self.mongo_operations = 0
+        self.mongo_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add_mongo(self, seconds: float):
+        with self._lock:
+            self.mongo_operations += 1
+            self.mongo_seconds += seconds
+
+
+# Motor copies the context into its executor threads, so the listener sees this
+_request_stats: contextvars.ContextVar = contextvars.ContextVar("request_stats", default=None)
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """pymongo command listener feeding MONGO_COMMAND_DURATION and the per-request stats"""
+
+    def __init__(self):
+        self._collections: Dict[tuple, str] = {}  # (connection_id, request_id) -> collection
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        # Only the started event carries the command document (and so the collection name)
+        target = event.command.get(event.command_name)
+        if isinstance(target, str):
+            with self._lock:
+                self._collections[(event.connection_id, event.request_id)] = target
+
+    def succeeded(self, event):
+        self._record(event, "ok")
+
+    def failed(self, event):
+        self._record(event, "error")
+
+    def _record(self, event, outcome: str):
+        seconds = event.duration_micros / 1_000_000
+        with self._lock:
+            collection = self._collections.pop((event.connection_id, event.request_id), "")
+        MONGO_COMMAND_DURATION.observe(seconds, command=event.command_name, collection=collection, outcome=outcome)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.add_mongo(seconds)
+
+
+MONGO_POOL_CHECKOUT_WAIT = registry.histogram(
+    "mongo_pool_checkout_wait_seconds", "Time spent waiting for a pooled Mongo connection",
+    ("outcome",)
+)
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """
+    pymongo pool listener: open / in-use connections, waiters and checkout wait.
+
+    Checkouts happen synchronously on the calling (Motor executor) thread, so
+    the wait is measured from a thread-local start time.
+    """
+
+    def __init__(self, window: int = 1000):
+        self.open = 0
+        self.in_use = 0
+        self.waiting = 0
+        self.checkout_failures = 0
+        self.pool_clears = 0
+        self._recent_waits = deque(maxlen=window)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            waits = sorted(self._recent_waits)
+            counts = {
+                "open_connections": self.open,
+                "in_use_connections": self.in_use,
+                "waiting_for_connection": self.waiting,
+                "checkout_failures": self.checkout_failures,
+                "pool_clears": self.pool_clears,
+            }
+
+        def percentile(p: float) -> float:
+            return round(waits[min(len(waits) - 1, int(p * len(waits)))] * 1000, 3) if waits else 0.0
+
+        counts["checkout_wait_ms"] = {
+            "samples": len(waits),
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "max": round(waits[-1] * 1000, 3) if waits else 0.0,
+        }
+        return counts
+
+    def _finish_checkout(self, outcome: str):
+        start = getattr(self._local, "checkout_start", None)
+        self._local.checkout_start = None
+        wait = time.perf_counter() - start if start is not None else None
+        with self._lock:
+            self.waiting = max(0, self.waiting - 1)
+            if outcome == "ok":
+                self.in_use += 1
+            else:
+                self.checkout_failures += 1
+            if wait is not None:
+                self._recent_waits.append(wait)
+        if wait is not None:
+            MONGO_POOL_CHECKOUT_WAIT.observe(wait, outcome=outcome)
+
+    def connection_check_out_started(self, event):
+        self._local.checkout_start = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+
+    def connection_checked_out(self, event):
+        self._finish_checkout("ok")
+
+    def connection_check_out_failed(self, event):
+        self._finish_checkout("error")
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use = max(0, self.in_use - 1)
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open = max(0, self.open - 1)
+
+    def connection_ready(self, event):
+        pass
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and Mongo usage per route template"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        status_code = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status_code[0] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            _request_stats.reset(token)
+            route = scope.get("route")
+            # Route templates keep label cardinality bounded; unmatched paths are folded together
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            HTTP_REQUEST_DURATION.observe(elapsed, method=method, route=route_path, status=status_code[0])
+            HTTP_REQUEST_MONGO_OPERATIONS.observe(stats.mongo_operations, method=method, route=route_path)
+            HTTP_REQUEST_MONGO_DURATION.observe(stats.mongo_seconds, method=method, route=route_path)
+
+
+def llm_timer(provider: str, model: str):
+    """Usage: with llm_timer("gemini", "gemini-2.5-pro"): response = await chat.send_message(...)"""
+    return LLM_CALL_DURATION.time(provider=provider, model=model)
+
+
+def pdf_timer(report: str):
+    """Usage: with pdf_timer("gstr3b"): pdf_bytes = generator.generate_gstr3b_pdf(...)"""
+    return PDF_RENDER_DURATION.time(report=report)
+
+
+def validation_timer(stage: str):
+    """Usage: with validation_timer("gstr1"): result = GSTOrchestrator.validate_gstr1(...)"""
+    return VALIDATION_DURATION.time(stage=stage)
@@ -0,0 +1,299 @@
+"""
+Financial Rollups
+
+One document per company in `financial_rollups`, holding running totals so
+/dashboard/stats is a single read instead of a scan of invoices and bills.
+
+Layout:
+    {"id": "<company_id>:all", "company_id", "month": None,
+     "invoices": {"<status>": {"count", "amount", "outstanding"}},
+     "bills":    {"<status>": {"count", "amount", "outstanding"}},
+     "customers": {"count"}, "vendors": {"count"},
+     "months": {"2026-01": {"invoices", "bills", "customers", "vendors"}},
+     "seq", "writers", "built_at", "updated_at"}
+
+amount is invoice total / bill amount, outstanding is amount - paid_amount
+(documents without a status count under "unknown"). Months come from
+created_at (YYYY-MM) and are kept in the same document, so a delta or a
+rebuild updates the company and month totals in one write.
+
+Every write path runs inside rollup_write and reports the document before
+and after the change (find_one_and_update / find_one_and_delete return the
+exact prior state); the difference is $inc'ed when the block exits, so
+concurrent writers never overwrite each other's totals.
+
+rollup_write also holds the write fence (see write_fence.py) that keeps
+rebuild_rollups from losing or double-counting a write that overlaps it.
+Until the first rebuild sets `built_at` the document only holds the deltas
+of recent writes and is not read.
+
+Rollups that drifted (a crash between the two writes, manual DB edits) are
+repaired with rebuild_rollups:
+
+    python rollups.py rebuild [--company-id ID]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from enum import Enum
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from write_fence import FenceBusy, begin_write, end_write, fenced_rebuild, mark_unbuilt
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_COLLECTION = "financial_rollups"
+
+# kind -> field holding the money amount (None: count only)
+ROLLUP_KINDS = {
+    "invoices": "total",
+    "bills": "amount",
+    "customers": None,
+    "vendors": None,
+}
+
+
+def _rollup_id(company_id: str) -> str:
+    return f"{company_id}:all"
+
+
+def _on_insert(company_id: str) -> dict:
+    return {"company_id": company_id, "month": None}
+
+
+def _month_of(doc: dict) -> Optional[str]:
+    created_at = doc.get("created_at")
+    if isinstance(created_at, datetime):
+        return created_at.strftime("%Y-%m")
+    if isinstance(created_at, str) and len(created_at) >= 7:
+        return created_at[:7]
+    return None
+
+
+def _status_key(status) -> str:
+    if status is None:
+        return "unknown"
+    return status.value if isinstance(status, Enum) else str(status)
+
+
+def _contribution(kind: str, doc: Optional[dict], sign: int) -> Dict[str, float]:
+    """$inc paths a document adds to (sign=1) or removes from (sign=-1) a rollup"""
+    if not doc:
+        return {}
+    amount_field = ROLLUP_KINDS[kind]
+    if amount_field is None:
+        return {f"{kind}.count": sign}
+    amount = doc.get(amount_field, 0) or 0
+    outstanding = amount - (doc.get("paid_amount", 0) or 0)
+    prefix = f"{kind}.{_status_key(doc.get('status'))}"
+    return {
+        f"{prefix}.count": sign,
+        f"{prefix}.amount": sign * amount,
+        f"{prefix}.outstanding": sign * outstanding,
+    }
+
+
+def _merge(target: Dict[str, float], inc: Dict[str, float], prefix: str = ""):
+    for path, value in inc.items():
+        target[prefix + path] = target.get(prefix + path, 0) + value
+
+
+@asynccontextmanager
+async def rollup_write(db, company_id: str):
+    """
+    Fence one write to a tracked collection. Yields a list the caller
+    appends (kind, before, after) to once the source document changed
+    (before/after None for insert/delete); the deltas are applied when the
+    block exits, also if it raised.
+    """
+    token, _ = await begin_write(db[ROLLUP_COLLECTION], {"id": _rollup_id(company_id)}, _on_insert(company_id))
+    changes: List[Tuple[str, Optional[dict], Optional[dict]]] = []
+    try:
+        yield changes
+    finally:
+        await apply_rollup_delta(db, company_id, token, changes)
+
+
+async def apply_rollup_delta(db, company_id: str, token: str,
+                             changes: List[Tuple[str, Optional[dict], Optional[dict]]]):
+    """
+    Move each changed document's contribution from `before` to `after`,
+    company-wide and in its month, and close the rollup_write holding
+    `token`, all in one update.
+    """
+    inc: Dict[str, float] = {}
+    for kind, before, after in changes:
+        for doc, sign in ((before, -1), (after, 1)):
+            contribution = _contribution(kind, doc, sign)
+            _merge(inc, contribution)
+            if contribution and _month_of(doc):
+                _merge(inc, contribution, f"months.{_month_of(doc)}.")
+
+    update = {"$set": {"updated_at": datetime.now(timezone.utc).isoformat()}, "$unset": end_write(token)}
+    inc = {path: value for path, value in inc.items() if value}
+    if inc:
+        update["$inc"] = inc
+    await db[ROLLUP_COLLECTION].update_one({"id": _rollup_id(company_id)}, update)
+
+
+async def _grouped_totals(db, kind: str, company_id: str) -> list:
+    amount_field = ROLLUP_KINDS[kind]
+    month = {"$cond": [
+        {"$eq": [{"$type": "$created_at"}, "date"]},
+        {"$dateToString": {"format": "%Y-%m", "date": "$created_at"}},
+        {"$substrCP": [{"$ifNull": ["$created_at", ""]}, 0, 7]}
+    ]}
+    group = {"_id": {"month": month}, "count": {"$sum": 1}}
+    if amount_field:
+        group["_id"]["status"] = "$status"
+        group["amount"] = {"$sum": f"${amount_field}"}
+        group["outstanding"] = {"$sum": {"$subtract": [f"${amount_field}", {"$ifNull": ["$paid_amount", 0]}]}}
+    return await db[kind].aggregate([
+        {"$match": {"company_id": company_id}},
+        {"$group": group}
+    ]).to_list(None)
+
+
+def _empty_totals() -> dict:
+    return {"invoices": {}, "bills": {}, "customers": {"count": 0}, "vendors": {"count": 0}}
+
+
+async def compute_rollups(db, company_id: str) -> dict:
+    """A company's rollup document (without the fence fields), summed from the source collections"""
+    rollup = {"id": _rollup_id(company_id), **_on_insert(company_id), **_empty_totals(), "months": {}}
+    for kind, amount_field in ROLLUP_KINDS.items():
+        for row in await _grouped_totals(db, kind, company_id):
+            month = row["_id"]["month"] or None
+            targets = [rollup]
+            if month:
+                targets.append(rollup["months"].setdefault(month, _empty_totals()))
+            for totals in targets:
+                if amount_field is None:
+                    totals[kind]["count"] += row["count"]
+                    continue
+                status = _status_key(row["_id"].get("status"))
+                bucket = totals[kind].setdefault(status, {"count": 0, "amount": 0, "outstanding": 0})
+                bucket["count"] += row["count"]
+                bucket["amount"] += row["amount"]
+                bucket["outstanding"] += row["outstanding"]
+    return rollup
+
+
+async def rebuild_rollups(db, company_id: str) -> dict:
+    """
+    Recompute a company's rollups from the source collections and store
+    them once no write overlaps the aggregation.
+
+    Returns:
+        The company-wide rollup document
+
+    Raises:
+        FenceBusy: writes overlapped every attempt (nothing was stored)
+    """
+    async def compute(fence: dict) -> dict:
+        return await compute_rollups(db, company_id)
+
+    return await fenced_rebuild(
+        db[ROLLUP_COLLECTION], {"id": _rollup_id(company_id)}, _on_insert(company_id),
+        compute, f"Rollups for {company_id}"
+    )
+
+
+async def refresh_rollups(db, company_id: str):
+    """
+    Rebuild after a bulk write that bypassed the deltas (made inside a
+    rollup_write, so no overlapping rebuild stores a snapshot without it).
+    If writes keep the rebuild from being stored, the next read rebuilds.
+    """
+    try:
+        await rebuild_rollups(db, company_id)
+    except FenceBusy as e:
+        logger.warning(f"{e}; left for the next read")
+        await mark_unbuilt(db[ROLLUP_COLLECTION], {"id": _rollup_id(company_id)})
+
+
+async def current_rollup(db, company_id: str) -> dict:
+    """
+    The company-wide rollup, built on first use. While writes keep the
+    first build from being stored, a snapshot is computed for each read.
+    """
+    rollup = await get_rollup(db, company_id)
+    if rollup is None or "built_at" not in rollup:
+        try:
+            rollup = await rebuild_rollups(db, company_id)
+        except FenceBusy as e:
+            logger.warning(f"{e}; serving an unstored snapshot")
+            rollup = await compute_rollups(db, company_id)
+    return rollup
+
+
+async def get_rollup(db, company_id: str, month: Optional[str] = None) -> Optional[dict]:
+    """The stored company-wide rollup, or one month of it (None if missing)"""
+    if month is None:
+        return await db[ROLLUP_COLLECTION].find_one({"id": _rollup_id(company_id)}, {"_id": 0})
+    rollup = await db[ROLLUP_COLLECTION].find_one(
+        {"id": _rollup_id(company_id)}, {"_id": 0, f"months.{month}": 1}
+    )
+    totals = (rollup or {}).get("months", {}).get(month)
+    return {"company_id": company_id, "month": month, **totals} if totals else None
+
+
+def dashboard_stats_from_rollup(rollup: dict) -> dict:
+    """The /dashboard/stats payload from a company-wide rollup document"""
+    empty = {"count": 0, "amount": 0, "outstanding": 0}
+    invoices = rollup.get("invoices", {})
+    bills = rollup.get("bills", {})
+    open_statuses = ['sent', 'overdue']
+
+    def money(value: float) -> float:
+        # Repeated $inc of floats leaves sub-paisa noise
+        return round(value, 2)
+
+    return {
+        "total_revenue": money(invoices.get('paid', empty)["amount"]),
+        "total_expenses": money(bills.get('paid', empty)["amount"]),
+        "outstanding_receivables": money(sum(invoices.get(s, empty)["outstanding"] for s in open_statuses)),
+        "outstanding_payables": money(sum(bills.get(s, empty)["outstanding"] for s in open_statuses)),
+        "total_customers": rollup.get("customers", {}).get("count", 0),
+        "total_vendors": rollup.get("vendors", {}).get("count", 0),
+        "total_invoices": sum(bucket["count"] for bucket in invoices.values()),
+        "paid_invoices": invoices.get('paid', empty)["count"],
+        "overdue_invoices": invoices.get('overdue', empty)["count"]
+    }
+
+
+async def _rebuild_command(company_id: Optional[str]):
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    load_dotenv(Path(__file__).parent / '.env')
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    try:
+        if company_id:
+            company_ids = [company_id]
+        else:
+            company_ids = [c["id"] for c in await db.companies.find({}, {"_id": 0, "id": 1}).to_list(None)]
+        for cid in company_ids:
+            try:
+                stats = dashboard_stats_from_rollup(await rebuild_rollups(db, cid))
+            except FenceBusy as e:
+                logger.error(f"{e}; not rebuilt, run again later")
+                continue
+            logger.info(f"Rebuilt rollups for {cid}: {stats}")
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Financial rollup maintenance")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--company-id", help="only this company (default: all companies)")
+    args = parser.parse_args()
+    asyncio.run(_rebuild_command(args.company_id))
@@ -1,4 +1,4 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, Request, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
@@ -6,8 +6,10 @@ from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional
+from pydantic import BaseModel, Field, ConfigDict, EmailStr, TypeAdapter, ValidationError, create_model
+from typing import List, Literal, Optional, Tuple, Union, get_args, get_origin
+import hmac
+import socket
 import uuid
 from datetime import datetime, timezone, timedelta
 from enum import Enum
@@ -21,24 +23,86 @@ from io import BytesIO
 from PIL import Image
 import tempfile
 import os as os_module
+from decimal import Decimal
+from copy import copy
+from functools import lru_cache
+from contextlib import asynccontextmanager
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response as BaseResponse, PlainTextResponse
+from db_indexes import ensure_indexes
+from usage import reserve_usage, reserve_usage_up_to, release_usage, get_usage, period_of
+from rollups import rollup_write, rebuild_rollups, refresh_rollups, current_rollup, dashboard_stats_from_rollup
+from write_fence import FenceBusy
+from change_versions import bump_versions, get_versions, make_etag, etag_matches
+from invoice_stats import invoice_stats_write, get_invoice_stats, refresh_invoice_stats
+from gst_period_totals import gst_totals_write, get_gst_totals
+from invoice_import import ImportRow, batched, detect_format, iter_import_rows, normalize_invoice
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from invoice_engine import InvoiceAnomalyEngine, ReceivablesReconciler
+from gst_engine.validators.validation_cache import InvoiceValidationCache
+from pymongo import ReturnDocument
+from metrics import registry as metrics_registry, MetricsMiddleware, MongoCommandMetrics, MongoPoolMetrics, llm_timer, pdf_timer, validation_timer
+import time
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
+# Motor connects lazily; the startup hook verifies connectivity before serving.
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+MONGO_POOL_SETTINGS = {
+    "maxPoolSize": int(os.environ.get('MONGO_MAX_POOL_SIZE', '100')),
+    "minPoolSize": int(os.environ.get('MONGO_MIN_POOL_SIZE', '0')),
+    "maxIdleTimeMS": int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '300000')),
+    "waitQueueTimeoutMS": int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '10000')),
+    "serverSelectionTimeoutMS": int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000')),
+    "connectTimeoutMS": int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', '5000')),
+    "socketTimeoutMS": int(os.environ.get('MONGO_SOCKET_TIMEOUT_MS', '60000')),
+}
+# Set to 'false' to start even when MongoDB is unreachable (requests will fail until it is back)
+MONGO_REQUIRED_ON_STARTUP = os.environ.get('MONGO_REQUIRED_ON_STARTUP', 'true').lower() == 'true'
+mongo_pool_metrics = MongoPoolMetrics()
+client = AsyncIOMotorClient(
+    mongo_url,
+    event_listeners=[MongoCommandMetrics(), mongo_pool_metrics],
+    **MONGO_POOL_SETTINGS
+)
 db = client[os.environ['DB_NAME']]
 
+# Set to 'false' where indexes are managed outside the app
+ENSURE_INDEXES_ON_STARTUP = os.environ.get('ENSURE_INDEXES_ON_STARTUP', 'true').lower() == 'true'
+
 # Security
 JWT_SECRET = os.environ.get('JWT_SECRET', 'your-secret-key-change-in-production')
 JWT_ALGORITHM = "HS256"
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
+# bcrypt is CPU bound (~100-300 ms per call); run it on a bounded pool instead of the event loop
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
 # Emergent LLM Key for AI features
 EMERGENT_LLM_KEY = os.environ.get('EMERGENT_LLM_KEY', '')
 
+# Auth principal cache (per process)
+AUTH_CACHE_TTL_SECONDS = float(os.environ.get('AUTH_CACHE_TTL_SECONDS', '60'))
+AUTH_CACHE_MAX_ENTRIES = int(os.environ.get('AUTH_CACHE_MAX_ENTRIES', '10000'))
+
+# Token mode: "standard" tokens carry only user_id/company_id; "claims" tokens also carry
+# role, subscription tier and the user's token version for Mongo-free authorization
+AUTH_TOKEN_MODE = os.environ.get('AUTH_TOKEN_MODE', 'standard')
+TOKEN_VERSION_CHECK_SECONDS = float(os.environ.get('TOKEN_VERSION_CHECK_SECONDS', '30'))
+
 # Create the main app
 app = FastAPI()
 api_router = APIRouter(prefix="/api")
@@ -81,10 +145,11 @@ class NewsUrgency(str, Enum):
     CRITICAL = "critical"
 
 # Subscription limits
+# ai_calls_per_month: metered in usage_counters; -1 = unlimited
 SUBSCRIPTION_LIMITS = {
-    SubscriptionTier.FREE: {"invoices_per_month": 5, "max_users": 1, "ai_features": False},
-    SubscriptionTier.PRO: {"invoices_per_month": 100, "max_users": 5, "ai_features": True},
-    SubscriptionTier.ENTERPRISE: {"invoices_per_month": -1, "max_users": -1, "ai_features": True}
+    SubscriptionTier.FREE: {"invoices_per_month": 5, "max_users": 1, "ai_features": False, "ai_calls_per_month": -1},
+    SubscriptionTier.PRO: {"invoices_per_month": 100, "max_users": 5, "ai_features": True, "ai_calls_per_month": -1},
+    SubscriptionTier.ENTERPRISE: {"invoices_per_month": -1, "max_users": -1, "ai_features": True, "ai_calls_per_month": -1}
 }
 
 # Pricing in INR
@@ -123,6 +188,7 @@ class User(BaseModel):
     password_hash: str
     role: UserRole = UserRole.ACCOUNTANT
     is_active: bool = True
+    token_version: int = 0  # bumped to revoke every token issued before
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class UserCreate(BaseModel):
@@ -201,6 +267,9 @@ class Invoice(BaseModel):
     notes: Optional[str] = None
     ai_verified: bool = False
     ai_flags: List[str] = Field(default_factory=list)
+    ai_status: Optional[str] = None  # pending, running, completed, failed (None: no AI analysis)
+    ai_error: Optional[str] = None
+    ai_analyzed_at: Optional[datetime] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     created_by: str  # user_id
 
@@ -244,6 +313,20 @@ class PaymentCreate(BaseModel):
     status: PaymentStatus = PaymentStatus.COMPLETED
     notes: Optional[str] = None
 
+class BankReceipt(BaseModel):
+    amount: float = Field(gt=0)
+    date: datetime
+    reference: Optional[str] = None
+    payer: Optional[str] = None
+    payment_method: str = "bank_transfer"
+
+class ReconciliationRequest(BaseModel):
+    receipts: List[BankReceipt]
+    apply: bool = False  # record payments for confident matches; otherwise only propose
+    min_confidence: float = Field(0.75, ge=0, le=1)  # reference and payer matches; amount-only is 0.6
+    amount_tolerance: float = Field(1.0, ge=0)
+    date_window_days: int = Field(90, ge=0)
+
 class Bill(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -369,6 +452,8 @@ class GSTInvoice(BaseModel):
     gstin: str
     period: str  # MM-YYYY
     invoice_number: str
+    invoice_number_key: Optional[str] = None  # normalised invoice_number, unique per company/GSTIN/period
+    content_hash: Optional[str] = None  # InvoiceValidationCache key
     invoice_date: str
     document_type: str = "invoice"  # invoice, credit_note, debit_note
     supply_type: str  # intra, inter
@@ -447,18 +532,369 @@ def deserialize_doc(doc):
                 doc[key] = [deserialize_doc(item) if isinstance(item, dict) else item for item in value]
     return doc
 
+class DocCodec:
+    """
+    Datetime codec precompiled from a Pydantic model.
+
+    serialize_doc / deserialize_doc walk every key of every document; a codec
+    knows up front which fields hold datetimes (directly, optionally, or inside
+    nested models / lists of models) and touches only those.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        datetime_fields = []
+        nested = []
+        for name, field in model.model_fields.items():
+            kind, sub_model = DocCodec._classify(field.annotation)
+            if kind == "datetime":
+                datetime_fields.append(name)
+            elif kind in ("model", "model_list"):
+                sub_codec = DocCodec(sub_model)
+                if sub_codec.datetime_fields or sub_codec.nested:
+                    nested.append((name, sub_codec, kind == "model_list"))
+        self.datetime_fields = tuple(datetime_fields)
+        self.nested = tuple(nested)
+
+    @staticmethod
+    def _classify(annotation):
+        origin = get_origin(annotation)
+        if origin is Union:
+            args = [a for a in get_args(annotation) if a is not type(None)]
+            return DocCodec._classify(args[0]) if len(args) == 1 else (None, None)
+        if origin in (list, List):
+            args = get_args(annotation)
+            if args and isinstance(args[0], type) and issubclass(args[0], BaseModel):
+                return "model_list", args[0]
+            return None, None
+        if annotation is datetime:
+            return "datetime", None
+        if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+            return "model", annotation
+        return None, None
+
+    def encode(self, doc: dict) -> dict:
+        """datetime -> ISO string, in place (storage format)"""
+        for name in self.datetime_fields:
+            value = doc.get(name)
+            if isinstance(value, datetime):
+                doc[name] = value.isoformat()
+        for name, codec, is_list in self.nested:
+            value = doc.get(name)
+            if is_list and isinstance(value, list):
+                for item in value:
+                    if isinstance(item, dict):
+                        codec.encode(item)
+            elif isinstance(value, dict):
+                codec.encode(value)
+        return doc
+
+    def decode(self, doc: dict) -> dict:
+        """ISO string -> datetime, in place (API format)"""
+        for name in self.datetime_fields:
+            value = doc.get(name)
+            if isinstance(value, str):
+                doc[name] = datetime.fromisoformat(value)
+        for name, codec, is_list in self.nested:
+            value = doc.get(name)
+            if is_list and isinstance(value, list):
+                for item in value:
+                    if isinstance(item, dict):
+                        codec.decode(item)
+            elif isinstance(value, dict):
+                codec.decode(value)
+        return doc
+
+    def decode_many(self, docs: list) -> list:
+        if self.datetime_fields or self.nested:
+            for doc in docs:
+                self.decode(doc)
+        return docs
+
+def _json_default(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        # Same as Pydantic (and orjson.OPT_UTC_Z): UTC is written as "Z"
+        return value.isoformat().replace("+00:00", "Z")
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+class FastJSONResponse(BaseResponse):
+    """
+    JSON response for large lists of trusted DB documents.
+
+    Returning it from a route bypasses FastAPI's jsonable_encoder and
+    response_model re-validation; the documents are encoded in one pass with
+    orjson when installed (stdlib json otherwise). datetime, Decimal, Enum and
+    Pydantic models are supported.
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if ORJSON_AVAILABLE:
+            return orjson.dumps(content, default=_json_default,
+                                option=orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z)
+        return json.dumps(
+            content, default=_json_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+        ).encode("utf-8")
+
+company_codec = DocCodec(Company)
+user_codec = DocCodec(User)
+customer_codec = DocCodec(Customer)
+vendor_codec = DocCodec(Vendor)
+invoice_codec = DocCodec(Invoice)
+payment_codec = DocCodec(Payment)
+bill_codec = DocCodec(Bill)
+news_codec = DocCodec(NewsItem)
+itr_filing_codec = DocCodec(ITRFiling)
+gst_profile_codec = DocCodec(GSTProfile)
+gst_invoice_codec = DocCodec(GSTInvoice)
+gstr1_filing_codec = DocCodec(GSTR1Filing)
+
+# Keyset pagination
+PAGE_DEFAULT_LIMIT = int(os.environ.get('PAGE_DEFAULT_LIMIT', '1000'))
+PAGE_MAX_LIMIT = int(os.environ.get('PAGE_MAX_LIMIT', '1000'))
+# GET /gst/{gstin}/{period}/invoices without limit/after (existing callers)
+PERIOD_INVOICES_UNPAGED_LIMIT = 10000
+
+SortOrder = Literal["asc", "desc"]
+
+def encode_cursor(sort: str, order: str, value, doc_id: str) -> str:
+    """Opaque cursor pointing just past (value, doc_id) in the given ordering"""
+    raw = json.dumps([sort, order, value, doc_id], separators=(",", ":"), default=_json_default)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, sort: str, order: str) -> Tuple[object, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, cursor_order, value, doc_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if cursor_sort != sort or cursor_order != order:
+        raise HTTPException(status_code=400, detail="Cursor was issued for a different sort order")
+    return value, doc_id
+
+def parse_fields(fields: Optional[str], model) -> Optional[List[str]]:
+    """
+    `fields=invoice_number,total,status` -> validated top-level field names.
+
+    Returns None (whole document) when no fields were asked for; `id` is
+    always included. Unknown names are rejected with a 400. Names come back
+    in the model's field order, so every spelling of the same set maps to
+    one list_adapter entry.
+    """
+    if not fields:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = sorted(name for name in requested if name not in model.model_fields)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return ["id", *(name for name in model.model_fields if name in requested and name != "id")]
+
+def build_projection(fields: Optional[List[str]]) -> dict:
+    projection = {"_id": 0}
+    if fields:
+        projection.update({name: 1 for name in fields})
+    return projection
+
+async def fetch_page(collection, query: dict, sort: str, order: str, limit: int,
+                     after: Optional[str] = None,
+                     fields: Optional[List[str]] = None) -> Tuple[List[dict], Optional[str]]:
+    """
+    One page of raw documents ordered by (sort, id), plus the cursor for the next page.
+
+    `id` breaks ties so the ordering is total and no document is skipped or
+    repeated between pages. Pair each sort field with a
+    (<query keys>, sort, id) index in db_indexes so pages are read straight
+    off the index. Sort fields must be required (never null) fields.
+    `fields` (from parse_fields) limits the documents to those fields.
+    """
+    direction = 1 if order == "asc" else -1
+    if after:
+        value, last_id = decode_cursor(after, sort, order)
+        op = "$gt" if direction == 1 else "$lt"
+        query = {**query, "$or": [{sort: {op: value}}, {sort: value, "id": {op: last_id}}]}
+
+    # The cursor needs the sort value even when the caller did not ask for it
+    strip_sort = bool(fields) and sort not in fields
+    projection = build_projection(fields + [sort] if strip_sort else fields)
+
+    # One extra document tells us whether another page exists
+    docs = await collection.find(query, projection).sort(
+        [(sort, direction), ("id", direction)]
+    ).limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = None
+    if len(docs) > limit:
+        docs = docs[:limit]
+        next_cursor = encode_cursor(sort, order, docs[-1].get(sort), docs[-1]["id"])
+    if strip_sort:
+        for doc in docs:
+            doc.pop(sort, None)
+    return docs, next_cursor
+
+async def check_etag(request: Request, company_id: str, *kinds: str, resource: Optional[str] = None):
+    """
+    ETag for a response built from the company's `kinds` collections
+    (see change_versions.py). Returns (etag, 304 response or None).
+    """
+    versions = await get_versions(db, company_id, kinds)
+    etag = make_etag(company_id, resource or f"{request.url.path}?{request.url.query}", versions)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return etag, BaseResponse(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+    return etag, None
+
+# Opt-in: list routes send the stored documents through FastJSONResponse
+# as they are (no response_model filtering or defaults, datetimes as stored)
+FAST_LIST_RESPONSES = os.environ.get('FAST_LIST_RESPONSES', 'false').lower() == 'true'
+
+@lru_cache(maxsize=256)
+def list_adapter(model, fields: Optional[Tuple[str, ...]] = None) -> TypeAdapter:
+    """
+    TypeAdapter for List[model], or for a model of just `fields` when the
+    caller asked for a projection (see parse_fields).
+    """
+    if fields:
+        model = create_model(
+            f"{model.__name__}Fields", __config__=model.model_config,
+            **{name: (model.model_fields[name].annotation, copy(model.model_fields[name])) for name in fields}
+        )
+    return TypeAdapter(List[model])
+
+def page_response(request: Request, docs: List[dict], next_cursor: Optional[str], etag: Optional[str] = None,
+                  model=None, fields: Optional[List[str]] = None) -> BaseResponse:
+    """
+    List body as before; the next-page cursor travels in X-Next-Cursor and a Link header.
+
+    The documents go through `model` like a response_model would (filtering,
+    defaults, datetimes), but are validated once and written straight to
+    JSON by pydantic-core instead of FastAPI's jsonable_encoder pass.
+    """
+    headers = {}
+    if etag:
+        # Browsers revalidate with If-None-Match on every poll and reuse the body on 304
+        headers["ETag"] = etag
+        headers["Cache-Control"] = "private, no-cache"
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+        headers["Link"] = f'<{request.url.include_query_params(after=next_cursor)}>; rel="next"'
+    if FAST_LIST_RESPONSES:
+        return FastJSONResponse(docs, headers=headers)
+    if model is None:
+        return JSONResponse(jsonable_encoder(docs), headers=headers)
+    adapter = list_adapter(model, tuple(fields) if fields else None)
+    return BaseResponse(adapter.dump_json(adapter.validate_python(docs), by_alias=True),
+                        media_type="application/json", headers=headers)
+
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+async def hash_password_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, hash_password, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, verify_password, plain_password, hashed_password)
+
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(days=7)
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
+def build_token_claims(user: dict, company: dict) -> dict:
+    """JWT claims for a user; in "claims" mode they are enough to authorize without Mongo"""
+    claims = {"user_id": user["id"], "company_id": user["company_id"], "tv": user.get("token_version", 0)}
+    if AUTH_TOKEN_MODE == "claims":
+        claims.update({
+            "role": UserRole(user["role"]).value,
+            "tier": SubscriptionTier(company["subscription_tier"]).value
+        })
+    return claims
+
+class PrincipalCache:
+    """
+    In-process TTL/LRU cache of resolved {"user", "company"} principals keyed by user_id.
+
+    Entries expire after `ttl_seconds`; the least recently used entry is evicted
+    once `max_entries` is reached. Writers that change a user or company must
+    call invalidate_user / invalidate_company so other requests on this worker
+    see the change immediately (other workers converge within the TTL).
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # user_id -> (expires_at, principal)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, user_id: str) -> Optional[dict]:
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, principal = entry
+        if expires_at <= time.monotonic():
+            del self._entries[user_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        # Hand out copies so a handler mutating its principal cannot poison the cache
+        return {"user": dict(principal["user"]), "company": dict(principal["company"])}
+
+    def set(self, user_id: str, principal: dict):
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        self._entries[user_id] = (
+            time.monotonic() + self.ttl_seconds,
+            {"user": dict(principal["user"]), "company": dict(principal["company"])}
+        )
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate_user(self, user_id: str):
+        if self._entries.pop(user_id, None) is not None:
+            self.invalidations += 1
+
+    def invalidate_company(self, company_id: str):
+        stale = [uid for uid, (_, p) in self._entries.items() if p["company"].get("id") == company_id]
+        for uid in stale:
+            del self._entries[uid]
+        self.invalidations += len(stale)
+
+    def clear(self):
+        self.invalidations += len(self._entries)
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+principal_cache = PrincipalCache(AUTH_CACHE_TTL_SECONDS, AUTH_CACHE_MAX_ENTRIES)
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
         token = credentials.credentials
@@ -466,21 +902,112 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         user_id = payload.get("user_id")
         if not user_id:
             raise HTTPException(status_code=401, detail="Invalid token")
-        
+
+        cached = principal_cache.get(user_id)
+        if cached is not None:
+            if payload.get("tv", 0) < cached["user"].get("token_version", 0):
+                raise HTTPException(status_code=401, detail="Token revoked")
+            return cached
+
         user = await db.users.find_one({"id": user_id}, {"_id": 0})
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
-        
+
+        if not user.get("is_active", True):
+            raise HTTPException(status_code=401, detail="Account is inactive")
+
+        if payload.get("tv", 0) < user.get("token_version", 0):
+            raise HTTPException(status_code=401, detail="Token revoked")
+
         company = await db.companies.find_one({"id": user["company_id"]}, {"_id": 0})
         if not company:
             raise HTTPException(status_code=401, detail="Company not found")
-        
-        return {"user": deserialize_doc(user), "company": deserialize_doc(company)}
+
+        principal = {"user": user_codec.decode(user), "company": company_codec.decode(company)}
+        principal_cache.set(user_id, principal)
+        return principal
+    except HTTPException:
+        raise
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except Exception as e:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+# user_id -> (recheck_at, token_version, is_active, company_id)
+_token_versions = OrderedDict()
+
+async def _current_token_version(user_id: str) -> Optional[tuple]:
+    """Lazily refreshed (token_version, is_active) for a user; hits Mongo at most once per check window"""
+    entry = _token_versions.get(user_id)
+    if entry is not None and entry[0] > time.monotonic():
+        return entry[1], entry[2]
+
+    user = await db.users.find_one(
+        {"id": user_id},
+        {"_id": 0, "token_version": 1, "is_active": 1, "company_id": 1}
+    )
+    if not user:
+        _token_versions.pop(user_id, None)
+        return None
+
+    version, is_active = user.get("token_version", 0), user.get("is_active", True)
+    _token_versions[user_id] = (time.monotonic() + TOKEN_VERSION_CHECK_SECONDS, version, is_active, user.get("company_id"))
+    _token_versions.move_to_end(user_id)
+    while len(_token_versions) > AUTH_CACHE_MAX_ENTRIES:
+        _token_versions.popitem(last=False)
+    return version, is_active
+
+async def get_token_principal(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """
+    Fast-path auth for read-only routes.
+
+    Claims-mode tokens are authorized from their signed role/company/tier claims;
+    the only DB access is the periodic token-version check used for revocation.
+    Tokens without claims fall back to get_current_user. The returned principal
+    carries only the fields check_permission / check_subscription_limit and the
+    read routes need.
+    """
+    try:
+        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expired")
+    except Exception:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    if "role" not in payload or "tier" not in payload:
+        return await get_current_user(credentials)
+
+    user_id = payload.get("user_id")
+    company_id = payload.get("company_id")
+    if not user_id or not company_id:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    current = await _current_token_version(user_id)
+    if current is None:
+        raise HTTPException(status_code=401, detail="User not found")
+    version, is_active = current
+    if not is_active:
+        raise HTTPException(status_code=401, detail="Account is inactive")
+    if payload["tv"] < version:
+        raise HTTPException(status_code=401, detail="Token revoked")
+
+    return {
+        "user": {"id": user_id, "company_id": company_id, "role": payload["role"]},
+        "company": {"id": company_id, "subscription_tier": payload["tier"]}
+    }
+
+async def revoke_user_tokens(user_id: str = None, company_id: str = None):
+    """Bump token_version so every previously issued token for the user (or whole company) is rejected"""
+    query = {"id": user_id} if user_id else {"company_id": company_id}
+    await db.users.update_many(query, {"$inc": {"token_version": 1}})
+    if user_id:
+        _token_versions.pop(user_id, None)
+        principal_cache.invalidate_user(user_id)
+    else:
+        for uid in [uid for uid, entry in _token_versions.items() if entry[3] == company_id]:
+            del _token_versions[uid]
+        principal_cache.invalidate_company(company_id)
+
 async def check_permission(current_user: dict, required_role: UserRole = UserRole.VIEWER):
     role_hierarchy = {UserRole.VIEWER: 0, UserRole.ACCOUNTANT: 1, UserRole.ADMIN: 2, UserRole.OWNER: 3}
     user_role = UserRole(current_user["user"]["role"])
@@ -488,26 +1015,19 @@ async def check_permission(current_user: dict, required_role: UserRole = UserRol
         raise HTTPException(status_code=403, detail="Insufficient permissions")
 
 async def check_subscription_limit(company: dict, limit_type: str):
+    """
+    Enforce a tier limit. For "invoices" and "users" this reserves one unit in
+    the usage counters; release it with release_usage if the insert fails.
+    """
     tier = SubscriptionTier(company["subscription_tier"])
     limits = SUBSCRIPTION_LIMITS[tier]
     
     if limit_type == "invoices":
-        if limits["invoices_per_month"] == -1:
-            return True
-        # Count invoices this month
-        start_of_month = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        count = await db.invoices.count_documents({
-            "company_id": company["id"],
-            "created_at": {"$gte": start_of_month.isoformat()}
-        })
-        if count >= limits["invoices_per_month"]:
+        if not await reserve_usage(db, company["id"], "invoices", limits["invoices_per_month"]):
             raise HTTPException(status_code=403, detail=f"Invoice limit reached for {tier.value} tier. Upgrade to create more invoices.")
     
     elif limit_type == "users":
-        if limits["max_users"] == -1:
-            return True
-        count = await db.users.count_documents({"company_id": company["id"], "is_active": True})
-        if count >= limits["max_users"]:
+        if not await reserve_usage(db, company["id"], "users", limits["max_users"]):
             raise HTTPException(status_code=403, detail=f"User limit reached for {tier.value} tier. Upgrade to add more users.")
     
     elif limit_type == "ai_features":
@@ -516,6 +1036,12 @@ async def check_subscription_limit(company: dict, limit_type: str):
     
     return True
 
+async def count_ai_call(company: dict):
+    """Meter one AI call against the tier's monthly AI allowance"""
+    tier = SubscriptionTier(company["subscription_tier"])
+    if not await reserve_usage(db, company["id"], "ai_calls", SUBSCRIPTION_LIMITS[tier]["ai_calls_per_month"]):
+        raise HTTPException(status_code=403, detail=f"AI usage limit reached for {tier.value} tier this month.")
+
 async def analyze_invoice_with_ai(invoice_data: dict, company_id: str) -> AIAnalysisResult:
     """AI-powered invoice analysis using GPT-5.2"""
     try:
@@ -571,7 +1097,8 @@ Respond in JSON format:
             system_message="You are a financial analyst AI. Provide accurate invoice analysis in JSON format."
         ).with_model("openai", "gpt-5.2")
         
-        response = await chat.send_message(UserMessage(text=analysis_prompt))
+        with llm_timer("openai", "gpt-5.2"):
+            response = await chat.send_message(UserMessage(text=analysis_prompt))
         
         # Parse AI response
         try:
@@ -629,6 +1156,167 @@ Respond in JSON format:
             confidence_score=0.5
         )
 
+async def analyze_invoice(invoice_data: dict, company: dict) -> AIAnalysisResult:
+    """
+    Local anomaly engine first (arithmetic, indexed duplicate lookup,
+    per-customer amount outliers); the LLM is only consulted, and metered,
+    when the local engine is uncertain.
+    """
+    company_id = company["id"]
+    duplicate = await db.invoices.find_one({
+        "company_id": company_id,
+        "invoice_number": invoice_data["invoice_number"],
+        "id": {"$ne": invoice_data.get("id", "")}
+    }, {"_id": 0, "id": 1, "invoice_number": 1})
+    customer_stats, company_stats = await get_invoice_stats(db, company_id, invoice_data["customer_id"])
+    # The invoice is already saved, so it is part of the stats it is compared with
+    total = invoice_data.get("total", 0) or 0
+    local = InvoiceAnomalyEngine.analyze(
+        invoice_data, duplicate, customer_stats.without(total), company_stats.without(total)
+    )
+    result = AIAnalysisResult(**{k: v for k, v in local.items() if k in AIAnalysisResult.model_fields})
+    if not local["uncertain"]:
+        return result
+
+    try:
+        await count_ai_call(company)
+    except HTTPException:
+        return result  # out of AI allowance: the local verdict stands
+    ai_result = await analyze_invoice_with_ai(invoice_data, company_id)
+
+    # Arithmetic and duplicates are exact locally; take the LLM's view on anomalies
+    anomaly_details = result.anomaly_details + [d for d in ai_result.anomaly_details if d not in result.anomaly_details]
+    recommendations = result.recommendations + [r for r in ai_result.recommendations if r not in result.recommendations]
+    return result.model_copy(update={
+        "anomaly_detected": result.anomaly_detected or ai_result.anomaly_detected,
+        "anomaly_details": anomaly_details,
+        "recommendations": recommendations,
+        "confidence_score": ai_result.confidence_score
+    })
+
+AI_ANALYSIS_WORKERS = int(os.environ.get('AI_ANALYSIS_WORKERS', '8'))
+AI_ANALYSIS_PER_COMPANY = int(os.environ.get('AI_ANALYSIS_PER_COMPANY', '2'))
+# A running analysis is handed to another worker once its claim is this old
+AI_ANALYSIS_LEASE_SECONDS = int(os.environ.get('AI_ANALYSIS_LEASE_SECONDS', '900'))
+
+def ai_flags_from_result(ai_result: AIAnalysisResult) -> List[str]:
+    flags = []
+    if ai_result.is_duplicate:
+        flags.append(f"DUPLICATE: Similar to invoice {ai_result.duplicate_invoice_id}")
+    if not ai_result.calculation_verified:
+        flags.extend([f"CALC ERROR: {issue}" for issue in ai_result.calculation_issues])
+    if ai_result.anomaly_detected:
+        flags.extend([f"ANOMALY: {detail}" for detail in ai_result.anomaly_details])
+    return flags
+
+class InvoiceAnalysisQueue:
+    """
+    Background analysis (analyze_invoice) for invoices saved with ai_status="pending".
+
+    At most `workers` analyses run at once on this process, and at most
+    `per_company` for any one company, so a bulk import by one tenant cannot
+    starve the others. State lives on the invoice document: a worker claims
+    an invoice by setting ai_status="running" with its ai_worker id and
+    ai_started_at, and only writes the result back while that claim holds.
+    Other workers leave a running invoice alone until the claim is older
+    than `lease_seconds`; requeue_pending() picks up pending and expired
+    invoices at startup.
+    """
+
+    def __init__(self, workers: int, per_company: int, lease_seconds: int):
+        self._slots = asyncio.Semaphore(max(1, workers))
+        self.per_company = max(1, per_company)
+        self.lease_seconds = lease_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._company_slots = {}  # company_id -> [Semaphore, tasks using it]
+        self._tasks = set()
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, company_id: str, invoice_id: str):
+        task = asyncio.create_task(self._run(company_id, invoice_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> dict:
+        return {
+            "queued": len(self._tasks) - self.running,
+            "running": self.running,
+            "completed": self.completed,
+            "failed": self.failed
+        }
+
+    def _claimable(self) -> dict:
+        """Pending invoices, and running ones whose claim expired (the worker died or hung)"""
+        expired = (datetime.now(timezone.utc) - timedelta(seconds=self.lease_seconds)).isoformat()
+        return {"$or": [
+            {"ai_status": "pending"},
+            {"ai_status": "running", "ai_started_at": {"$not": {"$gte": expired}}},
+        ]}
+
+    async def requeue_pending(self, limit: int = 10000) -> int:
+        pending = await db.invoices.find(
+            self._claimable(),
+            {"_id": 0, "id": 1, "company_id": 1}
+        ).limit(limit).to_list(limit)
+        for doc in pending:
+            self.submit(doc["company_id"], doc["id"])
+        return len(pending)
+
+    async def shutdown(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _run(self, company_id: str, invoice_id: str):
+        entry = self._company_slots.setdefault(company_id, [asyncio.Semaphore(self.per_company), 0])
+        entry[1] += 1
+        try:
+            async with entry[0], self._slots:
+                self.running += 1
+                try:
+                    await self._analyze(company_id, invoice_id)
+                finally:
+                    self.running -= 1
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._company_slots.pop(company_id, None)
+
+    async def _analyze(self, company_id: str, invoice_id: str):
+        started_at = datetime.now(timezone.utc).isoformat()
+        invoice = await db.invoices.find_one_and_update(
+            {"id": invoice_id, "company_id": company_id, **self._claimable()},
+            {"$set": {"ai_status": "running", "ai_worker": self.worker_id, "ai_started_at": started_at}},
+            projection={"_id": 0}
+        )
+        if not invoice:
+            return  # deleted, already analysed or claimed by a live worker
+        # Cleared by an edit (back to pending) or by another worker taking over an expired claim
+        query = {"id": invoice_id, "company_id": company_id, "ai_status": "running",
+                 "ai_worker": self.worker_id, "ai_started_at": started_at}
+        await bump_versions(db, company_id, "invoices")
+        try:
+            company = await db.companies.find_one({"id": company_id}, {"_id": 0, "id": 1, "subscription_tier": 1})
+            ai_result = await analyze_invoice(invoice, company)
+            update = {"ai_verified": True, "ai_flags": ai_flags_from_result(ai_result), "ai_status": "completed"}
+            self.completed += 1
+        except asyncio.CancelledError:
+            # Shutting down: leave it for requeue_pending on the next start
+            await db.invoices.update_one(query, {"$set": {"ai_status": "pending"}})
+            raise
+        except Exception as e:
+            error = e.detail if isinstance(e, HTTPException) else str(e)
+            logging.error(f"AI analysis failed for invoice {invoice_id}: {error}")
+            update = {"ai_status": "failed", "ai_error": error}
+            self.failed += 1
+        update["ai_analyzed_at"] = datetime.now(timezone.utc).isoformat()
+        await db.invoices.update_one(query, {"$set": update})
+        await bump_versions(db, company_id, "invoices")
+
+invoice_analysis_queue = InvoiceAnalysisQueue(AI_ANALYSIS_WORKERS, AI_ANALYSIS_PER_COMPANY, AI_ANALYSIS_LEASE_SECONDS)
+
 # Routes
 @api_router.get("/")
 async def root():
@@ -651,20 +1339,26 @@ async def signup(user_data: UserCreate):
         subscription_status="trial",
         trial_ends_at=trial_end
     )
-    await db.companies.insert_one(serialize_doc(company.model_dump()))
+    await db.companies.insert_one(company_codec.encode(company.model_dump()))
     
     # Create user as owner
     user = User(
         company_id=company.id,
         email=user_data.email,
         name=user_data.name,
-        password_hash=hash_password(user_data.password),
+        password_hash=await hash_password_async(user_data.password),
         role=UserRole.OWNER
     )
-    await db.users.insert_one(serialize_doc(user.model_dump()))
+    # Seeds the company's active-user counter
+    await check_subscription_limit(company.model_dump(), "users")
+    try:
+        await db.users.insert_one(user_codec.encode(user.model_dump()))
+    except Exception:
+        await release_usage(db, company.id, "users")
+        raise
     
     # Create token
-    token = create_access_token({"user_id": user.id, "company_id": company.id})
+    token = create_access_token(build_token_claims(user.model_dump(), company.model_dump()))
     
     return Token(
         access_token=token,
@@ -681,7 +1375,7 @@ async def signup(user_data: UserCreate):
 @api_router.post("/auth/login", response_model=Token)
 async def login(login_data: UserLogin):
     user = await db.users.find_one({"email": login_data.email}, {"_id": 0})
-    if not user or not verify_password(login_data.password, user["password_hash"]):
+    if not user or not await verify_password_async(login_data.password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     
     if not user.get("is_active", True):
@@ -689,7 +1383,7 @@ async def login(login_data: UserLogin):
     
     company = await db.companies.find_one({"id": user["company_id"]}, {"_id": 0})
     
-    token = create_access_token({"user_id": user["id"], "company_id": user["company_id"]})
+    token = create_access_token(build_token_claims(user, company))
     
     return Token(
         access_token=token,
@@ -716,26 +1410,114 @@ async def get_company(current_user: dict = Depends(get_current_user)):
 async def update_company(company_data: CompanyCreate, current_user: dict = Depends(get_current_user)):
     await check_permission(current_user, UserRole.ADMIN)
     
-    await db.companies.update_one(
-        {"id": current_user["company"]["id"]},
-        {"$set": {"name": company_data.name, "email": company_data.email}}
-    )
-    
+    await update_company_fields(current_user["company"]["id"], {"name": company_data.name, "email": company_data.email})
+
     return {"message": "Company updated"}
 
+async def update_company_fields(company_id: str, updates: dict) -> Optional[dict]:
+    """
+    Apply company field changes (profile, subscription tier / status) and drop cached principals.
+
+    Every company write goes through here; a tier change also revokes the
+    company's tokens. Returns the company as it was before the update, or
+    None when there is no such company.
+    """
+    before = await db.companies.find_one_and_update(
+        {"id": company_id}, {"$set": company_codec.encode(dict(updates))},
+        projection={"_id": 0}, return_document=ReturnDocument.BEFORE
+    )
+    if before is None:
+        return None
+    principal_cache.invalidate_company(company_id)
+    tier = updates.get("subscription_tier")
+    if tier is not None and SubscriptionTier(tier) != SubscriptionTier(before["subscription_tier"]):
+        # Claims-mode tokens carry the tier, so re-issue is required
+        await revoke_user_tokens(company_id=company_id)
+    return before
+
+@api_router.post("/auth/logout-all")
+async def logout_all_sessions(current_user: dict = Depends(get_current_user)):
+    """Revoke every token issued to the current user"""
+    await revoke_user_tokens(user_id=current_user["user"]["id"])
+    return {"message": "All sessions revoked"}
+
+@api_router.get("/auth/cache-stats")
+async def get_auth_cache_stats(current_user: dict = Depends(get_current_user)):
+    await check_permission(current_user, UserRole.ADMIN)
+    return principal_cache.stats()
+
+# Metrics
+# Scrapers send "Authorization: Bearer <METRICS_TOKEN>"; without a token the
+# endpoint is off unless METRICS_PUBLIC=true (local development only)
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_PUBLIC = os.environ.get('METRICS_PUBLIC', 'false').lower() == 'true'
+
+metrics_registry.gauge(
+    "auth_principal_cache",
+    "Principal cache counters (hits, misses, evictions, invalidations, entries)",
+    lambda: {(key,): value for key, value in principal_cache.stats().items()
+             if key in ("hits", "misses", "evictions", "invalidations", "entries")},
+    ("stat",)
+)
+
+metrics_registry.gauge(
+    "ai_invoice_analysis",
+    "Background invoice AI analysis (queued, running, completed, failed)",
+    lambda: {(key,): value for key, value in invoice_analysis_queue.stats().items()},
+    ("state",)
+)
+
+metrics_registry.gauge(
+    "mongo_pool_connections",
+    "Mongo connection pool state (open, in use, waiting for a connection)",
+    lambda: {
+        ("open",): mongo_pool_metrics.open,
+        ("in_use",): mongo_pool_metrics.in_use,
+        ("waiting",): mongo_pool_metrics.waiting,
+    },
+    ("state",)
+)
+
+@api_router.get("/health")
+async def health_check():
+    """Liveness plus DB health: Mongo round trip and connection pool state (no auth, for load balancers)"""
+    pool = mongo_pool_metrics.snapshot()
+    pool["max_pool_size"] = MONGO_POOL_SETTINGS["maxPoolSize"]
+    try:
+        mongo = {"status": "ok", "round_trip_ms": round(await mongo_round_trip_ms(), 3)}
+    except Exception as e:
+        # Unauthenticated endpoint: the driver error (hosts, auth details) only goes to the log
+        logger.error(f"Health check: MongoDB unreachable: {e}")
+        mongo = {"status": "unreachable"}
+
+    healthy = mongo["status"] == "ok"
+    body = {
+        "status": "ok" if healthy else "degraded",
+        "mongo": mongo,
+        "pool": pool,
+        # Every connection checked out and requests queueing: add workers' pool capacity or DB headroom
+        "pool_exhausted": pool["in_use_connections"] >= pool["max_pool_size"] and pool["waiting_for_connection"] > 0,
+    }
+    return FastJSONResponse(body, status_code=200 if healthy else 503)
+
+@api_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics(request: Request):
+    """Prometheus text-format metrics for this worker (bearer METRICS_TOKEN required)"""
+    if not METRICS_PUBLIC:
+        if not METRICS_TOKEN:
+            raise HTTPException(status_code=403, detail="Metrics are disabled; set METRICS_TOKEN")
+        supplied = request.headers.get("authorization", "").encode("utf-8")
+        if not hmac.compare_digest(supplied, f"Bearer {METRICS_TOKEN}".encode("utf-8")):
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 @api_router.get("/subscription")
 async def get_subscription(current_user: dict = Depends(get_current_user)):
     company = current_user["company"]
     tier = SubscriptionTier(company["subscription_tier"])
     limits = SUBSCRIPTION_LIMITS[tier]
     
-    # Get current usage
-    start_of_month = datetime.now(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-    invoices_this_month = await db.invoices.count_documents({
-        "company_id": company["id"],
-        "created_at": {"$gte": start_of_month.isoformat()}
-    })
-    active_users = await db.users.count_documents({"company_id": company["id"], "is_active": True})
+    usage = await get_usage(db, company["id"])
     
     # Calculate trial days remaining
     trial_days_left = None
@@ -750,49 +1532,143 @@ async def get_subscription(current_user: dict = Depends(get_current_user)):
         "trial_days_left": trial_days_left,
         "limits": limits,
         "usage": {
-            "invoices_this_month": invoices_this_month,
-            "active_users": active_users
+            "invoices_this_month": usage.get("invoices", 0),
+            "active_users": usage.get("users", 0),
+            "ai_calls_this_month": usage.get("ai_calls", 0)
         },
         "pricing": PRICING
     }
 
+# Writes that feed the financial rollups (see rollups.py) and, for invoices,
+# the per-customer amount statistics (see invoice_stats.py). The source write
+# runs inside tracked_write, which applies the deltas on exit.
+@asynccontextmanager
+async def tracked_write(kind: str, company_id: str):
+    """rollup_write, plus invoice_stats_write for invoices; yields the changes list of both"""
+    async with rollup_write(db, company_id) as changes:
+        if kind == "invoices":
+            async with invoice_stats_write(db, company_id, changes):
+                yield changes
+        else:
+            yield changes
+
+async def record_tracked_change(kind: str, company_id: str, before: Optional[dict], after: Optional[dict]):
+    """Update everything else derived from `kind` documents after one of them changed"""
+    revenue_chart_cache.invalidate_company(company_id)
+    await bump_versions(db, company_id, kind)
+
+async def tracked_insert(collection, kind: str, doc: dict):
+    async with tracked_write(kind, doc["company_id"]) as changes:
+        await collection.insert_one(doc)
+        doc.pop("_id", None)
+        changes.append((kind, None, doc))
+    await record_tracked_change(kind, doc["company_id"], None, doc)
+
+async def tracked_update(collection, kind: str, query: dict, fields: dict) -> Optional[dict]:
+    """$set `fields` on one document of query["company_id"]; returns the document as it was before (None if not found)"""
+    async with tracked_write(kind, query["company_id"]) as changes:
+        before = await collection.find_one_and_update(
+            query, {"$set": fields}, projection={"_id": 0}, return_document=ReturnDocument.BEFORE
+        )
+        if before:
+            changes.append((kind, before, {**before, **fields}))
+    if before:
+        await record_tracked_change(kind, before["company_id"], before, {**before, **fields})
+    return before
+
+async def tracked_delete(collection, kind: str, query: dict) -> Optional[dict]:
+    """Delete one document of query["company_id"]; returns it (None if not found)"""
+    async with tracked_write(kind, query["company_id"]) as changes:
+        before = await collection.find_one_and_delete(query, projection={"_id": 0})
+        if before:
+            changes.append((kind, before, None))
+    if before:
+        await record_tracked_change(kind, before["company_id"], before, None)
+    return before
+
+# Set to 'true' on a replica set / sharded cluster to record a payment and
+# update its invoice in one multi-document transaction
+PAYMENT_TRANSACTIONS = os.environ.get('PAYMENT_TRANSACTIONS', 'false').lower() == 'true'
+
+def payment_pipeline(amount: float, amount_field: str) -> list:
+    """Update pipeline adding `amount` to paid_amount, then marking the document paid once it covers `amount_field`"""
+    return [
+        {"$set": {"paid_amount": {"$add": [{"$ifNull": ["$paid_amount", 0]}, amount]}}},
+        {"$set": {"status": {"$cond": [
+            {"$gte": ["$paid_amount", f"${amount_field}"]}, InvoiceStatus.PAID.value, "$status"
+        ]}}}
+    ]
+
+async def apply_payment(collection, query: dict, amount: float, amount_field: str, session=None) -> Optional[dict]:
+    """
+    Apply payment_pipeline to one document in one atomic update (concurrent
+    payments never overwrite each other). Returns the document as it was
+    before (None if not found); derived totals are left to the caller
+    (rollup_write, record_tracked_change).
+    """
+    return await collection.find_one_and_update(
+        query, payment_pipeline(amount, amount_field),
+        projection={"_id": 0}, return_document=ReturnDocument.BEFORE, session=session
+    )
+
+def after_payment(before: dict, amount: float, amount_field: str) -> dict:
+    """The document apply_payment produced from `before`"""
+    paid = (before.get("paid_amount", 0) or 0) + amount
+    status = InvoiceStatus.PAID.value if paid >= (before.get(amount_field, 0) or 0) else before["status"]
+    return {**before, "paid_amount": paid, "status": status}
+
 # Customer Routes (with multi-tenancy)
 @api_router.post("/customers", response_model=Customer)
 async def create_customer(input: CustomerCreate, current_user: dict = Depends(get_current_user)):
     await check_permission(current_user, UserRole.ACCOUNTANT)
     customer = Customer(company_id=current_user["company"]["id"], **input.model_dump())
-    await db.customers.insert_one(serialize_doc(customer.model_dump()))
+    await tracked_insert(db.customers, "customers", customer_codec.encode(customer.model_dump()))
     return customer
 
 @api_router.get("/customers", response_model=List[Customer])
-async def get_customers(current_user: dict = Depends(get_current_user)):
-    customers = await db.customers.find({"company_id": current_user["company"]["id"]}, {"_id": 0}).to_list(1000)
-    return [deserialize_doc(c) for c in customers]
+async def get_customers(
+    request: Request,
+    limit: int = Query(PAGE_DEFAULT_LIMIT, ge=1, le=PAGE_MAX_LIMIT),
+    after: Optional[str] = None,
+    sort: Literal["created_at", "name"] = "created_at",
+    order: SortOrder = "asc",
+    fields: Optional[str] = None,
+    current_user: dict = Depends(get_token_principal)
+):
+    fields = parse_fields(fields, Customer)
+    etag, not_modified = await check_etag(request, current_user["company"]["id"], "customers")
+    if not_modified:
+        return not_modified
+    customers, next_cursor = await fetch_page(
+        db.customers, {"company_id": current_user["company"]["id"]}, sort, order, limit, after, fields
+    )
+    return page_response(request, customers, next_cursor, etag, Customer, fields)
 
 @api_router.get("/customers/{customer_id}", response_model=Customer)
-async def get_customer(customer_id: str, current_user: dict = Depends(get_current_user)):
+async def get_customer(customer_id: str, current_user: dict = Depends(get_token_principal)):
     customer = await db.customers.find_one({"id": customer_id, "company_id": current_user["company"]["id"]}, {"_id": 0})
     if not customer:
         raise HTTPException(status_code=404, detail="Customer not found")
-    return deserialize_doc(customer)
+    return customer_codec.decode(customer)
 
 @api_router.put("/customers/{customer_id}", response_model=Customer)
 async def update_customer(customer_id: str, input: CustomerCreate, current_user: dict = Depends(get_current_user)):
     await check_permission(current_user, UserRole.ACCOUNTANT)
     customer = Customer(id=customer_id, company_id=current_user["company"]["id"], **input.model_dump())
-    result = await db.customers.update_one(
+    existing = await tracked_update(
+        db.customers, "customers",
         {"id": customer_id, "company_id": current_user["company"]["id"]},
-        {"$set": serialize_doc(customer.model_dump())}
+        customer_codec.encode(customer.model_dump())
     )
-    if result.matched_count == 0:
+    if not existing:
         raise HTTPException(status_code=404, detail="Customer not found")
     return customer
 
 @api_router.delete("/customers/{customer_id}")
 async def delete_customer(customer_id: str, current_user: dict = Depends(get_current_user)):
     await check_permission(current_user, UserRole.ADMIN)
-    result = await db.customers.delete_one({"id": customer_id, "company_id": current_user["company"]["id"]})
-    if result.deleted_count == 0:
+    deleted = await tracked_delete(db.customers, "customers", {"id": customer_id, "company_id": current_user["company"]["id"]})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Customer not found")
     return {"message": "Customer deleted"}
 
@@ -801,38 +1677,53 @@ async def delete_customer(customer_id: str, current_user: dict = Depends(get_cur
 async def create_vendor(input: VendorCreate, current_user: dict = Depends(get_current_user)):
     await check_permission(current_user, UserRole.ACCOUNTANT)
     vendor = Vendor(company_id=current_user["company"]["id"], **input.model_dump())
-    await db.vendors.insert_one(serialize_doc(vendor.model_dump()))
+    await tracked_insert(db.vendors, "vendors", vendor_codec.encode(vendor.model_dump()))
     return vendor
 
 @api_router.get("/vendors", response_model=List[Vendor])
-async def get_vendors(current_user: dict = Depends(get_current_user)):
-    vendors = await db.vendors.find({"company_id": current_user["company"]["id"]}, {"_id": 0}).to_list(1000)
-    return [deserialize_doc(v) for v in vendors]
+async def get_vendors(
+    request: Request,
+    limit: int = Query(PAGE_DEFAULT_LIMIT, ge=1, le=PAGE_MAX_LIMIT),
+    after: Optional[str] = None,
+    sort: Literal["created_at", "name"] = "created_at",
+    order: SortOrder = "asc",
+    fields: Optional[str] = None,
+    current_user: dict = Depends(get_token_principal)
+):
+    fields = parse_fields(fields, Vendor)
+    etag, not_modified = await check_etag(request, current_user["company"]["id"], "vendors")
+    if not_modified:
+        return not_modified
+    vendors, next_cursor = await fetch_page(
+        db.vendors, {"company_id": current_user["company"]["id"]}, sort, order, limit, after, fields
+    )
+    return page_response(request, vendors, next_cursor, etag, Vendor, fields)
 
 @api_router.get("/vendors/{vendor_id}", response_model=Vendor)
-async def get_vendor(vendor_id: str, current_user: dict = Depends(get_current_user)):
+async def get_vendor(vendor_id: str, current_user: dict = Depends(get_token_principal)):
     vendor = await db.vendors.find_one({"id": vendor_id, "company_id": current_user["company"]["id"]}, {"_id": 0})
     if not vendor:
         raise HTTPException(status_code=404, detail="Vendor not found")
-    return deserialize_doc(vendor)
+    return vendor_codec.decode(vendor)
 
 @api_router.put("/vendors/{vendor_id}", response_model=Vendor)
 async def update_vendor(vendor_id: str, input: VendorCreate, current_user: dict = Depends(get_current_user)):
     await check_permission(current_user, UserRole.ACCOUNTANT)
     vendor = Vendor(id=vendor_id, company_id=current_user["company"]["id"], **input.model_dump())
-    result = await db.vendors.update_one(
+    existing = await tracked_update(
+        db.vendors, "vendors",
         {"id": vendor_id, "company_id": current_user["company"]["id"]},
-        {"$set": serialize_doc(vendor.model_dump())}
+        vendor_codec.encode(vendor.model_dump())
     )
-    if result.matched_count == 0:
+    if not existing:
         raise HTTPException(status_code=404, detail="Vendor not found")
     return vendor
 
 @api_router.delete("/vendors/{vendor_id}")
 async def delete_vendor(vendor_id: str, current_user: dict = Depends(get_current_user)):
     await check_permission(current_user, UserRole.ADMIN)
-    result = await db.vendors.delete_one({"id": vendor_id, "company_id": current_user["company"]["id"]})
-    if result.deleted_count == 0:
+    deleted = await tracked_delete(db.vendors, "vendors", {"id": vendor_id, "company_id": current_user["company"]["id"]})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Vendor not found")
     return {"message": "Vendor deleted"}
 
@@ -848,39 +1739,62 @@ async def create_invoice(input: InvoiceCreate, current_user: dict = Depends(get_
         **input.model_dump()
     )
     
-    # AI Analysis (if Pro/Enterprise)
+    # AI Analysis (if Pro/Enterprise) runs after the insert; poll /invoices/{id}/ai-status
     tier = SubscriptionTier(current_user["company"]["subscription_tier"])
     if SUBSCRIPTION_LIMITS[tier]["ai_features"]:
-        try:
-            ai_result = await analyze_invoice_with_ai(invoice.model_dump(), current_user["company"]["id"])
-            invoice.ai_verified = True
-            
-            flags = []
-            if ai_result.is_duplicate:
-                flags.append(f"DUPLICATE: Similar to invoice {ai_result.duplicate_invoice_id}")
-            if not ai_result.calculation_verified:
-                flags.extend([f"CALC ERROR: {issue}" for issue in ai_result.calculation_issues])
-            if ai_result.anomaly_detected:
-                flags.extend([f"ANOMALY: {detail}" for detail in ai_result.anomaly_details])
-            
-            invoice.ai_flags = flags
-        except Exception as e:
-            logging.error(f"AI analysis failed: {str(e)}")
+        invoice.ai_status = "pending"
     
-    await db.invoices.insert_one(serialize_doc(invoice.model_dump()))
+    try:
+        await tracked_insert(db.invoices, "invoices", invoice_codec.encode(invoice.model_dump()))
+    except Exception:
+        await release_usage(db, invoice.company_id, "invoices")
+        raise
+    if invoice.ai_status == "pending":
+        invoice_analysis_queue.submit(invoice.company_id, invoice.id)
     return invoice
 
 @api_router.get("/invoices", response_model=List[Invoice])
-async def get_invoices(current_user: dict = Depends(get_current_user)):
-    invoices = await db.invoices.find({"company_id": current_user["company"]["id"]}, {"_id": 0}).to_list(1000)
-    return [deserialize_doc(i) for i in invoices]
+async def get_invoices(
+    request: Request,
+    limit: int = Query(PAGE_DEFAULT_LIMIT, ge=1, le=PAGE_MAX_LIMIT),
+    after: Optional[str] = None,
+    sort: Literal["created_at", "issue_date", "due_date", "invoice_number"] = "created_at",
+    order: SortOrder = "asc",
+    fields: Optional[str] = None,
+    current_user: dict = Depends(get_token_principal)
+):
+    fields = parse_fields(fields, Invoice)
+    etag, not_modified = await check_etag(request, current_user["company"]["id"], "invoices")
+    if not_modified:
+        return not_modified
+    invoices, next_cursor = await fetch_page(
+        db.invoices, {"company_id": current_user["company"]["id"]}, sort, order, limit, after, fields
+    )
+    return page_response(request, invoices, next_cursor, etag, Invoice, fields)
 
 @api_router.get("/invoices/{invoice_id}", response_model=Invoice)
-async def get_invoice(invoice_id: str, current_user: dict = Depends(get_current_user)):
+async def get_invoice(invoice_id: str, current_user: dict = Depends(get_token_principal)):
     invoice = await db.invoices.find_one({"id": invoice_id, "company_id": current_user["company"]["id"]}, {"_id": 0})
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
-    return deserialize_doc(invoice)
+    return invoice_codec.decode(invoice)
+
+@api_router.get("/invoices/{invoice_id}/ai-status")
+async def get_invoice_ai_status(invoice_id: str, current_user: dict = Depends(get_token_principal)):
+    invoice = await db.invoices.find_one(
+        {"id": invoice_id, "company_id": current_user["company"]["id"]},
+        {"_id": 0, "id": 1, "ai_status": 1, "ai_verified": 1, "ai_flags": 1, "ai_error": 1, "ai_analyzed_at": 1}
+    )
+    if not invoice:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    return {
+        "invoice_id": invoice["id"],
+        "ai_status": invoice.get("ai_status"),
+        "ai_verified": invoice.get("ai_verified", False),
+        "ai_flags": invoice.get("ai_flags", []),
+        "ai_error": invoice.get("ai_error"),
+        "ai_analyzed_at": invoice.get("ai_analyzed_at")
+    }
 
 @api_router.put("/invoices/{invoice_id}", response_model=Invoice)
 async def update_invoice(invoice_id: str, input: InvoiceCreate, current_user: dict = Depends(get_current_user)):
@@ -890,39 +1804,230 @@ async def update_invoice(invoice_id: str, input: InvoiceCreate, current_user: di
     if not existing:
         raise HTTPException(status_code=404, detail="Invoice not found")
     
+    # The edit outdates the last AI analysis: queue a new one if the tier has
+    # AI features, otherwise keep the last result as it is
+    tier = SubscriptionTier(current_user["company"]["subscription_tier"])
+    reanalyze = SUBSCRIPTION_LIMITS[tier]["ai_features"]
+    ai_fields = {} if reanalyze else {
+        field: existing[field] for field in ("ai_verified", "ai_flags", "ai_status", "ai_error", "ai_analyzed_at")
+        if field in existing
+    }
+    
     invoice = Invoice(
         id=invoice_id,
         company_id=current_user["company"]["id"],
         created_by=existing["created_by"],
         paid_amount=existing.get('paid_amount', 0.0),
+        **ai_fields,
         **input.model_dump()
     )
+    if reanalyze:
+        invoice.ai_status = "pending"
     
-    await db.invoices.update_one(
+    await tracked_update(
+        db.invoices, "invoices",
         {"id": invoice_id, "company_id": current_user["company"]["id"]},
-        {"$set": serialize_doc(invoice.model_dump())}
+        invoice_codec.encode(invoice.model_dump())
     )
+    if reanalyze:
+        invoice_analysis_queue.submit(invoice.company_id, invoice.id)
     return invoice
 
 @api_router.patch("/invoices/{invoice_id}/status")
 async def update_invoice_status(invoice_id: str, status: InvoiceStatus, current_user: dict = Depends(get_current_user)):
     await check_permission(current_user, UserRole.ACCOUNTANT)
-    result = await db.invoices.update_one(
+    existing = await tracked_update(
+        db.invoices, "invoices",
         {"id": invoice_id, "company_id": current_user["company"]["id"]},
-        {"$set": {"status": status}}
+        {"status": status}
     )
-    if result.matched_count == 0:
+    if not existing:
         raise HTTPException(status_code=404, detail="Invoice not found")
     return {"message": "Status updated"}
 
 @api_router.delete("/invoices/{invoice_id}")
 async def delete_invoice(invoice_id: str, current_user: dict = Depends(get_current_user)):
     await check_permission(current_user, UserRole.ADMIN)
-    result = await db.invoices.delete_one({"id": invoice_id, "company_id": current_user["company"]["id"]})
-    if result.deleted_count == 0:
+    deleted = await tracked_delete(db.invoices, "invoices", {"id": invoice_id, "company_id": current_user["company"]["id"]})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Invoice not found")
+    await release_usage(db, deleted["company_id"], "invoices", period_of(deleted.get("created_at")))
     return {"message": "Invoice deleted"}
 
+# Bulk invoice import (see invoice_import.py for the file formats)
+IMPORT_BATCH_SIZE = int(os.environ.get('IMPORT_BATCH_SIZE', '1000'))
+IMPORT_MAX_ERRORS = int(os.environ.get('IMPORT_MAX_ERRORS', '1000'))
+
+def normalize_import_rows(rows: List[ImportRow]) -> List[ImportRow]:
+    """Normalize each row's fields in place (CPU only, run in a worker thread); returns the rows without errors"""
+    for row in rows:
+        if not row.errors:
+            row.errors.extend(normalize_invoice(row.data))
+    return [row for row in rows if not row.errors]
+
+async def validate_import_batch(rows: List[ImportRow], current_user: dict, seen_numbers: set) -> List[Tuple[ImportRow, dict]]:
+    """
+    Validate one batch of import rows; failures are recorded on row.errors.
+    Customers and already-used invoice numbers are looked up with one query
+    each; normalizing and validating the rows runs in worker threads.
+    `seen_numbers` holds the numbers earlier batches of the file inserted.
+
+    Returns:
+        (row, invoice document) for every row that can be inserted
+    """
+    company_id = current_user["company"]["id"]
+    valid = await asyncio.to_thread(normalize_import_rows, rows)
+
+    refs = {key: {row.data[key] for row in valid if row.data.get(key)}
+            for key in ("customer_id", "customer_email", "customer_name")}
+    clauses = [{field: {"$in": list(refs[key])}}
+               for key, field in (("customer_id", "id"), ("customer_email", "email"), ("customer_name", "name")) if refs[key]]
+    customers = await db.customers.find(
+        {"company_id": company_id, "$or": clauses}, {"_id": 0, "id": 1, "name": 1, "email": 1}
+    ).to_list(None) if clauses else []
+
+    numbers = {row.data["invoice_number"] for row in valid if row.data.get("invoice_number")}
+    existing = {doc["invoice_number"] for doc in await db.invoices.find(
+        {"company_id": company_id, "invoice_number": {"$in": list(numbers)}}, {"_id": 0, "invoice_number": 1}
+    ).to_list(None)} if numbers else set()
+
+    return await asyncio.to_thread(
+        build_import_invoices, valid, customers, existing, seen_numbers, company_id, current_user["user"]["id"]
+    )
+
+def build_import_invoices(valid: List[ImportRow], customers: List[dict], existing: set, seen_numbers: set,
+                          company_id: str, user_id: str) -> List[Tuple[ImportRow, dict]]:
+    """
+    Resolve each row's customer and build its Invoice (CPU only, run in a
+    worker thread). `existing` holds the batch's numbers already in the
+    database. Failures are recorded on row.errors.
+    """
+    by_id = {c["id"]: c for c in customers}
+    by_email = {c["email"]: c for c in customers}
+    by_name = {}
+    for c in customers:
+        by_name.setdefault(c["name"], []).append(c)
+
+    accepted = []
+    batch_numbers = set()
+    for row in valid:
+        data = row.data
+        if data.get("customer_id"):
+            customer = by_id.get(data["customer_id"])
+        elif data.get("customer_email"):
+            customer = by_email.get(data["customer_email"])
+        else:
+            matches = by_name.get(data.get("customer_name"), [])
+            if len(matches) > 1:
+                row.errors.append(f"Customer name '{data['customer_name']}' is ambiguous; use customer_id or customer_email")
+                continue
+            customer = matches[0] if matches else None
+        if not customer:
+            row.errors.append("Customer not found")
+            continue
+        data["customer_id"], data["customer_name"] = customer["id"], customer["name"]
+
+        number = data.get("invoice_number")
+        if number in existing:
+            row.errors.append(f"Invoice number {number} already exists")
+            continue
+        if number in seen_numbers or number in batch_numbers:
+            row.errors.append(f"Invoice number {number} appears more than once in the file")
+            continue
+
+        try:
+            invoice_input = InvoiceCreate(**data)
+        except ValidationError as e:
+            row.errors.extend(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+            continue
+        issues = InvoiceAnomalyEngine.check_arithmetic(invoice_input.model_dump())
+        if issues:
+            row.errors.extend(issues)
+            continue
+
+        paid_amount = data.get("paid_amount")
+        if paid_amount is None:
+            paid_amount = invoice_input.total if invoice_input.status == InvoiceStatus.PAID else 0.0
+        invoice = Invoice(
+            company_id=company_id,
+            created_by=user_id,
+            paid_amount=paid_amount,
+            **invoice_input.model_dump()
+        )
+        batch_numbers.add(number)
+        accepted.append((row, invoice_codec.encode(invoice.model_dump())))
+    return accepted
+
+@api_router.post("/invoices/import")
+async def import_invoices(
+    file: UploadFile = File(...),
+    format: Optional[Literal["csv", "jsonl", "json"]] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Import invoices from a CSV, JSON Lines or JSON array file (Tally / Excel migration).
+
+    Rows are read incrementally and handled in batches: one customer lookup,
+    one duplicate lookup and one unordered insert_many per batch. Imported
+    invoices count against the monthly invoice limit and skip AI analysis.
+    Returns counts plus a per-row error report.
+    """
+    await check_permission(current_user, UserRole.ACCOUNTANT)
+    fmt = format or detect_format(file.filename, file.content_type)
+    if fmt is None:
+        raise HTTPException(status_code=400, detail="Unsupported file type; upload .csv, .jsonl or .json (or pass format=)")
+
+    company = current_user["company"]
+    tier = SubscriptionTier(company["subscription_tier"])
+    invoice_limit = SUBSCRIPTION_LIMITS[tier]["invoices_per_month"]
+    batches = batched(iter_import_rows(file.file, fmt), IMPORT_BATCH_SIZE)
+    seen_numbers = set()
+    report = {"rows": 0, "imported": 0, "failed": 0, "errors": [], "errors_truncated": False}
+
+    def fail(row: ImportRow):
+        report["failed"] += 1
+        if len(report["errors"]) < IMPORT_MAX_ERRORS:
+            report["errors"].append(row.report())
+        else:
+            report["errors_truncated"] = True
+
+    while True:
+        # The upload is spooled to a temporary file; read and parse it off the event loop
+        batch = await asyncio.to_thread(next, batches, None)
+        if not batch:
+            break
+        report["rows"] += len(batch)
+        accepted = await validate_import_batch(batch, current_user, seen_numbers)
+
+        granted = await reserve_usage_up_to(db, company["id"], "invoices", invoice_limit, len(accepted))
+        for row, _ in accepted[granted:]:
+            row.errors.append(f"Invoice limit reached for {tier.value} tier")
+        accepted = accepted[:granted]
+
+        if accepted:
+            # Fenced without deltas: the rebuilds below count the imported invoices
+            async with tracked_write("invoices", company["id"]):
+                try:
+                    await db.invoices.insert_many([doc for _, doc in accepted], ordered=False)
+                except BulkWriteError as e:
+                    for error in e.details.get("writeErrors", []):
+                        accepted[error["index"]][0].errors.append(error.get("errmsg", "Insert failed"))
+                    await release_usage(db, company["id"], "invoices", amount=len(e.details.get("writeErrors", [])))
+        seen_numbers.update(doc["invoice_number"] for row, doc in accepted if not row.errors)
+        for row in batch:
+            if row.errors:
+                fail(row)
+            else:
+                report["imported"] += 1
+
+    if report["imported"]:
+        # One rebuild instead of a delta per imported invoice
+        await refresh_rollups(db, company["id"])
+        await refresh_invoice_stats(db, company["id"])
+        revenue_chart_cache.invalidate_company(company["id"])
+        await bump_versions(db, company["id"], "invoices")
+    return report
+
 # Payment Routes
 @api_router.post("/payments", response_model=Payment)
 async def create_payment(input: PaymentCreate, current_user: dict = Depends(get_current_user)):
@@ -933,25 +2038,47 @@ async def create_payment(input: PaymentCreate, current_user: dict = Depends(get_
         created_by=current_user["user"]["id"],
         **input.model_dump()
     )
-    await db.payments.insert_one(serialize_doc(payment.model_dump()))
     
-    # Update invoice
-    if input.invoice_id:
-        invoice = await db.invoices.find_one({"id": input.invoice_id, "company_id": current_user["company"]["id"]}, {"_id": 0})
+    async def record(session=None) -> Optional[dict]:
+        await db.payments.insert_one(payment_codec.encode(payment.model_dump()), session=session)
+        if not input.invoice_id:
+            return None
+        return await apply_payment(
+            db.invoices, {"id": input.invoice_id, "company_id": payment.company_id}, input.amount, "total", session
+        )
+    
+    async with rollup_write(db, payment.company_id) as changes:
+        if PAYMENT_TRANSACTIONS:
+            async with await client.start_session() as session:
+                invoice = await session.with_transaction(record)
+        else:
+            invoice = await record()
         if invoice:
-            new_paid = invoice.get('paid_amount', 0.0) + input.amount
-            new_status = InvoiceStatus.PAID if new_paid >= invoice['total'] else invoice['status']
-            await db.invoices.update_one(
-                {"id": input.invoice_id, "company_id": current_user["company"]["id"]},
-                {"$set": {"paid_amount": new_paid, "status": new_status}}
-            )
+            changes.append(("invoices", invoice, after_payment(invoice, input.amount, "total")))
+    if invoice:
+        await record_tracked_change("invoices", payment.company_id, invoice, after_payment(invoice, input.amount, "total"))
+    await bump_versions(db, payment.company_id, "payments")
     
     return payment
 
 @api_router.get("/payments", response_model=List[Payment])
-async def get_payments(current_user: dict = Depends(get_current_user)):
-    payments = await db.payments.find({"company_id": current_user["company"]["id"]}, {"_id": 0}).to_list(1000)
-    return [deserialize_doc(p) for p in payments]
+async def get_payments(
+    request: Request,
+    limit: int = Query(PAGE_DEFAULT_LIMIT, ge=1, le=PAGE_MAX_LIMIT),
+    after: Optional[str] = None,
+    sort: Literal["created_at", "payment_date"] = "created_at",
+    order: SortOrder = "asc",
+    fields: Optional[str] = None,
+    current_user: dict = Depends(get_token_principal)
+):
+    fields = parse_fields(fields, Payment)
+    etag, not_modified = await check_etag(request, current_user["company"]["id"], "payments")
+    if not_modified:
+        return not_modified
+    payments, next_cursor = await fetch_page(
+        db.payments, {"company_id": current_user["company"]["id"]}, sort, order, limit, after, fields
+    )
+    return page_response(request, payments, next_cursor, etag, Payment, fields)
 
 @api_router.delete("/payments/{payment_id}")
 async def delete_payment(payment_id: str, current_user: dict = Depends(get_current_user)):
@@ -959,8 +2086,100 @@ async def delete_payment(payment_id: str, current_user: dict = Depends(get_curre
     result = await db.payments.delete_one({"id": payment_id, "company_id": current_user["company"]["id"]})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Payment not found")
+    await bump_versions(db, current_user["company"]["id"], "payments")
     return {"message": "Payment deleted"}
 
+# Receivables reconciliation (see invoice_engine/reconciliation.py)
+RECONCILIATION_MAX_RECEIPTS = int(os.environ.get('RECONCILIATION_MAX_RECEIPTS', '10000'))
+OPEN_INVOICE_STATUSES = [InvoiceStatus.SENT.value, InvoiceStatus.OVERDUE.value]
+
+@api_router.post("/reconciliation/receipts")
+async def reconcile_receipts(input: ReconciliationRequest, current_user: dict = Depends(get_current_user)):
+    """
+    Match bank receipts to open (sent/overdue) invoices and, with apply=true,
+    record payments for matches at or above min_confidence: one conditional
+    update per invoice and one insert_many for the payments of those that
+    applied.
+    """
+    await check_permission(current_user, UserRole.ACCOUNTANT)
+    if len(input.receipts) > RECONCILIATION_MAX_RECEIPTS:
+        raise HTTPException(status_code=400, detail=f"At most {RECONCILIATION_MAX_RECEIPTS} receipts per run")
+    company_id = current_user["company"]["id"]
+
+    invoices = await db.invoices.find(
+        {"company_id": company_id, "status": {"$in": OPEN_INVOICE_STATUSES}},
+        {"_id": 0, "id": 1, "invoice_number": 1, "customer_id": 1, "customer_name": 1,
+         "total": 1, "paid_amount": 1, "due_date": 1}
+    ).to_list(None)
+    receipts = [receipt.model_dump() for receipt in input.receipts]
+
+    def run_matching():
+        reconciler = ReceivablesReconciler(invoices, input.amount_tolerance, input.date_window_days)
+        return reconciler.match(receipts)
+
+    results = await asyncio.to_thread(run_matching)
+    summary = {status: sum(1 for r in results if r["status"] == status) for status in ("matched", "ambiguous", "unmatched")}
+
+    applied = []
+    to_apply = [r for r in results if r["status"] == "matched" and r["confidence"] >= input.min_confidence]
+    if input.apply and to_apply:
+        paid_before = {inv["id"]: inv.get("paid_amount") for inv in invoices}
+
+        async def pay(r, session=None) -> bool:
+            # Pinned to the state the invoice was matched against; one that changed meanwhile is skipped
+            result = await db.invoices.update_one(
+                {"id": r["invoice_id"], "company_id": company_id, "status": {"$in": OPEN_INVOICE_STATUSES},
+                 "paid_amount": paid_before[r["invoice_id"]]},
+                payment_pipeline(r["amount"], "total"), session=session
+            )
+            return result.matched_count == 1
+
+        async def record(session=None) -> list:
+            if session is None:
+                paid = await asyncio.gather(*(pay(r) for r in to_apply))
+            else:
+                # A session runs one operation at a time
+                paid = [await pay(r, session) for r in to_apply]
+            done = [r for r, ok in zip(to_apply, paid) if ok]
+            payments = []
+            for r in done:
+                receipt = input.receipts[r["receipt_index"]]
+                payment = Payment(
+                    company_id=company_id,
+                    payment_number=receipt.reference or f"RCPT-{receipt.date:%Y%m%d}-{r['receipt_index'] + 1}",
+                    invoice_id=r["invoice_id"],
+                    customer_id=r["customer_id"],
+                    customer_name=r["customer_name"],
+                    amount=receipt.amount,
+                    payment_date=receipt.date,
+                    payment_method=receipt.payment_method,
+                    notes=f"Reconciled from bank receipt {receipt.reference or ''}".strip(),
+                    created_by=current_user["user"]["id"]
+                )
+                r["payment_id"] = payment.id
+                payments.append(payment_codec.encode(payment.model_dump()))
+            if payments:
+                await db.payments.insert_many(payments, ordered=False, session=session)
+            return done
+
+        # Fenced without deltas: the rebuild below counts the payments
+        async with rollup_write(db, company_id):
+            if PAYMENT_TRANSACTIONS:
+                async with await client.start_session() as session:
+                    applied = await session.with_transaction(record)
+            else:
+                applied = await record()
+        if applied:
+            # One rebuild instead of a delta per paid invoice
+            await refresh_rollups(db, company_id)
+            revenue_chart_cache.invalidate_company(company_id)
+            await bump_versions(db, company_id, "invoices", "payments")
+
+    applied_ids = {id(r) for r in applied}
+    for r in results:
+        r["applied"] = id(r) in applied_ids
+    return {"receipts": len(results), **summary, "applied": len(applied), "results": results}
+
 # Bill Routes
 @api_router.post("/bills", response_model=Bill)
 async def create_bill(input: BillCreate, current_user: dict = Depends(get_current_user)):
@@ -970,13 +2189,27 @@ async def create_bill(input: BillCreate, current_user: dict = Depends(get_curren
         created_by=current_user["user"]["id"],
         **input.model_dump()
     )
-    await db.bills.insert_one(serialize_doc(bill.model_dump()))
+    await tracked_insert(db.bills, "bills", bill_codec.encode(bill.model_dump()))
     return bill
 
 @api_router.get("/bills", response_model=List[Bill])
-async def get_bills(current_user: dict = Depends(get_current_user)):
-    bills = await db.bills.find({"company_id": current_user["company"]["id"]}, {"_id": 0}).to_list(1000)
-    return [deserialize_doc(b) for b in bills]
+async def get_bills(
+    request: Request,
+    limit: int = Query(PAGE_DEFAULT_LIMIT, ge=1, le=PAGE_MAX_LIMIT),
+    after: Optional[str] = None,
+    sort: Literal["created_at", "due_date"] = "created_at",
+    order: SortOrder = "asc",
+    fields: Optional[str] = None,
+    current_user: dict = Depends(get_token_principal)
+):
+    fields = parse_fields(fields, Bill)
+    etag, not_modified = await check_etag(request, current_user["company"]["id"], "bills")
+    if not_modified:
+        return not_modified
+    bills, next_cursor = await fetch_page(
+        db.bills, {"company_id": current_user["company"]["id"]}, sort, order, limit, after, fields
+    )
+    return page_response(request, bills, next_cursor, etag, Bill, fields)
 
 @api_router.put("/bills/{bill_id}", response_model=Bill)
 async def update_bill(bill_id: str, input: BillCreate, current_user: dict = Depends(get_current_user)):
@@ -992,93 +2225,152 @@ async def update_bill(bill_id: str, input: BillCreate, current_user: dict = Depe
         paid_amount=existing.get('paid_amount', 0.0),
         **input.model_dump()
     )
-    await db.bills.update_one(
+    await tracked_update(
+        db.bills, "bills",
         {"id": bill_id, "company_id": current_user["company"]["id"]},
-        {"$set": serialize_doc(bill.model_dump())}
+        bill_codec.encode(bill.model_dump())
     )
     return bill
 
 @api_router.patch("/bills/{bill_id}/pay")
 async def pay_bill(bill_id: str, amount: float, current_user: dict = Depends(get_current_user)):
     await check_permission(current_user, UserRole.ACCOUNTANT)
-    bill = await db.bills.find_one({"id": bill_id, "company_id": current_user["company"]["id"]}, {"_id": 0})
+    async with rollup_write(db, current_user["company"]["id"]) as changes:
+        bill = await apply_payment(db.bills, {"id": bill_id, "company_id": current_user["company"]["id"]}, amount, "amount")
+        if bill:
+            changes.append(("bills", bill, after_payment(bill, amount, "amount")))
     if not bill:
         raise HTTPException(status_code=404, detail="Bill not found")
-    
-    new_paid = bill.get('paid_amount', 0.0) + amount
-    new_status = InvoiceStatus.PAID if new_paid >= bill['amount'] else bill['status']
-    
-    await db.bills.update_one(
-        {"id": bill_id, "company_id": current_user["company"]["id"]},
-        {"$set": {"paid_amount": new_paid, "status": new_status}}
-    )
+    await record_tracked_change("bills", bill["company_id"], bill, after_payment(bill, amount, "amount"))
     return {"message": "Payment recorded"}
 
 @api_router.delete("/bills/{bill_id}")
 async def delete_bill(bill_id: str, current_user: dict = Depends(get_current_user)):
     await check_permission(current_user, UserRole.ADMIN)
-    result = await db.bills.delete_one({"id": bill_id, "company_id": current_user["company"]["id"]})
-    if result.deleted_count == 0:
+    deleted = await tracked_delete(db.bills, "bills", {"id": bill_id, "company_id": current_user["company"]["id"]})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Bill not found")
     return {"message": "Bill deleted"}
 
 # Dashboard
+DASHBOARD_KINDS = ("invoices", "bills", "customers", "vendors", "rollups")
+
 @api_router.get("/dashboard/stats")
-async def get_dashboard_stats(current_user: dict = Depends(get_current_user)):
+async def get_dashboard_stats(request: Request, current_user: dict = Depends(get_token_principal)):
     company_id = current_user["company"]["id"]
-    
-    invoices = await db.invoices.find({"company_id": company_id}, {"_id": 0}).to_list(10000)
-    bills = await db.bills.find({"company_id": company_id}, {"_id": 0}).to_list(10000)
-    customers = await db.customers.find({"company_id": company_id}, {"_id": 0}).to_list(10000)
-    vendors = await db.vendors.find({"company_id": company_id}, {"_id": 0}).to_list(10000)
-    
-    total_revenue = sum(inv['total'] for inv in invoices if inv['status'] == 'paid')
-    total_expenses = sum(bill['amount'] for bill in bills if bill['status'] == 'paid')
-    outstanding_receivables = sum(inv['total'] - inv.get('paid_amount', 0) for inv in invoices if inv['status'] in ['sent', 'overdue'])
-    outstanding_payables = sum(bill['amount'] - bill.get('paid_amount', 0) for bill in bills if bill['status'] in ['sent', 'overdue'])
-    
-    return {
-        "total_revenue": total_revenue,
-        "total_expenses": total_expenses,
-        "outstanding_receivables": outstanding_receivables,
-        "outstanding_payables": outstanding_payables,
-        "total_customers": len(customers),
-        "total_vendors": len(vendors),
-        "total_invoices": len(invoices),
-        "paid_invoices": len([inv for inv in invoices if inv['status'] == 'paid']),
-        "overdue_invoices": len([inv for inv in invoices if inv['status'] == 'overdue'])
-    }
+    etag, not_modified = await check_etag(request, company_id, *DASHBOARD_KINDS)
+    if not_modified:
+        return not_modified
+    # Built on the first view for this company, then kept current by the write routes
+    rollup = await current_rollup(db, company_id)
+    return FastJSONResponse(dashboard_stats_from_rollup(rollup), headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+
+@api_router.post("/dashboard/rollups/rebuild")
+async def rebuild_dashboard_rollups(current_user: dict = Depends(get_current_user)):
+    """Recompute this company's rollups from invoices/bills/customers/vendors (repair after drift)"""
+    await check_permission(current_user, UserRole.ADMIN)
+    try:
+        rollup = await rebuild_rollups(db, current_user["company"]["id"])
+    except FenceBusy:
+        raise HTTPException(status_code=503, detail="Writes in progress, try again shortly")
+    await bump_versions(db, current_user["company"]["id"], "rollups")
+    return dashboard_stats_from_rollup(rollup)
+
+class CompanyResultCache:
+    """
+    In-process TTL/LRU cache of derived per-company results (e.g. chart data).
+
+    Keys are (company_id, variant). Write paths call invalidate_company so
+    this worker recomputes on the next read; other workers converge within
+    the TTL.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (company_id, variant) -> (expires_at, value)
+
+    def get(self, company_id: str, variant=None):
+        entry = self._entries.get((company_id, variant))
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[(company_id, variant)]
+            return None
+        self._entries.move_to_end((company_id, variant))
+        return value
+
+    def set(self, company_id: str, value, variant=None):
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        self._entries[(company_id, variant)] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end((company_id, variant))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate_company(self, company_id: str):
+        for key in [key for key in self._entries if key[0] == company_id]:
+            del self._entries[key]
+
+revenue_chart_cache = CompanyResultCache(
+    float(os.environ.get('REVENUE_CHART_CACHE_TTL_SECONDS', '300')),
+    int(os.environ.get('REVENUE_CHART_CACHE_MAX_ENTRIES', '10000'))
+)
+
+def last_months(count: int, now: Optional[datetime] = None) -> List[str]:
+    """The `count` most recent 'YYYY-MM' keys ending with the current month, oldest first"""
+    now = now or datetime.now(timezone.utc)
+    year, month = now.year, now.month
+    keys = []
+    for _ in range(count):
+        keys.append(f"{year:04d}-{month:02d}")
+        year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+    return keys[::-1]
+
+async def paid_totals_by_month(collection, company_id: str, amount_field: str, since: str) -> dict:
+    """'YYYY-MM' -> sum of `amount_field` over paid documents created since `since`"""
+    rows = await collection.aggregate([
+        {"$match": {"company_id": company_id, "status": "paid", "created_at": {"$gte": since}}},
+        {"$group": {"_id": {"$substrCP": ["$created_at", 0, 7]}, "amount": {"$sum": f"${amount_field}"}}}
+    ]).to_list(None)
+    return {row["_id"]: row["amount"] for row in rows}
 
 @api_router.get("/dashboard/revenue-chart")
-async def get_revenue_chart(current_user: dict = Depends(get_current_user)):
+async def get_revenue_chart(
+    request: Request,
+    months: int = Query(6, ge=1, le=36),
+    current_user: dict = Depends(get_token_principal)
+):
+    """Paid revenue and expenses for the last `months` months (by created_at), oldest first, zero-filled"""
     company_id = current_user["company"]["id"]
-    invoices = await db.invoices.find({"company_id": company_id}, {"_id": 0}).to_list(10000)
-    bills = await db.bills.find({"company_id": company_id}, {"_id": 0}).to_list(10000)
-    
-    monthly_data = {}
-    for inv in invoices:
-        if inv['status'] == 'paid':
-            date = datetime.fromisoformat(inv['created_at']) if isinstance(inv['created_at'], str) else inv['created_at']
-            month_key = date.strftime('%b %Y')
-            if month_key not in monthly_data:
-                monthly_data[month_key] = {'revenue': 0, 'expenses': 0}
-            monthly_data[month_key]['revenue'] += inv['total']
-    
-    for bill in bills:
-        if bill['status'] == 'paid':
-            date = datetime.fromisoformat(bill['created_at']) if isinstance(bill['created_at'], str) else bill['created_at']
-            month_key = date.strftime('%b %Y')
-            if month_key not in monthly_data:
-                monthly_data[month_key] = {'revenue': 0, 'expenses': 0}
-            monthly_data[month_key]['expenses'] += bill['amount']
-    
-    result = [{"month": month, "revenue": data['revenue'], "expenses": data['expenses']} for month, data in monthly_data.items()]
-    
-    if not result:
-        current_month = datetime.now().strftime('%b %Y')
-        result = [{"month": current_month, "revenue": 0, "expenses": 0}]
-    
-    return result[-6:]
+    month_keys = last_months(months)
+    # The window moves with the calendar, so the current month is part of the tag
+    etag, not_modified = await check_etag(
+        request, company_id, "invoices", "bills", resource=f"{request.url.path}?{request.url.query}#{month_keys[-1]}"
+    )
+    if not_modified:
+        return not_modified
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    cached = revenue_chart_cache.get(company_id, months)
+    if cached is not None:
+        return FastJSONResponse(cached, headers=headers)
+
+    since = f"{month_keys[0]}-01"
+    revenue, expenses = await asyncio.gather(
+        paid_totals_by_month(db.invoices, company_id, "total", since),
+        paid_totals_by_month(db.bills, company_id, "amount", since)
+    )
+    result = [
+        {
+            "month": datetime.strptime(key, "%Y-%m").strftime('%b %Y'),
+            "revenue": revenue.get(key, 0),
+            "expenses": expenses.get(key, 0)
+        }
+        for key in month_keys
+    ]
+    revenue_chart_cache.set(company_id, result, months)
+    return FastJSONResponse(result, headers=headers)
 
 # News Feed Routes
 @api_router.get("/news/feed", response_model=List[NewsItem])
@@ -1087,7 +2379,7 @@ async def get_news_feed(
     city: Optional[str] = None,
     urgency: Optional[NewsUrgency] = None,
     limit: int = 50,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_token_principal)
 ):
     """Get news feed with optional filters"""
     query = {"is_active": True}
@@ -1100,15 +2392,15 @@ async def get_news_feed(
         query["urgency"] = urgency
     
     news_items = await db.news.find(query, {"_id": 0}).sort("published_date", -1).limit(limit).to_list(limit)
-    return [deserialize_doc(item) for item in news_items]
+    return news_codec.decode_many(news_items)
 
 @api_router.get("/news/{news_id}", response_model=NewsItem)
-async def get_news_item(news_id: str, current_user: dict = Depends(get_current_user)):
+async def get_news_item(news_id: str, current_user: dict = Depends(get_token_principal)):
     """Get single news item details"""
     news = await db.news.find_one({"id": news_id, "is_active": True}, {"_id": 0})
     if not news:
         raise HTTPException(status_code=404, detail="News item not found")
-    return deserialize_doc(news)
+    return news_codec.decode(news)
 
 @api_router.post("/news", response_model=NewsItem)
 async def create_news(input: NewsItemCreate, current_user: dict = Depends(get_current_user)):
@@ -1119,7 +2411,7 @@ async def create_news(input: NewsItemCreate, current_user: dict = Depends(get_cu
         created_by=current_user["user"]["id"],
         **input.model_dump()
     )
-    await db.news.insert_one(serialize_doc(news.model_dump()))
+    await db.news.insert_one(news_codec.encode(news.model_dump()))
     return news
 
 @api_router.put("/news/{news_id}", response_model=NewsItem)
@@ -1140,7 +2432,7 @@ async def update_news(news_id: str, input: NewsItemCreate, current_user: dict =
     
     await db.news.update_one(
         {"id": news_id},
-        {"$set": serialize_doc(news.model_dump())}
+        {"$set": news_codec.encode(news.model_dump())}
     )
     return news
 
@@ -1174,6 +2466,7 @@ async def upload_form16(
     current_user: dict = Depends(get_current_user)
 ):
     """Upload Form-16 and extract data using Gemini 2.5 Pro with vision"""
+    await count_ai_call(current_user["company"])
     temp_file_path = None
     try:
         # Save uploaded file temporarily
@@ -1242,7 +2535,8 @@ If a field is not found, use null. For amounts, extract only numbers without cur
         )
         
         # Send message and get response
-        response = await chat.send_message(user_message)
+        with llm_timer("gemini", "gemini-2.5-pro"):
+            response = await chat.send_message(user_message)
         
         # Parse JSON from response (handle markdown code blocks if present)
         response_text = response.strip()
@@ -1352,7 +2646,7 @@ async def calculate_tax(
             status="calculated"
         )
         
-        await db.itr_filings.insert_one(serialize_doc(itr_filing.model_dump()))
+        await db.itr_filings.insert_one(itr_filing_codec.encode(itr_filing.model_dump()))
         
         return {
             "success": True,
@@ -1379,7 +2673,7 @@ async def calculate_tax(
             status="calculated"
         )
         
-        await db.itr_filings.insert_one(serialize_doc(itr_filing.model_dump()))
+        await db.itr_filings.insert_one(itr_filing_codec.encode(itr_filing.model_dump()))
         
         return {
             "success": True,
@@ -1391,15 +2685,18 @@ async def calculate_tax(
         raise HTTPException(status_code=500, detail=f"Error calculating tax: {str(e)}")
 
 @api_router.get("/itr/history")
-async def get_itr_history(current_user: dict = Depends(get_current_user)):
-    """Get ITR filing history for the user"""
+async def get_itr_history(
+    fields: Optional[str] = None,
+    current_user: dict = Depends(get_token_principal)
+):
+    """Get ITR filing history for the user (fields= skips form16_data/tax_calculation for list views)"""
     user_id = current_user["user"]["id"]
     filings = await db.itr_filings.find(
         {"user_id": user_id},
-        {"_id": 0}
+        build_projection(parse_fields(fields, ITRFiling))
     ).sort("created_at", -1).to_list(100)
     
-    return [deserialize_doc(filing) for filing in filings]
+    return itr_filing_codec.decode_many(filings)
 
 @api_router.post("/itr/{itr_id}/file")
 async def file_itr(
@@ -1537,12 +2834,13 @@ async def generate_itr_pdf(
     # Generate PDF
     try:
         generator = ITRPDFGenerator()
-        pdf_bytes = generator.generate_complete_itr(
-            user_data=user_data,
-            tax_calculation=tax_calc_clean,
-            itr_type='ITR-1',
-            financial_year=filing.get('financial_year', '2024-25')
-        )
+        with pdf_timer("itr"):
+            pdf_bytes = generator.generate_complete_itr(
+                user_data=user_data,
+                tax_calculation=tax_calc_clean,
+                itr_type='ITR-1',
+                financial_year=filing.get('financial_year', '2024-25')
+            )
         
         # Update filing with PDF generation timestamp
         await db.itr_filings.update_one(
@@ -1822,35 +3120,78 @@ async def create_or_update_gst_profile(
     if existing:
         await db.gst_profiles.update_one(
             {"company_id": company_id, "gstin": profile_data.gstin},
-            {"$set": serialize_doc(profile.model_dump())}
+            {"$set": gst_profile_codec.encode(profile.model_dump())}
         )
     else:
-        await db.gst_profiles.insert_one(serialize_doc(profile.model_dump()))
+        await db.gst_profiles.insert_one(gst_profile_codec.encode(profile.model_dump()))
     
     return {
         "success": True,
-        "profile": serialize_doc(profile.model_dump()),
+        "profile": gst_profile_codec.encode(profile.model_dump()),
         "profile_complete": True,
         "state": validation['state']
     }
 
 
 @api_router.get("/gst/profile")
-async def get_gst_profiles(current_user: dict = Depends(get_current_user)):
+async def get_gst_profiles(current_user: dict = Depends(get_token_principal)):
     """Get all GST profiles for the company"""
     company_id = current_user["company"]["id"]
     profiles = await db.gst_profiles.find({"company_id": company_id}, {"_id": 0}).to_list(100)
-    return [deserialize_doc(p) for p in profiles]
+    return gst_profile_codec.decode_many(profiles)
 
 
 @api_router.get("/gst/profile/{gstin}")
-async def get_gst_profile_by_gstin(gstin: str, current_user: dict = Depends(get_current_user)):
+async def get_gst_profile_by_gstin(gstin: str, current_user: dict = Depends(get_token_principal)):
     """Get specific GST profile by GSTIN"""
     company_id = current_user["company"]["id"]
     profile = await db.gst_profiles.find_one({"company_id": company_id, "gstin": gstin}, {"_id": 0})
     if not profile:
         raise HTTPException(status_code=404, detail="GST profile not found")
-    return deserialize_doc(profile)
+    return gst_profile_codec.decode(profile)
+
+
+class IndexCheck:
+    """
+    Whether one index exists. Remembered once seen; while missing it is
+    looked up again at most every `recheck_seconds`.
+    """
+
+    def __init__(self, collection: str, name: str, recheck_seconds: float = 60):
+        self.collection = collection
+        self.name = name
+        self.recheck_seconds = recheck_seconds
+        self._present = False
+        self._checked_at = float("-inf")
+
+    async def present(self, database) -> bool:
+        if not self._present and time.monotonic() - self._checked_at >= self.recheck_seconds:
+            self._checked_at = time.monotonic()
+            self._present = self.name in await database[self.collection].index_information()
+        return self._present
+
+# Rejects duplicate GST invoice numbers on insert. It is not built while old
+# data holds conflicting numbers (db_indexes logs them); until then the GST
+# routes look the number up before inserting.
+gst_invoice_number_index = IndexCheck("gst_invoices", "gst_invoice_number_unique")
+
+async def existing_gst_invoice_keys(company_id: str, gstin: str, period: str, keys: List[str]) -> set:
+    """The invoice_number_keys among `keys` already used in the period"""
+    return {doc["invoice_number_key"] for doc in await db.gst_invoices.find(
+        {"company_id": company_id, "gstin": gstin, "period": period, "invoice_number_key": {"$in": keys}},
+        {"_id": 0, "invoice_number_key": 1}
+    ).to_list(None)}
+
+# Set to 'true' on a replica set / sharded cluster to write GST invoices and
+# their period totals (gst_period_totals) in one multi-document transaction
+GST_TRANSACTIONS = os.environ.get('GST_TRANSACTIONS', 'false').lower() == 'true'
+
+async def run_gst_write(record):
+    """record(session) in a transaction when GST_TRANSACTIONS is on, else record()"""
+    if GST_TRANSACTIONS:
+        async with await client.start_session() as session:
+            return await session.with_transaction(record)
+    return await record()
 
 
 @api_router.post("/gst/{gstin}/{period}/invoice")
@@ -1862,6 +3203,7 @@ async def add_gst_invoice(
 ):
     """Add invoice to GSTR-1 for a period"""
     from gst_engine.orchestrator import GSTOrchestrator
+    from gst_engine.validators.gst_validator import GSTValidator
     
     company_id = current_user["company"]["id"]
     
@@ -1870,19 +3212,15 @@ async def add_gst_invoice(
     if not profile or not profile.get('is_complete'):
         raise HTTPException(status_code=400, detail="GST profile must be complete before adding invoices")
     
-    # Get existing invoices for this period
-    existing_invoices = await db.gst_invoices.find(
-        {"company_id": company_id, "gstin": gstin, "period": period},
-        {"_id": 0}
-    ).to_list(10000)
-    
     # Prepare invoice data
     invoice_dict = invoice_data.model_dump()
     invoice_dict['gstin'] = gstin
     invoice_dict['period'] = period
     
-    # Validate and add invoice
-    result = GSTOrchestrator.add_invoice(invoice_dict, existing_invoices)
+    # Validate and add invoice; duplicates are rejected by the unique
+    # (company_id, gstin, period, invoice_number_key) index on insert, or
+    # looked up first while that index is missing
+    result = GSTOrchestrator.add_invoice(invoice_dict)
     
     if not result['valid']:
         return {
@@ -1894,30 +3232,205 @@ async def add_gst_invoice(
     # Save invoice
     invoice = GSTInvoice(
         company_id=company_id,
+        invoice_number_key=GSTValidator.normalize_invoice_number(invoice_data.invoice_number),
         **result['invoice']
     )
-    await db.gst_invoices.insert_one(serialize_doc(invoice.model_dump()))
+    invoice.content_hash = InvoiceValidationCache.content_hash(invoice.model_dump())
+    doc = gst_invoice_codec.encode(invoice.model_dump())
+    duplicate = {
+        "success": False,
+        "errors": [GSTValidator.duplicate_invoice_error(invoice_data.invoice_number)],
+        "category": result['category']
+    }
+    if not await gst_invoice_number_index.present(db):
+        if await existing_gst_invoice_keys(company_id, gstin, period, [invoice.invoice_number_key]):
+            return duplicate
+    
+    async def record(session=None):
+        await db.gst_invoices.insert_one(doc, session=session)
+        await totals.apply(added=[doc], session=session)
+    
+    async with gst_totals_write(db, company_id, gstin, period) as totals:
+        try:
+            await run_gst_write(record)
+        except DuplicateKeyError:
+            return duplicate
     
     return {
         "success": True,
-        "invoice": serialize_doc(invoice.model_dump()),
+        "invoice": gst_invoice_codec.encode(invoice.model_dump()),
         "category": result['category']
     }
 
 
+# Per-invoice GSTR-1 validation results, shared by all companies (keys are content hashes)
+gstr1_validation_cache = InvoiceValidationCache(int(os.environ.get('GST_VALIDATION_CACHE_MAX_ENTRIES', '200000')))
+
+GST_IMPORT_BATCH_SIZE = int(os.environ.get('GST_IMPORT_BATCH_SIZE', '5000'))
+
+def gst_row_error(message: str) -> dict:
+    return {"code": "INVALID_ROW", "severity": "BLOCKER", "message": message}
+
+def prepare_gst_import_batch(batch: List[ImportRow], company_id: str, gstin: str, period: str) -> list:
+    """
+    Parse and validate one import batch (CPU only; the route runs it in a
+    worker thread). Failures are recorded on row.errors.
+
+    Returns:
+        (row, category, invoice document) for every row that can be inserted
+    """
+    from gst_engine.orchestrator import GSTOrchestrator
+    from gst_engine.validators.gst_validator import GSTValidator
+
+    parsed = []
+    for row in batch:
+        if row.errors:
+            row.errors = [gst_row_error(message) for message in row.errors]
+            continue
+        try:
+            invoice_input = GSTInvoiceCreate(**row.data)
+        except ValidationError as e:
+            row.errors.extend(gst_row_error(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}") for err in e.errors())
+            continue
+        parsed.append((row, {**invoice_input.model_dump(), 'gstin': gstin, 'period': period}))
+
+    accepted = []
+    results = GSTOrchestrator.add_invoices([invoice_dict for _, invoice_dict in parsed])
+    for (row, invoice_dict), result in zip(parsed, results):
+        if not result['valid']:
+            row.errors.extend(result['errors'])
+            continue
+        invoice = GSTInvoice(
+            company_id=company_id,
+            invoice_number_key=GSTValidator.normalize_invoice_number(invoice_dict['invoice_number']),
+            **result['invoice']
+        )
+        invoice.content_hash = InvoiceValidationCache.content_hash(invoice.model_dump())
+        accepted.append((row, result['category'], gst_invoice_codec.encode(invoice.model_dump())))
+    return accepted
+
+async def insert_gst_batch(company_id: str, gstin: str, period: str, accepted: list):
+    """
+    Insert one import batch of (row, category, doc) with one unordered
+    insert_many and add it to the period totals; rows that fail get an error.
+
+    A write error aborts the whole transaction under GST_TRANSACTIONS, so
+    there the batch is retried without the failed rows.
+    """
+    from gst_engine.validators.gst_validator import GSTValidator
+
+    if not await gst_invoice_number_index.present(db):
+        taken = await existing_gst_invoice_keys(
+            company_id, gstin, period, [doc["invoice_number_key"] for _, _, doc in accepted]
+        )
+        for row, _, doc in accepted:
+            if doc["invoice_number_key"] in taken:
+                row.errors.append(GSTValidator.duplicate_invoice_error(doc["invoice_number"]))
+            taken.add(doc["invoice_number_key"])
+
+    while True:
+        pending = [(row, doc) for row, _, doc in accepted if not row.errors]
+        if not pending:
+            return
+
+        async def record(session=None):
+            await db.gst_invoices.insert_many([doc for _, doc in pending], ordered=False, session=session)
+            await totals.apply(added=[doc for _, doc in pending], session=session)
+
+        async with gst_totals_write(db, company_id, gstin, period) as totals:
+            try:
+                await run_gst_write(record)
+                return
+            except BulkWriteError as e:
+                for error in e.details.get("writeErrors", []):
+                    row, doc = pending[error["index"]]
+                    row.errors.append(
+                        GSTValidator.duplicate_invoice_error(doc["invoice_number"]) if error.get("code") == 11000
+                        else gst_row_error(error.get("errmsg", "Insert failed"))
+                    )
+                if not GST_TRANSACTIONS:
+                    # Unordered: everything else was inserted
+                    await totals.apply(added=[doc for row, doc in pending if not row.errors])
+                    return
+
+@api_router.post("/gst/{gstin}/{period}/invoices/import")
+async def import_gst_invoices(
+    gstin: str,
+    period: str,
+    file: UploadFile = File(...),
+    format: Optional[Literal["csv", "jsonl", "json"]] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Bulk-add GSTR-1 invoices from a CSV, JSON Lines or JSON array file (one
+    GSTInvoiceCreate per row / line / array element).
+
+    Each batch is validated column-wise (GSTOrchestrator.add_invoices, same
+    rules and errors as the single-invoice route) off the event loop and
+    written with one unordered insert_many; duplicate numbers are rejected by
+    the unique index (or looked up first while it is missing).
+    Returns counts per category plus a per-row error report.
+    """
+    company_id = current_user["company"]["id"]
+    profile = await db.gst_profiles.find_one({"company_id": company_id, "gstin": gstin}, {"_id": 0})
+    if not profile or not profile.get('is_complete'):
+        raise HTTPException(status_code=400, detail="GST profile must be complete before adding invoices")
+    fmt = format or detect_format(file.filename, file.content_type)
+    if fmt is None:
+        raise HTTPException(status_code=400, detail="Unsupported file type; upload .csv, .jsonl or .json (or pass format=)")
+
+    batches = batched(iter_import_rows(file.file, fmt, group_items=False), GST_IMPORT_BATCH_SIZE)
+    report = {"rows": 0, "imported": 0, "failed": 0, "categories": {}, "errors": [], "errors_truncated": False}
+
+    while True:
+        batch = await asyncio.to_thread(next, batches, None)
+        if not batch:
+            break
+        report["rows"] += len(batch)
+        accepted = await asyncio.to_thread(prepare_gst_import_batch, batch, company_id, gstin, period)
+        if accepted:
+            await insert_gst_batch(company_id, gstin, period, accepted)
+        for row, category, _ in accepted:
+            if not row.errors:
+                report["imported"] += 1
+                report["categories"][category] = report["categories"].get(category, 0) + 1
+        for row in batch:
+            if row.errors:
+                report["failed"] += 1
+                if len(report["errors"]) < IMPORT_MAX_ERRORS:
+                    report["errors"].append(row.report())
+                else:
+                    report["errors_truncated"] = True
+    return report
+
+
 @api_router.get("/gst/{gstin}/{period}/invoices")
 async def get_period_invoices(
     gstin: str,
     period: str,
-    current_user: dict = Depends(get_current_user)
+    request: Request,
+    limit: Optional[int] = Query(None, ge=1, le=PAGE_MAX_LIMIT),
+    after: Optional[str] = None,
+    sort: Literal["created_at", "invoice_date", "invoice_number"] = "created_at",
+    order: SortOrder = "asc",
+    fields: Optional[str] = None,
+    current_user: dict = Depends(get_token_principal)
 ):
-    """Get all invoices for a GST period"""
+    """
+    Get the invoices for a GST period.
+
+    Without `limit` or `after` this returns up to PERIOD_INVOICES_UNPAGED_LIMIT
+    invoices in one response, as it always has; pass `limit` to read the
+    period one page at a time (follow X-Next-Cursor).
+    """
     company_id = current_user["company"]["id"]
-    invoices = await db.gst_invoices.find(
-        {"company_id": company_id, "gstin": gstin, "period": period},
-        {"_id": 0}
-    ).to_list(10000)
-    return [deserialize_doc(inv) for inv in invoices]
+    if limit is None:
+        limit = PAGE_DEFAULT_LIMIT if after else PERIOD_INVOICES_UNPAGED_LIMIT
+    invoices, next_cursor = await fetch_page(
+        db.gst_invoices, {"company_id": company_id, "gstin": gstin, "period": period},
+        sort, order, limit, after, parse_fields(fields, GSTInvoice)
+    )
+    return page_response(request, invoices, next_cursor)
 
 
 @api_router.delete("/gst/{gstin}/{period}/invoice/{invoice_id}")
@@ -1938,11 +3451,19 @@ async def delete_gst_invoice(
     if filing and filing.get('status') in ['validated', 'filed']:
         raise HTTPException(status_code=400, detail="Cannot delete invoice from validated/filed GSTR-1")
     
-    result = await db.gst_invoices.delete_one(
-        {"id": invoice_id, "company_id": company_id, "gstin": gstin, "period": period}
-    )
+    async def record(session=None) -> Optional[dict]:
+        deleted = await db.gst_invoices.find_one_and_delete(
+            {"id": invoice_id, "company_id": company_id, "gstin": gstin, "period": period},
+            projection={"_id": 0}, session=session
+        )
+        if deleted:
+            await totals.apply(removed=[deleted], session=session)
+        return deleted
     
-    if result.deleted_count == 0:
+    async with gst_totals_write(db, company_id, gstin, period) as totals:
+        deleted = await run_gst_write(record)
+    
+    if not deleted:
         raise HTTPException(status_code=404, detail="Invoice not found")
     
     return {"success": True, "message": "Invoice deleted"}
@@ -1966,8 +3487,9 @@ async def validate_gstr1(
         {"_id": 0}
     ).to_list(10000)
     
-    # Validate GSTR-1
-    result = GSTOrchestrator.validate_gstr1(invoices, gstin, period, request.is_nil)
+    # Validate GSTR-1; the filed totals are summed from these invoices
+    with validation_timer("gstr1"):
+        result = GSTOrchestrator.validate_gstr1(invoices, gstin, period, request.is_nil, gstr1_validation_cache)
     
     if result['valid']:
         # Save/update GSTR-1 filing record
@@ -1982,7 +3504,7 @@ async def validate_gstr1(
             "total_sgst": result['totals']['total_sgst'],
             "total_igst": result['totals']['total_igst'],
             "total_invoice_value": result['totals']['total_invoice_value'],
-            "invoice_count": len(invoices),
+            "invoice_count": result['summary']['total_invoices'],
             "validated_at": datetime.now(timezone.utc).isoformat()
         }
         
@@ -2006,7 +3528,7 @@ async def validate_gstr1(
 async def get_gstr1_status(
     gstin: str,
     period: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_token_principal)
 ):
     """Get GSTR-1 filing status for a period"""
     company_id = current_user["company"]["id"]
@@ -2017,17 +3539,18 @@ async def get_gstr1_status(
     )
     
     if not filing:
-        # Get invoice count
-        invoice_count = await db.gst_invoices.count_documents(
-            {"company_id": company_id, "gstin": gstin, "period": period}
-        )
+        # Draft: count and running totals from gst_period_totals
+        from gst_engine.gstr1.invoice_manager import InvoiceManager
+        period_totals = await get_gst_totals(db, company_id, gstin, period)
         return {
             "status": "draft",
             "validated": False,
-            "invoice_count": invoice_count
+            "invoice_count": period_totals.get("invoice_count", 0),
+            "category_counts": InvoiceManager.category_counts_from_period(period_totals),
+            "totals": InvoiceManager.totals_from_period(period_totals)
         }
     
-    return deserialize_doc(filing)
+    return gstr1_filing_codec.decode(filing)
 
 
 @api_router.post("/gst/{gstin}/{period}/gstr3b/generate")
@@ -2145,7 +3668,8 @@ async def validate_gstr3b(
     }
     
     # Validate
-    result = GSTOrchestrator.validate_gstr3b(gstr3b_data, gstr1_totals)
+    with validation_timer("gstr3b"):
+        result = GSTOrchestrator.validate_gstr3b(gstr3b_data, gstr1_totals)
     
     if result['valid']:
         # Update GSTR-3B status
@@ -2330,7 +3854,7 @@ async def export_gst_json(
 @api_router.get("/gst/{gstin}/filing-history")
 async def get_gst_filing_history(
     gstin: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_token_principal)
 ):
     """Get GST filing history for a GSTIN"""
     company_id = current_user["company"]["id"]
@@ -2493,6 +4017,7 @@ async def calculate_gst_complete(
     }
     
     await db.gst_filings_v2.insert_one(filing_data)
+    await bump_versions(db, company_id, "gst_filings")
     
     return {
         'success': True,
@@ -2529,25 +4054,26 @@ async def generate_gst_pdf_complete(
     generator = GSTPDFGenerator()
     
     try:
-        if report_type == 'gstr3b':
-            pdf_bytes = generator.generate_gstr3b_pdf(filing['summary'])
-            filename = f"GSTR3B_{filing['period']}_{filing['gstin']}.pdf"
-        elif report_type == 'reconciliation':
-            pdf_bytes = generator.generate_reconciliation_pdf(
-                filing['reconciliation'],
-                filing['summary']['header']
-            )
-            filename = f"Reconciliation_{filing['period']}_{filing['gstin']}.pdf"
-        elif report_type == 'itc':
-            pdf_bytes = generator.generate_itc_statement_pdf(
-                filing['summary']['itc_summary'],
-                filing['summary']['header']
-            )
-            filename = f"ITC_Statement_{filing['period']}_{filing['gstin']}.pdf"
-        else:
-            # Generate GSTR-3B by default
-            pdf_bytes = generator.generate_gstr3b_pdf(filing['summary'])
-            filename = f"GSTR3B_{filing['period']}_{filing['gstin']}.pdf"
+        with pdf_timer(report_type if report_type in ('reconciliation', 'itc') else 'gstr3b'):
+            if report_type == 'gstr3b':
+                pdf_bytes = generator.generate_gstr3b_pdf(filing['summary'])
+                filename = f"GSTR3B_{filing['period']}_{filing['gstin']}.pdf"
+            elif report_type == 'reconciliation':
+                pdf_bytes = generator.generate_reconciliation_pdf(
+                    filing['reconciliation'],
+                    filing['summary']['header']
+                )
+                filename = f"Reconciliation_{filing['period']}_{filing['gstin']}.pdf"
+            elif report_type == 'itc':
+                pdf_bytes = generator.generate_itc_statement_pdf(
+                    filing['summary']['itc_summary'],
+                    filing['summary']['header']
+                )
+                filename = f"ITC_Statement_{filing['period']}_{filing['gstin']}.pdf"
+            else:
+                # Generate GSTR-3B by default
+                pdf_bytes = generator.generate_gstr3b_pdf(filing['summary'])
+                filename = f"GSTR3B_{filing['period']}_{filing['gstin']}.pdf"
         
         return Response(
             content=pdf_bytes,
@@ -2560,14 +4086,17 @@ async def generate_gst_pdf_complete(
 
 
 @api_router.get("/gst/filings")
-async def get_gst_filings_v2(current_user: dict = Depends(get_current_user)):
+async def get_gst_filings_v2(request: Request, current_user: dict = Depends(get_token_principal)):
     """Get all GST filings for the company"""
     company_id = current_user["company"]["id"]
+    etag, not_modified = await check_etag(request, company_id, "gst_filings")
+    if not_modified:
+        return not_modified
     filings = await db.gst_filings_v2.find(
         {'company_id': company_id},
         {'_id': 0}
     ).sort('created_at', -1).to_list(100)
-    return filings
+    return page_response(request, filings, None, etag)
 
 
 # Request model for filing mode
@@ -2657,14 +4186,15 @@ async def validate_complete_gst_return(
     filed_periods = [f.get('period') for f in filed_filings]
     
     # Run comprehensive validation
-    result = GSTOrchestrator.validate_complete_return(
-        profile_data=profile,
-        period=period,
-        gstr1_filing=gstr1_filing,
-        gstr3b_filing=gstr3b_filing,
-        invoices=invoices,
-        filed_periods=filed_periods
-    )
+    with validation_timer("complete_return"):
+        result = GSTOrchestrator.validate_complete_return(
+            profile_data=profile,
+            period=period,
+            gstr1_filing=gstr1_filing,
+            gstr3b_filing=gstr3b_filing,
+            invoices=invoices,
+            filed_periods=filed_periods
+        )
     
     return result
 
@@ -2731,14 +4261,15 @@ async def mark_gst_return_as_filed(
     ).to_list(10000)
     
     # Run validation
-    validation = GSTOrchestrator.validate_complete_return(
-        profile_data=profile or {},
-        period=period,
-        gstr1_filing=gstr1_filing,
-        gstr3b_filing=gstr3b_filing,
-        invoices=invoices,
-        filed_periods=[]
-    )
+    with validation_timer("complete_return"):
+        validation = GSTOrchestrator.validate_complete_return(
+            profile_data=profile or {},
+            period=period,
+            gstr1_filing=gstr1_filing,
+            gstr3b_filing=gstr3b_filing,
+            invoices=invoices,
+            filed_periods=[]
+        )
     
     if not validation['can_file']:
         return {
@@ -3029,7 +4560,7 @@ async def save_audit_log(
 @api_router.get("/gst/audit-logs/{gstin}")
 async def get_audit_logs(
     gstin: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_token_principal)
 ):
     """Get audit logs for a GSTIN"""
     company_id = current_user["company"]["id"]
@@ -3050,6 +4581,7 @@ async def extract_invoice_data(
     current_user: dict = Depends(get_current_user)
 ):
     """Extract invoice data using Gemini AI for GST filing"""
+    await count_ai_call(current_user["company"])
     temp_file_path = None
     try:
         # Save uploaded file temporarily
@@ -3122,7 +4654,8 @@ If a field is not found, use null. For amounts, extract only numbers.""",
             file_contents=[file_content]
         )
         
-        response = await chat.send_message(user_message)
+        with llm_timer("gemini", "gemini-2.5-pro"):
+            response = await chat.send_message(user_message)
         
         # Parse JSON response
         response_text = response.strip()
@@ -3158,6 +4691,7 @@ async def extract_bank_statement(
     current_user: dict = Depends(get_current_user)
 ):
     """Extract bank statement data using Gemini AI for Tally entry"""
+    await count_ai_call(current_user["company"])
     temp_file_path = None
     try:
         with tempfile.NamedTemporaryFile(delete=False, suffix=os_module.path.splitext(file.filename)[1]) as temp_file:
@@ -3222,7 +4756,8 @@ Extract ALL visible transactions. For amounts, use numbers only.""",
             file_contents=[file_content]
         )
         
-        response = await chat.send_message(user_message)
+        with llm_timer("gemini", "gemini-2.5-pro"):
+            response = await chat.send_message(user_message)
         
         response_text = response.strip()
         if response_text.startswith('```json'):
@@ -3257,6 +4792,7 @@ async def extract_tds_data(
     current_user: dict = Depends(get_current_user)
 ):
     """Extract TDS-related data from invoices/ledger using Gemini AI"""
+    await count_ai_call(current_user["company"])
     temp_file_path = None
     try:
         with tempfile.NamedTemporaryFile(delete=False, suffix=os_module.path.splitext(file.filename)[1]) as temp_file:
@@ -3323,7 +4859,8 @@ If PAN is not visible, use null. Calculate TDS amount if only rate is given.""",
             file_contents=[file_content]
         )
         
-        response = await chat.send_message(user_message)
+        with llm_timer("gemini", "gemini-2.5-pro"):
+            response = await chat.send_message(user_message)
         
         response_text = response.strip()
         if response_text.startswith('```json'):
@@ -3358,6 +4895,7 @@ async def extract_trial_balance(
     current_user: dict = Depends(get_current_user)
 ):
     """Extract trial balance data using Gemini AI for financial statement preparation"""
+    await count_ai_call(current_user["company"])
     temp_file_path = None
     try:
         with tempfile.NamedTemporaryFile(delete=False, suffix=os_module.path.splitext(file.filename)[1]) as temp_file:
@@ -3424,7 +4962,8 @@ Ensure debit and credit totals match (balanced trial balance). Use 0 for empty b
             file_contents=[file_content]
         )
         
-        response = await chat.send_message(user_message)
+        with llm_timer("gemini", "gemini-2.5-pro"):
+            response = await chat.send_message(user_message)
         
         response_text = response.strip()
         if response_text.startswith('```json'):
@@ -3462,11 +5001,40 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Link", "ETag"],
 )
 
+app.add_middleware(MetricsMiddleware)
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+async def mongo_round_trip_ms() -> float:
+    start = time.perf_counter()
+    await client.admin.command("ping")
+    return (time.perf_counter() - start) * 1000
+
+@app.on_event("startup")
+async def startup_db_client():
+    try:
+        latency_ms = await mongo_round_trip_ms()
+        logger.info(f"MongoDB reachable ({latency_ms:.1f} ms round trip, pool {MONGO_POOL_SETTINGS})")
+    except Exception as e:
+        if MONGO_REQUIRED_ON_STARTUP:
+            raise RuntimeError(f"MongoDB unreachable at startup: {e}") from e
+        logger.error(f"MongoDB unreachable at startup, continuing: {e}")
+        return
+
+    if ENSURE_INDEXES_ON_STARTUP:
+        created = await ensure_indexes(db)
+        logger.info(f"Index bootstrap: {sum(len(names) for names in created.values())} indexes in place")
+
+    requeued = await invoice_analysis_queue.requeue_pending()
+    if requeued:
+        logger.info(f"Requeued {requeued} invoices for AI analysis")
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await invoice_analysis_queue.shutdown()
     client.close()
+    password_executor.shutdown(wait=False)
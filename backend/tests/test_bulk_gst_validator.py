@@ -0,0 +1,82 @@
+"""
+Bulk GST Invoice Validation Tests
+
+GSTOrchestrator.add_invoices (column-wise BulkGSTValidator) must give
+exactly what add_invoice gives one invoice at a time: same categories,
+same errors in the same order with the same messages, same saved invoice.
+"""
+
+import copy
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from gst_engine.orchestrator import GSTOrchestrator  # noqa: E402
+
+
+def invoice(**overrides):
+    data = {
+        "invoice_number": "INV-1", "invoice_date": "2026-01-15", "document_type": "invoice",
+        "supply_type": "intra", "recipient_gstin": None, "recipient_name": None, "place_of_supply": "27",
+        "taxable_value": 1000.0, "gst_rate": 18.0, "cgst": 90.0, "sgst": 90.0, "igst": 0.0, "cess": 0.0,
+        "hsn_sac": None, "gstin": "27AABCU9603R1ZM", "period": "01-2026",
+    }
+    data.update(overrides)
+    return data
+
+
+def random_invoice(rng: random.Random, n: int) -> dict:
+    taxable = rng.choice([1000.0, 0.0, -5.0, 333.33, 260000.0, 1234.57])
+    rate = rng.choice([18.0, 5.0, 0.25, 7.0, 0.0, 28.0])
+    tax = taxable * rate / 100
+    data = invoice(
+        invoice_number=rng.choice([f"INV-{n}", "", " inv "]),
+        invoice_date=rng.choice(["2026-01-15", "2099-01-01", "15-01-2026", "", "2026-01-15T00:00:00+00:00"]),
+        supply_type=rng.choice(["intra", "inter", "INTRA"]),
+        recipient_gstin=rng.choice([None, "", "29AABCU9603R1ZM", "SHORT"]),
+        taxable_value=taxable, gst_rate=rate,
+        cgst=rng.choice([tax / 2, tax / 2 + 0.01, 0.0, -1.0]), sgst=rng.choice([tax / 2, 0.0]),
+        igst=rng.choice([0.0, tax, tax + 1]), cess=rng.choice([0.0, 1.5]),
+    )
+    if rng.random() < 0.3:
+        data["total_value"] = rng.choice([0.0, 300000.0, 999.0])
+    return data
+
+
+def assert_same_as_single(invoices):
+    single = [GSTOrchestrator.add_invoice(inv) for inv in copy.deepcopy(invoices)]
+    bulk = GSTOrchestrator.add_invoices(copy.deepcopy(invoices))
+    assert bulk == single
+    return bulk
+
+
+class TestMatchesSingleInvoicePath:
+    def test_valid_invoices(self):
+        [b2c, b2b] = assert_same_as_single([
+            invoice(),
+            invoice(invoice_number="INV-2", supply_type="inter", recipient_gstin="29AABCU9603R1ZM",
+                    cgst=0.0, sgst=0.0, igst=180.0, cess=2.5),
+        ])
+        assert b2c["category"] == "B2C_SMALL" and b2c["invoice"]["total_value"] == 1180.0
+        assert b2b["category"] == "B2B" and b2b["invoice"]["total_value"] == 1182.5
+
+    def test_error_order_and_messages(self):
+        [result] = assert_same_as_single([
+            invoice(invoice_number="", invoice_date="2099-01-01", recipient_gstin="SHORT",
+                    taxable_value=-10.0, gst_rate=7.0, igst=5.0)
+        ])
+        assert [e["code"] for e in result["errors"]] == [
+            "MISSING_INVOICE_NUMBER", "FUTURE_INVOICE_DATE", "INVALID_RECIPIENT_GSTIN",
+            "INVALID_TAXABLE_VALUE", "INVALID_GST_RATE", "IGST_IN_INTRA_STATE", "TAX_MISMATCH",
+            "NEGATIVE_VALUES",
+        ]
+
+    def test_randomised_batch(self):
+        rng = random.Random(7)
+        results = assert_same_as_single([random_invoice(rng, n) for n in range(5000)])
+        assert any(r["valid"] for r in results) and any(not r["valid"] for r in results)
+
+    def test_empty_batch(self):
+        assert GSTOrchestrator.add_invoices([]) == []
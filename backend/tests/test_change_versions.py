@@ -0,0 +1,42 @@
+"""
+Change Version ETag Tests
+
+Unit tests for the ETag helpers in change_versions: tags change with any
+version, resource or company, and If-None-Match uses weak comparison.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from change_versions import etag_matches, make_etag  # noqa: E402
+
+
+class TestMakeEtag:
+    def test_stable_and_weak(self):
+        etag = make_etag("company-1", "/api/invoices?limit=50", {"invoices": 3})
+        assert etag == make_etag("company-1", "/api/invoices?limit=50", {"invoices": 3})
+        assert etag.startswith('W/"') and etag.endswith('"')
+
+    def test_changes_with_inputs(self):
+        base = make_etag("company-1", "/api/dashboard/stats?", {"invoices": 3, "bills": 1})
+        assert base == make_etag("company-1", "/api/dashboard/stats?", {"bills": 1, "invoices": 3})
+        assert base != make_etag("company-1", "/api/dashboard/stats?", {"invoices": 4, "bills": 1})
+        assert base != make_etag("company-2", "/api/dashboard/stats?", {"invoices": 3, "bills": 1})
+        assert base != make_etag("company-1", "/api/invoices?", {"invoices": 3, "bills": 1})
+
+
+class TestEtagMatches:
+    etag = make_etag("company-1", "/api/bills?", {"bills": 1})
+
+    def test_match_and_mismatch(self):
+        assert etag_matches(self.etag, self.etag)
+        assert not etag_matches('W/"other"', self.etag)
+        assert not etag_matches(None, self.etag)
+
+    def test_weak_comparison_lists_and_wildcard(self):
+        strong = self.etag.removeprefix("W/")
+        assert etag_matches(strong, self.etag)
+        assert etag_matches(f'"a", {self.etag}', self.etag)
+        assert etag_matches("*", self.etag)
@@ -0,0 +1,129 @@
+"""
+Company Update Tests
+
+A tier change made through update_company_fields must drop the company's
+cached principals and revoke claims-mode tokens, which carry the old tier;
+a change that keeps the tier (or only touches the profile) must not log
+everyone out.
+
+Needs a real mongod; skipped when MONGO_URL is unset or unreachable.
+"""
+
+import asyncio
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+MONGO_URL = os.environ.get('MONGO_URL', '')
+
+COMPANY_ID = "company-1"
+USER_IDS = ["user-1", "user-2"]
+
+
+@pytest.fixture(scope="module")
+def server_module():
+    os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+    os.environ.setdefault('DB_NAME', 'test_company_updates')
+    import server
+    return server
+
+
+@pytest.fixture(scope="module")
+def mongo():
+    if not MONGO_URL:
+        pytest.skip("MONGO_URL not set")
+    client = MongoClient(MONGO_URL, serverSelectionTimeoutMS=2000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip("MongoDB not reachable")
+    yield client
+    client.close()
+
+
+def _run(server, scenario):
+    """Run `scenario(db)` on a scratch database seeded with one Pro company and two users"""
+    async def run():
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        client = AsyncIOMotorClient(MONGO_URL)
+        db_name = f"test_company_updates_{uuid.uuid4().hex[:8]}"
+        saved = server.client, server.db
+        server.client, server.db = client, client[db_name]
+        try:
+            await server.db.companies.insert_one({"id": COMPANY_ID, "name": "Co", "subscription_tier": "pro",
+                                                  "subscription_status": "trial"})
+            await server.db.users.insert_many([
+                {"id": user_id, "company_id": COMPANY_ID, "role": "admin", "is_active": True, "token_version": 0}
+                for user_id in USER_IDS
+            ])
+            return await scenario(server.db)
+        finally:
+            server.client, server.db = saved
+            await client.drop_database(db_name)
+            client.close()
+
+    return asyncio.run(run())
+
+
+def _cache_principals(server):
+    for user_id in USER_IDS:
+        server.principal_cache.set(user_id, {
+            "user": {"id": user_id, "company_id": COMPANY_ID, "role": "admin"},
+            "company": {"id": COMPANY_ID, "subscription_tier": "pro"},
+        })
+
+
+class TestTierChange:
+    def test_tier_change_drops_principals_and_revokes_tokens(self, mongo, server_module):
+        server = server_module
+
+        async def scenario(db):
+            claims = server.build_token_claims({"id": "user-1", "company_id": COMPANY_ID, "role": "admin"},
+                                               {"subscription_tier": "pro"})
+            token = server.create_access_token({**claims, "role": "admin", "tier": "pro"})
+            _cache_principals(server)
+
+            await server.update_company_fields(COMPANY_ID, {"subscription_tier": "enterprise",
+                                                            "subscription_status": "active"})
+            assert all(server.principal_cache.get(user_id) is None for user_id in USER_IDS)
+            users = await db.users.find({"company_id": COMPANY_ID}, {"_id": 0}).to_list(10)
+            assert [user["token_version"] for user in users] == [1, 1]
+            with pytest.raises(server.HTTPException) as revoked:
+                await server.get_token_principal(server.HTTPAuthorizationCredentials(scheme="Bearer",
+                                                                                     credentials=token))
+            assert revoked.value.detail == "Token revoked"
+            return await db.companies.find_one({"id": COMPANY_ID}, {"_id": 0})
+
+        company = _run(server, scenario)
+        assert (company["subscription_tier"], company["subscription_status"]) == ("enterprise", "active")
+
+    def test_same_tier_keeps_tokens(self, mongo, server_module):
+        server = server_module
+
+        async def scenario(db):
+            _cache_principals(server)
+            await server.update_company_fields(COMPANY_ID, {"subscription_tier": "pro",
+                                                            "subscription_status": "active"})
+            await server.update_company_fields(COMPANY_ID, {"name": "Renamed Co"})
+            assert all(server.principal_cache.get(user_id) is None for user_id in USER_IDS)
+            users = await db.users.find({"company_id": COMPANY_ID}, {"_id": 0}).to_list(10)
+            return [user["token_version"] for user in users]
+
+        assert _run(server, scenario) == [0, 0]
+
+    def test_unknown_company(self, mongo, server_module):
+        server = server_module
+
+        async def scenario(db):
+            return await server.update_company_fields("no-such-company", {"subscription_tier": "free"})
+
+        assert _run(server, scenario) is None
+
@@ -0,0 +1,238 @@
+"""
+MongoDB Index Bootstrap Tests
+
+Runs the startup index bootstrap against a scratch database on MONGO_URL,
+then explain()s each hot query from server.py and asserts the winning plan
+uses an index (no COLLSCAN).
+
+Needs a real mongod (explain is not emulated by mocks); skipped when
+MONGO_URL is unset or unreachable.
+"""
+
+import asyncio
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db_indexes import INDEX_SPECS, duplicate_keys, ensure_indexes  # noqa: E402
+
+MONGO_URL = os.environ.get('MONGO_URL', '')
+
+COMPANY_ID = "company-1"
+GSTIN = "27AABCU9603R1ZM"
+PERIOD = "01-2026"
+
+# (collection, filter, sort) for every hot query in server.py
+HOT_QUERIES = [
+    ("users", {"id": "user-1"}, None),
+    ("users", {"email": "user@example.com"}, None),
+    ("users", {"company_id": COMPANY_ID, "is_active": True}, None),
+    ("companies", {"id": COMPANY_ID}, None),
+    ("customers", {"company_id": COMPANY_ID}, None),
+    ("customers", {"id": "cust-1", "company_id": COMPANY_ID}, None),
+    ("vendors", {"company_id": COMPANY_ID}, None),
+    ("vendors", {"id": "vendor-1", "company_id": COMPANY_ID}, None),
+    ("invoices", {"company_id": COMPANY_ID}, None),
+    ("invoices", {"id": "inv-1", "company_id": COMPANY_ID}, None),
+    ("invoices", {"company_id": COMPANY_ID, "invoice_number": "INV-1"}, None),
+    ("invoices", {"company_id": COMPANY_ID, "created_at": {"$gte": "2026-01-01"}}, None),
+    ("invoices", {"company_id": COMPANY_ID, "status": "paid"}, None),
+    ("invoices", {"company_id": COMPANY_ID, "status": "paid", "created_at": {"$gte": "2026-01-01"}}, None),
+    ("invoices", {"$or": [{"ai_status": "pending"},
+                          {"ai_status": "running", "ai_started_at": {"$not": {"$gte": "2026-01-01"}}}]}, None),
+    ("payments", {"company_id": COMPANY_ID}, None),
+    ("bills", {"id": "bill-1", "company_id": COMPANY_ID}, None),
+    ("bills", {"company_id": COMPANY_ID, "status": "paid", "created_at": {"$gte": "2026-01-01"}}, None),
+    ("news", {"is_active": True}, [("published_date", DESCENDING)]),
+    ("news", {"is_active": True, "category": "gst"}, [("published_date", DESCENDING)]),
+    ("news", {"id": "news-1", "is_active": True}, None),
+    ("itr_filings", {"user_id": "user-1"}, [("created_at", DESCENDING)]),
+    ("itr_filings", {"id": "itr-1"}, None),
+    ("gst_profiles", {"company_id": COMPANY_ID, "gstin": GSTIN}, None),
+    ("gst_invoices", {"company_id": COMPANY_ID, "gstin": GSTIN, "period": PERIOD}, None),
+    ("gst_invoices", {"id": "gi-1", "company_id": COMPANY_ID, "gstin": GSTIN, "period": PERIOD}, None),
+    ("gst_invoices", {"company_id": COMPANY_ID, "gstin": GSTIN, "period": PERIOD, "invoice_number_key": "INV-1"}, None),
+    ("gst_period_totals", {"id": f"{COMPANY_ID}:{GSTIN}:{PERIOD}"}, None),
+    ("gst_gstr1_filings", {"company_id": COMPANY_ID, "gstin": GSTIN, "period": PERIOD}, None),
+    ("gst_gstr1_filings", {"company_id": COMPANY_ID, "gstin": GSTIN}, [("period", DESCENDING)]),
+    ("gst_gstr1_filings", {"company_id": COMPANY_ID, "gstin": GSTIN, "status": "filed"}, None),
+    ("gst_gstr3b_filings", {"company_id": COMPANY_ID, "gstin": GSTIN, "period": PERIOD}, None),
+    ("gst_filings_v2", {"id": "f-1", "company_id": COMPANY_ID}, None),
+    ("gst_filings_v2", {"company_id": COMPANY_ID}, [("created_at", DESCENDING)]),
+    ("gst_filings", {"gstin": GSTIN, "period": PERIOD}, None),
+    ("gstn_configs", {"company_id": COMPANY_ID}, None),
+    ("gstn_audit_logs", {"company_id": COMPANY_ID, "gstin": GSTIN}, [("timestamp", DESCENDING)]),
+]
+
+# Keyset pages: (collection, base filter, sort field); both directions must be
+# read in index order, with no in-memory SORT stage
+PAGINATED_QUERIES = [
+    ("customers", {"company_id": COMPANY_ID}, "created_at"),
+    ("customers", {"company_id": COMPANY_ID}, "name"),
+    ("vendors", {"company_id": COMPANY_ID}, "name"),
+    ("invoices", {"company_id": COMPANY_ID}, "created_at"),
+    ("invoices", {"company_id": COMPANY_ID}, "issue_date"),
+    ("invoices", {"company_id": COMPANY_ID}, "due_date"),
+    ("invoices", {"company_id": COMPANY_ID}, "invoice_number"),
+    ("payments", {"company_id": COMPANY_ID}, "payment_date"),
+    ("bills", {"company_id": COMPANY_ID}, "due_date"),
+    ("gst_invoices", {"company_id": COMPANY_ID, "gstin": GSTIN, "period": PERIOD}, "created_at"),
+    ("gst_invoices", {"company_id": COMPANY_ID, "gstin": GSTIN, "period": PERIOD}, "invoice_date"),
+    ("gst_invoices", {"company_id": COMPANY_ID, "gstin": GSTIN, "period": PERIOD}, "invoice_number"),
+]
+
+
+def _stages(plan: dict):
+    """Yield every stage name in an explain plan tree"""
+    yield plan.get("stage")
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+def _run_bootstrap(db_name: str) -> dict:
+    async def bootstrap():
+        motor_client = AsyncIOMotorClient(MONGO_URL)
+        try:
+            return await ensure_indexes(motor_client[db_name])
+        finally:
+            motor_client.close()
+
+    return asyncio.run(bootstrap())
+
+
+def _duplicate_keys(db_name: str) -> list:
+    async def lookup():
+        motor_client = AsyncIOMotorClient(MONGO_URL)
+        try:
+            [index] = [i for i in INDEX_SPECS["gst_invoices"] if i.document["name"] == "gst_invoice_number_unique"]
+            return await duplicate_keys(motor_client[db_name], "gst_invoices", index)
+        finally:
+            motor_client.close()
+
+    return asyncio.run(lookup())
+
+
+@pytest.fixture(scope="module")
+def scratch_db():
+    if not MONGO_URL:
+        pytest.skip("MONGO_URL not set")
+    client = MongoClient(MONGO_URL, serverSelectionTimeoutMS=2000)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        pytest.skip("MongoDB not reachable")
+
+    db_name = f"test_indexes_{uuid.uuid4().hex[:8]}"
+    db = client[db_name]
+    # A few documents per collection so the planner has something to choose over
+    for collection in INDEX_SPECS:
+        db[collection].insert_many([
+            {"id": f"seed-{collection}-{n}", "company_id": f"company-{n}", "email": f"{collection}{n}@example.com"}
+            for n in range(3)
+        ])
+    # Saved before invoice_number_key existed; the bootstrap backfills it
+    db.gst_invoices.insert_one({"id": "legacy-gi", "company_id": COMPANY_ID, "gstin": GSTIN,
+                                "period": PERIOD, "invoice_number": " inv-9 "})
+
+    created = _run_bootstrap(db_name)
+    yield db, created
+
+    client.drop_database(db_name)
+    client.close()
+
+
+class TestIndexBootstrap:
+    """Bootstrap creates everything it declares, idempotently"""
+
+    def test_all_indexes_created(self, scratch_db):
+        db, created = scratch_db
+        for collection, indexes in INDEX_SPECS.items():
+            existing = set(db[collection].index_information())
+            for index in indexes:
+                assert index.document["name"] in existing, f"{collection}: {index.document['name']} missing"
+            assert len(created[collection]) == len(indexes)
+
+    def test_bootstrap_is_idempotent(self, scratch_db):
+        db, _ = scratch_db
+        again = _run_bootstrap(db.name)
+        assert all(len(again[c]) == len(INDEX_SPECS[c]) for c in INDEX_SPECS)
+
+
+class TestGSTInvoiceNumberIndex:
+    """Invoice numbers are unique per company, GSTIN and period, ignoring case and padding"""
+
+    def test_legacy_invoices_backfilled(self, scratch_db):
+        db, _ = scratch_db
+        assert db.gst_invoices.find_one({"id": "legacy-gi"})["invoice_number_key"] == "INV-9"
+
+    def test_duplicate_rejected(self, scratch_db):
+        db, _ = scratch_db
+        doc = {"company_id": COMPANY_ID, "gstin": GSTIN, "period": PERIOD, "invoice_number_key": "INV-9"}
+        with pytest.raises(DuplicateKeyError):
+            db.gst_invoices.insert_one({**doc, "id": "dup-gi"})
+        db.gst_invoices.insert_one({**doc, "id": "next-period-gi", "period": "02-2026"})
+
+
+class TestConflictingInvoiceNumbers:
+    """Numbers that only differ in case or padding are reported instead of failing the index build"""
+
+    def test_conflicts_reported(self, scratch_db):
+        db, _ = scratch_db
+        db_name = f"{db.name}_conflicts"
+        legacy = {"company_id": COMPANY_ID, "gstin": GSTIN, "period": PERIOD}
+        db.client[db_name].gst_invoices.insert_many([
+            {**legacy, "id": "gi-1", "invoice_number": "inv-1"},
+            {**legacy, "id": "gi-2", "invoice_number": " INV-1 "},
+        ])
+        try:
+            created = _run_bootstrap(db_name)
+            assert "gst_invoice_number_unique" not in created["gst_invoices"]
+            [conflict] = _duplicate_keys(db_name)
+            assert conflict["_id"]["invoice_number_key"] == "INV-1"
+            assert sorted(conflict["ids"]) == ["gi-1", "gi-2"]
+        finally:
+            db.client.drop_database(db_name)
+
+
+class TestHotQueryPlans:
+    """Each hot query must be answered from an index"""
+
+    @pytest.mark.parametrize("collection,query,sort", HOT_QUERIES,
+                             ids=[f"{c}-{'-'.join(q)}" for c, q, _ in HOT_QUERIES])
+    def test_query_uses_index(self, scratch_db, collection, query, sort):
+        db, _ = scratch_db
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = cursor.explain()["queryPlanner"]["winningPlan"]
+        stages = list(_stages(plan))
+        assert "COLLSCAN" not in stages, f"{collection} {query} sort={sort}: {stages}"
+        assert "IXSCAN" in stages or "IDHACK" in stages or "EXPRESS_IXSCAN" in stages, stages
+
+
+class TestPaginatedQueryPlans:
+    """Keyset pages (first page and after a cursor) come straight off an index"""
+
+    @pytest.mark.parametrize("direction", [ASCENDING, DESCENDING])
+    @pytest.mark.parametrize("collection,query,sort", PAGINATED_QUERIES,
+                             ids=[f"{c}-{s}" for c, _, s in PAGINATED_QUERIES])
+    def test_page_uses_index_order(self, scratch_db, collection, query, sort, direction):
+        db, _ = scratch_db
+        op = "$gt" if direction == ASCENDING else "$lt"
+        after_cursor = {**query, "$or": [{sort: {op: "m"}}, {sort: "m", "id": {op: "seed"}}]}
+        for page_query in (query, after_cursor):
+            cursor = db[collection].find(page_query).sort([(sort, direction), ("id", direction)]).limit(101)
+            stages = list(_stages(cursor.explain()["queryPlanner"]["winningPlan"]))
+            assert "COLLSCAN" not in stages, f"{collection} {page_query}: {stages}"
+            assert "SORT" not in stages, f"{collection} {page_query}: {stages}"
@@ -0,0 +1,69 @@
+"""
+GSTR-1 Period Totals Tests
+
+Unit tests for gst_period_totals: the $inc an invoice contributes, drift
+detection, and the draft status summary (totals and category counts) read
+from the running document matching a sum over the invoices.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from gst_engine.gstr1.invoice_manager import InvoiceManager  # noqa: E402
+from gst_period_totals import _contribution, _drift, _empty, rate_key  # noqa: E402
+
+
+def invoice(n, category="B2C_SMALL", rate=18.0, taxable=1000.0):
+    tax = taxable * rate / 100
+    return {"invoice_number": f"INV-{n}", "invoice_date": "2026-01-15", "supply_type": "intra",
+            "recipient_gstin": "29AABCU9603R1ZM" if category == "B2B" else None, "taxable_value": taxable,
+            "gst_rate": rate, "cgst": tax / 2, "sgst": tax / 2, "igst": 0.0, "total_value": taxable + tax,
+            "invoice_type": category}
+
+
+def running_totals(invoices):
+    """What the $inc updates leave in the document after inserting `invoices`"""
+    doc = _empty("company-1", "27AABCU9603R1ZM", "01-2026")
+    for inv in invoices:
+        for path, value in _contribution(inv, 1).items():
+            *parents, leaf = path.split(".")
+            target = doc
+            for key in parents:
+                target = target.setdefault(key, {})
+            target[leaf] = target.get(leaf, 0) + value
+    return doc
+
+
+class TestContribution:
+    def test_rate_keys_have_no_dots(self):
+        assert rate_key(0.25) == "0_25"
+        assert rate_key(18.0) == "18"
+        assert rate_key(None) == "0"
+
+    def test_insert_and_delete_cancel(self):
+        inv = invoice(1, "B2B", 0.25)
+        added, removed = _contribution(inv, 1), _contribution(inv, -1)
+        assert added["categories.B2B.rates.0_25.count"] == 1
+        assert added["totals.total_invoice_value"] == 1002.5
+        assert all(added[path] + removed[path] == 0 for path in added)
+
+    def test_drift(self):
+        doc = running_totals([invoice(1), invoice(2, "B2B", 5.0)])
+        assert _drift(doc, running_totals([invoice(1), invoice(2, "B2B", 5.0)])) == []
+        assert _drift(doc, running_totals([invoice(1)])) != []
+
+    def test_drift_ignores_fence(self):
+        doc = {**running_totals([invoice(1)]), "seq": 7, "writers": {"abc": "2026-01-01T00:00:00+00:00"}}
+        assert _drift(doc, running_totals([invoice(1)])) == []
+
+
+class TestStatusSummary:
+    def test_same_summary_as_summing_invoices(self):
+        invoices = [invoice(n, ("B2B", "B2C_SMALL", "B2C_LARGE")[n % 3], (5.0, 18.0)[n % 2],
+                            300000.0 if n % 3 == 2 else 1000.0 + n) for n in range(30)]
+        doc = running_totals(invoices)
+        summed = InvoiceManager.calculate_gstr1_totals(invoices)
+        assert InvoiceManager.totals_from_period(doc) == {k: round(v, 2) for k, v in summed.items()}
+        assert InvoiceManager.category_counts_from_period(doc) == {"B2B": 10, "B2C_LARGE": 10, "B2C_SMALL": 10}
@@ -0,0 +1,104 @@
+"""
+GSTR-1 Generator Tests
+
+Golden output of GSTR1Generator.generate for a small sales register (B2B
+grouped per recipient, B2C Large per place of supply, one B2C Small row per
+place of supply and rate, HSN summary), and a register of 200k invoices to
+keep the generator linear.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from gst_engine import GSTR1Generator  # noqa: E402
+
+ACME = "29AABCA1234F1Z5"
+BETA = "27AABCB5678G1Z3"
+
+SALES_REGISTER = [
+    {"invoice_no": "INV-1", "invoice_date": "02-01-2026", "customer_gstin": ACME, "invoice_value": 1180,
+     "taxable_value": 1000, "gst_rate": 18, "place_of_supply": "29", "is_interstate": True, "hsn_code": "9983"},
+    {"invoice_no": "INV-2", "invoice_date": "03-01-2026", "invoice_value": 525, "taxable_value": 500,
+     "gst_rate": 5, "place_of_supply": "27", "hsn_code": "1006", "quantity": 10, "description": "Rice"},
+    {"invoice_no": "INV-3", "invoice_date": "04-01-2026", "customer_gstin": BETA, "invoice_value": 2360,
+     "taxable_value": 2000, "gst_rate": 18, "place_of_supply": "27", "hsn_code": "9983"},
+    {"invoice_no": "INV-4", "invoice_date": "05-01-2026", "customer_gstin": ACME, "invoice_value": 590,
+     "taxable_value": 500, "gst_rate": 18, "place_of_supply": "29", "is_interstate": True, "hsn_code": "9983"},
+    {"invoice_no": "INV-5", "invoice_date": "06-01-2026", "invoice_value": 315, "taxable_value": 300,
+     "gst_rate": 5, "place_of_supply": "27", "hsn_code": "1006", "quantity": 6},
+    {"invoice_no": "INV-6", "invoice_date": "07-01-2026", "invoice_value": 354000, "taxable_value": 300000,
+     "gst_rate": 18, "place_of_supply": "07", "is_interstate": True, "hsn_code": "8471"},
+    {"invoice_no": "INV-7", "invoice_date": "08-01-2026", "invoice_value": 1120, "taxable_value": 1000,
+     "gst_rate": 12, "place_of_supply": "07", "is_interstate": True, "hsn_code": "8471"},
+]
+
+
+def b2b_invoice(inum, idt, val, pos, txval, iamt=0, camt=0, samt=0):
+    return {"inum": inum, "idt": idt, "val": val, "pos": pos, "rchrg": "N",
+            "itms": [{"num": 1, "itm_det": {"rt": 18.0, "txval": txval, "iamt": iamt, "camt": camt, "samt": samt}}]}
+
+
+def hsn_row(hsn, desc, qty, val, txval, iamt=0, camt=0, samt=0):
+    return {"hsn_sc": hsn, "desc": desc, "uqc": "NOS", "qty": qty, "val": val, "txval": txval,
+            "iamt": iamt, "camt": camt, "samt": samt}
+
+
+GOLDEN = {
+    "gstin": "27AABCU9603R1ZM",
+    "fp": "012026",
+    "b2b": [
+        {"ctin": ACME, "inv": [
+            b2b_invoice("INV-1", "02-01-2026", 1180.0, "29", 1000.0, iamt=180.0),
+            b2b_invoice("INV-4", "05-01-2026", 590.0, "29", 500.0, iamt=90.0),
+        ]},
+        {"ctin": BETA, "inv": [
+            b2b_invoice("INV-3", "04-01-2026", 2360.0, "27", 2000.0, camt=180.0, samt=180.0),
+        ]},
+    ],
+    "b2cl": [
+        {"pos": "07", "inv": [{"inum": "INV-6", "idt": "07-01-2026", "val": 354000.0,
+                               "itms": [{"num": 1, "itm_det": {"rt": 18.0, "txval": 300000.0, "iamt": 54000.0}}]}]},
+    ],
+    "b2cs": [
+        {"pos": "27", "rt": 5.0, "typ": "OE", "txval": 800.0, "iamt": 0, "camt": 20.0, "samt": 20.0},
+        {"pos": "07", "rt": 12.0, "typ": "OE", "txval": 1000.0, "iamt": 120.0, "camt": 0, "samt": 0},
+    ],
+    "hsn": {"data": [
+        hsn_row("9983", "Goods/Services", 3.0, 4130.0, 3500.0, iamt=270.0, camt=180.0, samt=180.0),
+        hsn_row("1006", "Rice", 16.0, 840.0, 800.0, camt=20.0, samt=20.0),
+        hsn_row("8471", "Goods/Services", 2.0, 355120.0, 301000.0, iamt=54120.0),
+    ]},
+    "doc_issue": {"doc_det": [{"doc_num": 1, "docs": [
+        {"from": "INV-1", "to": "INV-7", "totnum": 7, "cancel": 0, "net_issue": 7}
+    ]}]},
+}
+
+
+class TestGSTR1Generator:
+    def test_golden_output(self):
+        assert GSTR1Generator.generate("27AABCU9603R1ZM", "012026", SALES_REGISTER) == GOLDEN
+
+    def test_empty_register(self):
+        result = GSTR1Generator.generate("27AABCU9603R1ZM", "012026", [])
+        assert (result["b2b"], result["b2cs"], result["hsn"], result["doc_issue"]) == ([], [], {"data": []}, {})
+
+    def test_b2cs_sums_are_rounded(self):
+        register = [{"invoice_no": f"INV-{n}", "invoice_value": 1.18, "taxable_value": 0.1 * 10,
+                     "gst_rate": 18, "place_of_supply": "27"} for n in range(3)]
+        [row] = GSTR1Generator.generate("27AABCU9603R1ZM", "012026", register)["b2cs"]
+        assert (row["txval"], row["camt"], row["samt"]) == (3.0, 0.27, 0.27)
+
+    def test_linear_in_register_size(self):
+        register = [{"invoice_no": f"INV-{n}", "invoice_value": 1180, "taxable_value": 1000,
+                     "gst_rate": (5, 12, 18)[n % 3], "place_of_supply": f"{n % 37:02d}",
+                     "customer_gstin": f"29AABCA{n // 4 % 5000:04d}F1Z5" if n % 4 == 0 else "",
+                     "hsn_code": str(9900 + n % 50)} for n in range(200000)]
+        start = time.perf_counter()
+        result = GSTR1Generator.generate("27AABCU9603R1ZM", "012026", register)
+        elapsed = time.perf_counter() - start
+        assert len(result["b2b"]) == 5000 and len(result["b2cs"]) == 37 * 3
+        assert sum(len(block["inv"]) for block in result["b2b"]) == 50000
+        assert elapsed < 10, f"200k invoices took {elapsed:.2f}s"
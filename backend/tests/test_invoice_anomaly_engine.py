@@ -0,0 +1,127 @@
+"""
+Invoice Anomaly Engine Tests
+
+Pure unit tests for invoice_engine: arithmetic checks, outlier detection
+from count / sum / sum_sq statistics, and when the engine defers to the LLM.
+"""
+
+import statistics
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from invoice_engine import InvoiceAnomalyEngine, CustomerStats  # noqa: E402
+
+
+def make_invoice(quantity=2, unit_price=50.0, tax=18.0, **overrides):
+    amount = quantity * unit_price
+    invoice = {
+        "id": "inv-1",
+        "invoice_number": "INV-1",
+        "customer_id": "cust-1",
+        "items": [{"description": "Widget", "quantity": quantity, "unit_price": unit_price, "amount": amount}],
+        "subtotal": amount,
+        "tax": tax,
+        "total": amount + tax,
+    }
+    invoice.update(overrides)
+    return invoice
+
+
+def stats_of(amounts):
+    stats = CustomerStats()
+    for amount in amounts:
+        inc = CustomerStats.increments(amount)
+        stats = CustomerStats(stats.count + inc["count"], stats.total + inc["sum"], stats.total_sq + inc["sum_sq"])
+    return stats
+
+
+class TestArithmetic:
+    def test_consistent_invoice_passes(self):
+        assert InvoiceAnomalyEngine.check_arithmetic(make_invoice()) == []
+
+    def test_rounding_within_tolerance(self):
+        invoice = make_invoice(quantity=3, unit_price=33.333, subtotal=99.999, total=117.999)
+        invoice["items"][0]["amount"] = 99.999
+        assert InvoiceAnomalyEngine.check_arithmetic(invoice) == []
+
+    def test_item_amount_mismatch(self):
+        invoice = make_invoice()
+        invoice["items"][0]["amount"] = 120.0
+        issues = InvoiceAnomalyEngine.check_arithmetic(invoice)
+        assert any("Item 1" in issue for issue in issues)
+        assert any("subtotal" in issue for issue in issues)
+
+    def test_total_mismatch(self):
+        issues = InvoiceAnomalyEngine.check_arithmetic(make_invoice(total=200.0))
+        assert len(issues) == 1 and "total is 200.00" in issues[0]
+
+    def test_negative_amounts(self):
+        issues = InvoiceAnomalyEngine.check_arithmetic(make_invoice(quantity=-1))
+        assert any("negative" in issue for issue in issues)
+
+
+class TestCustomerStats:
+    def test_mean_and_stddev_match_statistics_module(self):
+        amounts = [100.0, 120.0, 95.0, 130.0, 110.0, 105.0]
+        stats = stats_of(amounts)
+        assert stats.mean == pytest.approx(statistics.mean(amounts))
+        assert stats.stddev == pytest.approx(statistics.stdev(amounts))
+
+    def test_without_removes_one_invoice(self):
+        stats = stats_of([100.0, 200.0, 300.0]).without(300.0)
+        assert stats.count == 2 and stats.mean == pytest.approx(150.0)
+
+    def test_from_doc(self):
+        stats = CustomerStats.from_doc({"count": 2, "sum": 30.0, "sum_sq": 500.0})
+        assert stats == CustomerStats(2, 30.0, 500.0)
+        assert CustomerStats.from_doc(None) == CustomerStats()
+
+
+class TestOutliers:
+    history = stats_of([100.0, 110.0, 90.0, 105.0, 95.0, 100.0, 102.0, 98.0])
+
+    def test_typical_amount_is_certain(self):
+        result = InvoiceAnomalyEngine.check_outlier(101.0, self.history, self.history)
+        assert result["anomalies"] == [] and not result["uncertain"]
+
+    def test_large_deviation_is_flagged(self):
+        result = InvoiceAnomalyEngine.check_outlier(500.0, self.history, self.history)
+        assert result["anomalies"] and not result["uncertain"]
+        assert result["z_score"] > 3
+
+    def test_borderline_deviation_is_uncertain(self):
+        amount = self.history.mean + 2.5 * self.history.stddev
+        result = InvoiceAnomalyEngine.check_outlier(amount, self.history, self.history)
+        assert result["anomalies"] == [] and result["uncertain"]
+
+    def test_new_customer_large_amount(self):
+        result = InvoiceAnomalyEngine.check_outlier(5000.0, stats_of([100.0]), self.history)
+        assert result["anomalies"] and "company average" in result["anomalies"][0]
+
+    def test_new_customer_normal_amount(self):
+        result = InvoiceAnomalyEngine.check_outlier(150.0, CustomerStats(), self.history)
+        assert result["anomalies"] == [] and not result["uncertain"]
+
+    def test_no_history_defers_to_llm(self):
+        result = InvoiceAnomalyEngine.check_outlier(150.0, CustomerStats(), stats_of([100.0]))
+        assert result["uncertain"]
+
+
+class TestAnalyze:
+    def test_result_shape(self):
+        history = stats_of([118.0] * 4 + [120.0, 116.0])
+        result = InvoiceAnomalyEngine.analyze(make_invoice(), None, history, history)
+        assert result["calculation_verified"] and not result["is_duplicate"]
+        assert not result["anomaly_detected"] and not result["uncertain"]
+        assert result["confidence_score"] == 0.95
+
+    def test_duplicate_is_reported(self):
+        duplicate = {"id": "inv-0", "invoice_number": "INV-1"}
+        history = stats_of([118.0] * 6)
+        result = InvoiceAnomalyEngine.analyze(make_invoice(), duplicate, history, history)
+        assert result["is_duplicate"] and result["duplicate_invoice_id"] == "inv-0"
+        assert any("INV-1" in r for r in result["recommendations"])
@@ -0,0 +1,116 @@
+"""
+Bulk Invoice Import Parsing Tests
+
+Unit tests for invoice_import: CSV grouping of line items into invoices,
+JSON Lines error rows, streamed JSON arrays, amount / date normalisation
+and batching.
+"""
+
+import io
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import invoice_import  # noqa: E402
+from invoice_import import batched, detect_format, iter_import_rows, normalize_invoice  # noqa: E402
+
+CSV = (
+    "Invoice Number,Customer Email,Issue Date,Due Date,Description,Quantity,Unit Price,Tax,Status\n"
+    "INV-1,a@example.com,01-04-2025,30-04-2025,Widget,2,50,18,Paid\n"
+    "INV-1,,,,Gadget,1,\"1,000.00\",,\n"
+    "\n"
+    "INV-2,b@example.com,2025-04-02,2025-05-02,Service,1,250,0,\n"
+)
+
+
+def read(text: str, fmt: str):
+    return list(iter_import_rows(io.BytesIO(text.encode("utf-8")), fmt))
+
+
+class TestCSV:
+    def test_consecutive_rows_form_one_invoice(self):
+        rows = read(CSV, "csv")
+        assert [row.data["invoice_number"] for row in rows] == ["INV-1", "INV-2"]
+        assert [row.row for row in rows] == [2, 5]
+        assert [item["description"] for item in rows[0].data["items"]] == ["Widget", "Gadget"]
+        assert rows[0].data["customer_email"] == "a@example.com"
+
+    def test_normalised_amounts_and_dates(self):
+        invoice = read(CSV, "csv")[0].data
+        assert normalize_invoice(invoice) == []
+        assert invoice["items"][1]["amount"] == 1000.0
+        assert invoice["subtotal"] == 1100.0
+        assert invoice["total"] == 1118.0
+        assert invoice["issue_date"] == datetime(2025, 4, 1, tzinfo=timezone.utc)
+        iso = read(CSV, "csv")[1].data
+        assert normalize_invoice(iso) == []
+        assert iso["issue_date"] == datetime(2025, 4, 2, tzinfo=timezone.utc)
+        assert invoice["status"] == "paid"
+
+    def test_ungrouped_rows(self):
+        rows = list(iter_import_rows(io.BytesIO(CSV.encode("utf-8")), "csv", group_items=False))
+        assert [row.row for row in rows] == [2, 3, 5]
+        assert rows[1].data == {"invoice_number": "INV-1", "description": "Gadget", "quantity": "1",
+                                "unit_price": "1,000.00"}
+
+    def test_bom_and_empty_file(self):
+        assert read("﻿" + CSV, "csv")[0].data["invoice_number"] == "INV-1"
+        assert read("", "csv") == []
+
+
+class TestJSONLines:
+    def test_invalid_lines_are_reported(self):
+        rows = read('{"invoice_number": "INV-1", "items": []}\nnot json\n\n[1, 2]\n', "jsonl")
+        assert [row.row for row in rows] == [1, 2, 4]
+        assert rows[0].errors == []
+        assert rows[1].errors[0].startswith("Invalid JSON")
+        assert rows[2].errors == ["Each line must be a JSON object"]
+
+    def test_normalize_errors(self):
+        assert normalize_invoice({"items": []}) == ["Invoice has no items"]
+        errors = normalize_invoice({"items": [{"quantity": "two", "unit_price": 1}],
+                                    "issue_date": "2025-01-01", "due_date": "2025-01-31"})
+        assert errors == ["Item 1: quantity must be a number, got 'two'"]
+        errors = normalize_invoice({"items": [{"quantity": 1, "unit_price": 1}],
+                                    "issue_date": "someday", "due_date": "2025-01-31"})
+        assert errors == ["issue_date: Unrecognised date 'someday'"]
+
+    def test_unit_price_from_amount(self):
+        invoice = {"items": [{"quantity": 4, "amount": 100}], "issue_date": "2025-01-01", "due_date": "2025-01-31"}
+        assert normalize_invoice(invoice) == []
+        assert invoice["items"][0]["unit_price"] == 25.0
+
+
+class TestJSONArray:
+    def test_elements_across_chunks(self, monkeypatch):
+        monkeypatch.setattr(invoice_import, "JSON_CHUNK_SIZE", 7)
+        rows = read(' [ {"invoice_number": "INV-1", "total": 1180.5},\n{"invoice_number": "INV-2"}, 3 ] ', "json")
+        assert [(row.row, row.data, row.errors) for row in rows] == [
+            (1, {"invoice_number": "INV-1", "total": 1180.5}, []),
+            (2, {"invoice_number": "INV-2"}, []),
+            (3, {}, ["Each array element must be a JSON object"]),
+        ]
+
+    def test_malformed_files(self):
+        assert read("", "json") == []
+        assert read("[]", "json") == []
+        assert read('{"invoice_number": "INV-1"}', "json")[0].errors == ["Expected a JSON array of invoice objects"]
+        rows = read('[{"invoice_number": "INV-1"}, {"invoice_number": ', "json")
+        assert [row.row for row in rows] == [1, 2] and rows[1].errors[0].startswith("Invalid JSON")
+        rows = read('[{"invoice_number": "INV-1"} {"invoice_number": "INV-2"}]', "json")
+        assert rows[1].errors == ["Invalid JSON: expected ',' between elements"]
+
+
+class TestHelpers:
+    def test_detect_format(self):
+        assert detect_format("export.CSV", None) == "csv"
+        assert detect_format("export.jsonl", None) == "jsonl"
+        assert detect_format("upload", "application/x-ndjson") == "jsonl"
+        assert detect_format("export.json", None) == "json"
+        assert detect_format("export.xlsx", None) is None
+
+    def test_batched(self):
+        assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
+        assert list(batched([], 2)) == []
@@ -0,0 +1,258 @@
+"""
+Concurrent Payment Tests
+
+Fires hundreds of payments at one invoice (and one bill) in parallel through
+the create_payment / pay_bill routes and checks that none is lost:
+paid_amount ends at the exact sum, the invoice flips to paid, and the
+dashboard rollup agrees with a rebuild from the source collections. Also
+runs rollup and invoice statistics rebuilds (including the very first one)
+while invoices are being written and checks no write is lost or counted
+twice.
+
+Needs a real mongod (pipeline updates and concurrency are not emulated by
+mocks); skipped when MONGO_URL is unset or unreachable. The transactional
+variant also needs a replica set and is skipped on a standalone server.
+"""
+
+import asyncio
+import os
+import sys
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+MONGO_URL = os.environ.get('MONGO_URL', '')
+
+COMPANY_ID = "company-1"
+PAYMENTS = 300
+AMOUNT = 10.0
+
+
+@pytest.fixture(scope="module")
+def mongo():
+    if not MONGO_URL:
+        pytest.skip("MONGO_URL not set")
+    client = MongoClient(MONGO_URL, serverSelectionTimeoutMS=2000)
+    try:
+        hello = client.admin.command("hello")
+    except PyMongoError:
+        pytest.skip("MongoDB not reachable")
+    yield client, "setName" in hello or hello.get("msg") == "isdbgrid"
+    client.close()
+
+
+@pytest.fixture(scope="module")
+def server_module(mongo):
+    os.environ.setdefault('DB_NAME', 'test_payments')
+    import server
+    return server
+
+
+def _current_user():
+    return {
+        "user": {"id": "user-1", "role": "accountant"},
+        "company": {"id": COMPANY_ID, "subscription_tier": "pro"},
+    }
+
+
+def _run(server, scenario, transactions: bool):
+    """Run `scenario(db)` on a scratch database with server.db pointed at it"""
+    async def run():
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        client = AsyncIOMotorClient(MONGO_URL, maxPoolSize=50)
+        db_name = f"test_payments_{uuid.uuid4().hex[:8]}"
+        saved = server.client, server.db, server.PAYMENT_TRANSACTIONS
+        server.client, server.db, server.PAYMENT_TRANSACTIONS = client, client[db_name], transactions
+        try:
+            return await scenario(server.db)
+        finally:
+            server.client, server.db, server.PAYMENT_TRANSACTIONS = saved
+            await client.drop_database(db_name)
+            client.close()
+
+    return asyncio.run(run())
+
+
+def _invoice(total: float) -> dict:
+    return {
+        "id": "inv-1", "company_id": COMPANY_ID, "invoice_number": "INV-1",
+        "customer_id": "cust-1", "customer_name": "Customer", "items": [],
+        "subtotal": total, "tax": 0.0, "total": total, "status": "sent", "paid_amount": 0.0,
+        "issue_date": "2026-01-01T00:00:00+00:00", "due_date": "2026-02-01T00:00:00+00:00",
+        "created_at": "2026-01-01T00:00:00+00:00", "created_by": "user-1",
+    }
+
+
+def _payment(n: int):
+    from server import PaymentCreate
+
+    return PaymentCreate(
+        payment_number=f"PAY-{n}", invoice_id="inv-1", customer_id="cust-1", customer_name="Customer",
+        amount=AMOUNT, payment_date=datetime.now(timezone.utc), payment_method="bank_transfer",
+    )
+
+
+def _rollup_view(rollup: dict) -> dict:
+    """Rollup totals rounded to the paisa (running float sums differ in the last bits)"""
+    return {
+        status: {key: round(value, 2) for key, value in bucket.items()}
+        for status, bucket in rollup["invoices"].items()
+    }
+
+
+def _pay_invoice_concurrently(server, transactions: bool):
+    async def scenario(db):
+        total = PAYMENTS * AMOUNT
+        await db.invoices.insert_one(_invoice(total))
+        await server.rebuild_rollups(db, COMPANY_ID)
+
+        await asyncio.gather(*(
+            server.create_payment(_payment(n), current_user=_current_user()) for n in range(PAYMENTS)
+        ))
+
+        invoice = await db.invoices.find_one({"id": "inv-1"})
+        payments = await db.payments.count_documents({"company_id": COMPANY_ID})
+        tracked = await server.get_rollup(db, COMPANY_ID)
+        rebuilt = await server.rebuild_rollups(db, COMPANY_ID)
+        return invoice, payments, tracked, rebuilt
+
+    return _run(server, scenario, transactions)
+
+
+class TestConcurrentInvoicePayments:
+    """Parallel payments against one invoice add up exactly"""
+
+    def _check(self, result):
+        invoice, payments, tracked, rebuilt = result
+        assert payments == PAYMENTS
+        assert invoice["paid_amount"] == pytest.approx(PAYMENTS * AMOUNT)
+        assert invoice["status"] == "paid"
+        assert _rollup_view(tracked) == _rollup_view(rebuilt)
+
+    def test_without_transactions(self, server_module):
+        self._check(_pay_invoice_concurrently(server_module, transactions=False))
+
+    def test_with_transactions(self, mongo, server_module):
+        _, replica_set = mongo
+        if not replica_set:
+            pytest.skip("transactions need a replica set")
+        self._check(_pay_invoice_concurrently(server_module, transactions=True))
+
+
+class TestConcurrentBillPayments:
+    """Parallel pay_bill calls against one bill add up exactly"""
+
+    def test_pay_bill(self, server_module):
+        server = server_module
+
+        async def scenario(db):
+            await db.bills.insert_one({
+                "id": "bill-1", "company_id": COMPANY_ID, "bill_number": "BILL-1", "vendor_id": "vendor-1",
+                "vendor_name": "Vendor", "amount": PAYMENTS * AMOUNT, "due_date": "2026-02-01T00:00:00+00:00",
+                "status": "sent", "paid_amount": 0.0, "created_at": "2026-01-01T00:00:00+00:00",
+                "created_by": "user-1",
+            })
+            await asyncio.gather(*(
+                server.pay_bill("bill-1", AMOUNT, current_user=_current_user()) for _ in range(PAYMENTS)
+            ))
+            return await db.bills.find_one({"id": "bill-1"})
+
+        bill = _run(server, scenario, transactions=False)
+        assert bill["paid_amount"] == pytest.approx(PAYMENTS * AMOUNT)
+        assert bill["status"] == "paid"
+
+
+
+class TestRollupRebuildRace:
+    """Writes that overlap a rollup rebuild are neither lost nor counted twice"""
+
+    def test_first_build_during_writes(self, server_module):
+        server = server_module
+        writes = 200
+
+        async def scenario(db):
+            async def write(n):
+                doc = {**_invoice(100.0), "id": f"inv-{n}", "invoice_number": f"INV-{n}"}
+                await server.tracked_insert(db.invoices, "invoices", doc)
+
+            async def rebuild_repeatedly():
+                for _ in range(5):
+                    await server.rebuild_rollups(db, COMPANY_ID)
+
+            await asyncio.gather(rebuild_repeatedly(), *(write(n) for n in range(writes)))
+            tracked = await server.get_rollup(db, COMPANY_ID)
+            rebuilt = await server.rebuild_rollups(db, COMPANY_ID)
+            return tracked, rebuilt
+
+        tracked, rebuilt = _run(server, scenario, transactions=False)
+        assert rebuilt["invoices"]["sent"]["count"] == writes
+        assert _rollup_view(tracked) == _rollup_view(rebuilt)
+        assert _rollup_view(tracked["months"]["2026-01"]) == _rollup_view(rebuilt["months"]["2026-01"])
+        assert not tracked.get("writers")
+
+    def test_rebuild_waits_for_open_writes(self, server_module):
+        server = server_module
+
+        async def scenario(db):
+            from write_fence import FenceBusy
+
+            await server.rebuild_rollups(db, COMPANY_ID)
+            async with server.rollup_write(db, COMPANY_ID) as changes:
+                doc = {**_invoice(100.0)}
+                await db.invoices.insert_one(doc)
+                changes.append(("invoices", None, doc))
+                with pytest.raises(FenceBusy):
+                    await server.rebuild_rollups(db, COMPANY_ID)
+            return await server.get_rollup(db, COMPANY_ID)
+
+        tracked = _run(server, scenario, transactions=False)
+        assert tracked["invoices"]["sent"]["count"] == 1
+        assert not tracked.get("writers")
+
+
+class TestInvoiceStatsRebuildRace:
+    """Invoice writes that overlap a statistics rebuild are neither lost nor counted twice"""
+
+    def test_first_build_during_writes(self, server_module):
+        server = server_module
+        writes = 200
+
+        async def scenario(db):
+            from invoice_stats import get_invoice_stats, rebuild_invoice_stats
+
+            async def write(n):
+                doc = {**_invoice(100.0 + n), "id": f"inv-{n}", "invoice_number": f"INV-{n}",
+                       "customer_id": f"cust-{n % 3}"}
+                await server.tracked_insert(db.invoices, "invoices", doc)
+
+            async def rebuild_repeatedly():
+                for _ in range(5):
+                    await rebuild_invoice_stats(db, COMPANY_ID)
+
+            await asyncio.gather(rebuild_repeatedly(), *(write(n) for n in range(writes)))
+            tracked = [await get_invoice_stats(db, COMPANY_ID, f"cust-{n}") for n in range(3)]
+            await rebuild_invoice_stats(db, COMPANY_ID)
+            rebuilt = [await get_invoice_stats(db, COMPANY_ID, f"cust-{n}") for n in range(3)]
+            return tracked, rebuilt
+
+        tracked, rebuilt = _run(server, scenario, transactions=False)
+        assert sum(customer.count for customer, _ in rebuilt) == writes
+        assert tracked == rebuilt
+
+
+class TestRollupStatusKey:
+    """Documents without a status land in the same bucket via deltas and rebuilds"""
+
+    def test_missing_status_is_unknown(self):
+        from rollups import _contribution, _status_key
+
+        assert _status_key(None) == "unknown"
+        assert "invoices.unknown.count" in _contribution("invoices", {"total": 10.0}, 1)
+        assert "invoices.unknown.count" in _contribution("invoices", {"total": 10.0, "status": None}, 1)
@@ -0,0 +1,97 @@
+"""
+Receivables Reconciliation Tests
+
+Unit tests for ReceivablesReconciler: match passes and their priority,
+tolerance and date windows, ambiguity, and a run sized like a real bank
+statement (thousands of receipts).
+"""
+
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from invoice_engine import ReceivablesReconciler  # noqa: E402
+
+
+def invoice(n, customer="Acme Pvt Ltd", total=1000.0, paid=0.0, due="2026-01-31T00:00:00+00:00"):
+    return {"id": f"inv-{n}", "invoice_number": f"INV-2026/{n:03d}", "customer_id": f"cust-{customer}",
+            "customer_name": customer, "total": total, "paid_amount": paid, "due_date": due}
+
+
+def receipt(amount, reference=None, payer=None, date="2026-02-05"):
+    return {"amount": amount, "date": datetime.fromisoformat(date), "reference": reference, "payer": payer}
+
+
+class TestMatchPasses:
+    def test_reference_match(self):
+        [result] = ReceivablesReconciler([invoice(1), invoice(2)]).match(
+            [receipt(1000.0, reference="NEFT/ACME/INV-2026/002")]
+        )
+        assert result["status"] == "matched" and result["match"] == "reference"
+        assert result["invoice_id"] == "inv-2" and not result["partial"]
+
+    def test_reference_partial_payment(self):
+        [result] = ReceivablesReconciler([invoice(1)]).match([receipt(400.0, reference="inv2026001")])
+        assert result["match"] == "reference" and result["partial"]
+
+    def test_payer_prefers_exact_amount_then_oldest(self):
+        invoices = [
+            invoice(1, total=500.0, due="2026-01-10T00:00:00+00:00"),
+            invoice(2, total=750.0, due="2026-01-20T00:00:00+00:00"),
+            invoice(3, total=900.0, due="2026-01-05T00:00:00+00:00"),
+        ]
+        exact, partial = ReceivablesReconciler(invoices).match([
+            receipt(750.0, payer="M/S ACME PRIVATE LIMITED"),
+            receipt(300.0, payer="acme"),
+        ])
+        assert exact["invoice_id"] == "inv-2" and exact["match"] == "payer"
+        assert partial["invoice_id"] == "inv-3" and partial["match"] == "payer_partial"
+
+    def test_amount_only_match_and_ambiguity(self):
+        invoices = [invoice(1, "Acme", 1000.0), invoice(2, "Beta", 2500.0), invoice(3, "Gamma", 2500.0)]
+        unique, ambiguous, unmatched = ReceivablesReconciler(invoices).match([
+            receipt(999.5), receipt(2500.0), receipt(42.0)
+        ])
+        assert unique["invoice_id"] == "inv-1" and unique["match"] == "amount"
+        assert ambiguous["status"] == "ambiguous" and len(ambiguous["candidates"]) == 2
+        assert unmatched["status"] == "unmatched" and unmatched["candidates"] == []
+
+    def test_stronger_pass_claims_invoice_first(self):
+        # The amount-only receipt comes first in the file but must not take the referenced invoice
+        amount_only, referenced = ReceivablesReconciler([invoice(1)]).match([
+            receipt(1000.0), receipt(1000.0, reference="INV-2026/001")
+        ])
+        assert referenced["status"] == "matched" and referenced["match"] == "reference"
+        assert amount_only["status"] == "unmatched"
+
+
+class TestWindows:
+    def test_amount_tolerance(self):
+        reconciler = ReceivablesReconciler([invoice(1)], amount_tolerance=0.5)
+        assert reconciler.match([receipt(998.0)])[0]["status"] == "unmatched"
+        assert reconciler.match([receipt(999.6)])[0]["status"] == "matched"
+
+    def test_date_window(self):
+        reconciler = ReceivablesReconciler([invoice(1)], date_window_days=30)
+        assert reconciler.match([receipt(1000.0, date="2026-06-01")])[0]["status"] == "unmatched"
+        assert reconciler.match([receipt(1000.0, date="2026-02-15")])[0]["status"] == "matched"
+
+    def test_overpayment_and_settled_invoices_are_skipped(self):
+        reconciler = ReceivablesReconciler([invoice(1, paid=1000.0), invoice(2, total=100.0)])
+        assert reconciler.invoices[0]["id"] == "inv-2"
+        assert reconciler.match([receipt(500.0, reference="INV-2026/002")])[0]["status"] == "unmatched"
+
+
+class TestScale:
+    def test_thousands_of_receipts(self):
+        count = 5000
+        invoices = [invoice(n, customer=f"Customer {n % 700}", total=100.0 + n) for n in range(count)]
+        receipts = [receipt(100.0 + n, payer=f"Customer {n % 700}") for n in range(count)]
+        start = time.perf_counter()
+        results = ReceivablesReconciler(invoices).match(receipts)
+        elapsed = time.perf_counter() - start
+        assert all(r["status"] == "matched" and r["invoice_id"] == f"inv-{r['receipt_index']}" for r in results)
+        assert elapsed < 5, f"{count} receipts took {elapsed:.2f}s"
@@ -0,0 +1,73 @@
+"""
+GSTR-1 Validation Cache Tests
+
+Unit tests for InvoiceValidationCache: validate_gstr1 gives the same result
+with and without it, only new or changed invoices are validated again, and
+date-dependent results are never reused.
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from gst_engine.orchestrator import GSTOrchestrator  # noqa: E402
+from gst_engine.validators.validation_cache import InvoiceValidationCache  # noqa: E402
+
+
+def invoice(n, **overrides):
+    data = {"invoice_number": f"INV-{n}", "invoice_date": "2026-01-15", "supply_type": "intra",
+            "recipient_gstin": None, "taxable_value": 1000.0 + n, "gst_rate": 18.0,
+            "cgst": (1000.0 + n) * 0.09, "sgst": (1000.0 + n) * 0.09, "igst": 0.0,
+            "total_value": (1000.0 + n) * 1.18, "invoice_type": "B2C_SMALL"}
+    data.update(overrides)
+    data["content_hash"] = InvoiceValidationCache.content_hash(data)
+    return data
+
+
+def validate(invoices, cache=None):
+    return GSTOrchestrator.validate_gstr1(invoices, "27AABCU9603R1ZM", "01-2026", validation_cache=cache)
+
+
+class TestInvoiceValidationCache:
+    def test_same_result_as_uncached(self):
+        invoices = [invoice(n) for n in range(20)] + [invoice(20, cgst=1.0), invoice(21, invoice_number="")]
+        cache = InvoiceValidationCache()
+        assert validate(invoices, cache) == validate(invoices)
+        assert validate(invoices, cache) == validate(invoices)
+        assert len(validate(invoices)["errors"]) == 2
+
+    def test_only_changed_invoices_revalidated(self):
+        invoices = [invoice(n) for n in range(50)]
+        cache = InvoiceValidationCache()
+        validate(invoices, cache)
+        assert (cache.hits, cache.misses) == (0, 50)
+
+        invoices[10] = invoice(10, taxable_value=5.0)
+        invoices.append(invoice(50))
+        del invoices[0]
+        result = validate(invoices, cache)
+        assert (cache.hits, cache.misses) == (48, 52)
+        assert [e["code"] for e in result["errors"]] == ["TAX_MISMATCH"]
+
+    def test_hash_ignores_fields_validation_does_not_read(self):
+        assert invoice(1)["content_hash"] == invoice(1, recipient_name="Acme", hsn_sac="9983")["content_hash"]
+        assert invoice(1)["content_hash"] != invoice(1, invoice_type="B2B")["content_hash"]
+
+    def test_future_dates_not_cached(self):
+        cache = InvoiceValidationCache()
+        future = invoice(1, invoice_date="2099-01-01")
+        validate([future], cache)
+        validate([future], cache)
+        assert (cache.hits, cache.misses) == (0, 2)
+
+    def test_errors_are_not_shared_with_the_cache(self):
+        cache = InvoiceValidationCache()
+        bad = invoice(1, cgst=1.0)
+        validate([bad], cache)["errors"][0]["message"] = "changed"
+        assert validate([bad], cache)["errors"][0]["message"].startswith("Tax mismatch")
+
+    def test_bounded(self):
+        cache = InvoiceValidationCache(max_entries=10)
+        validate([invoice(n) for n in range(25)], cache)
+        assert len(cache._entries) == 10
@@ -0,0 +1,157 @@
+"""
+Subscription Usage Counters
+
+Per-company usage in `usage_counters`, one document per company and month
+(invoices created, AI calls) plus one per company for current totals
+(active users):
+
+    {"id": "<company_id>:2026-01", "company_id", "period": "2026-01", "invoices": 3, "ai_calls": 12}
+    {"id": "<company_id>:all", "company_id", "period": "all", "users": 2}
+
+reserve_usage is a single conditional $inc ({metric: {$lt: limit}}), so two
+concurrent requests can never both take the last slot. Callers release the
+slot again if the write it was reserved for fails.
+
+Counter documents are seeded lazily from the source collections the first
+time a company/period is touched, so existing tenants keep their usage.
+"""
+
+from datetime import datetime, timezone
+from typing import Optional
+
+from pymongo.errors import DuplicateKeyError
+
+USAGE_COLLECTION = "usage_counters"
+
+# metric -> counted per month (True) or as a running total (False)
+USAGE_METRICS = {
+    "invoices": True,
+    "ai_calls": True,
+    "users": False,
+}
+
+
+def current_period() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m")
+
+
+def period_of(created_at) -> Optional[str]:
+    """'YYYY-MM' of a stored created_at (ISO string or datetime)"""
+    if isinstance(created_at, datetime):
+        return created_at.strftime("%Y-%m")
+    if isinstance(created_at, str) and len(created_at) >= 7:
+        return created_at[:7]
+    return None
+
+
+def _counter_id(company_id: str, period: str) -> str:
+    return f"{company_id}:{period}"
+
+
+def _period_for(metric: str, period: Optional[str]) -> str:
+    if not USAGE_METRICS[metric]:
+        return "all"
+    return period or current_period()
+
+
+async def _seed(db, company_id: str, period: str):
+    """Create the counter document from the source collections (no-op if it exists)"""
+    if period == "all":
+        values = {"users": await db.users.count_documents({"company_id": company_id, "is_active": True})}
+    else:
+        year, month = (int(part) for part in period.split("-"))
+        start = datetime(year, month, 1, tzinfo=timezone.utc)
+        end = datetime(year + month // 12, month % 12 + 1, 1, tzinfo=timezone.utc)
+        values = {
+            "invoices": await db.invoices.count_documents({
+                "company_id": company_id,
+                "created_at": {"$gte": start.isoformat(), "$lt": end.isoformat()}
+            }),
+            # AI calls were not recorded before the counters existed
+            "ai_calls": 0
+        }
+    try:
+        await db[USAGE_COLLECTION].update_one(
+            {"id": _counter_id(company_id, period)},
+            {"$setOnInsert": {"company_id": company_id, "period": period, **values}},
+            upsert=True
+        )
+    except DuplicateKeyError:
+        pass  # a concurrent request seeded it first
+
+
+async def reserve_usage(db, company_id: str, metric: str, limit: int,
+                        period: Optional[str] = None) -> bool:
+    """
+    Take one unit of `metric` if the counter is below `limit` (-1 = unlimited).
+
+    Returns:
+        True if reserved, False if the limit is reached
+    """
+    period = _period_for(metric, period)
+    query = {"id": _counter_id(company_id, period)}
+    if limit != -1:
+        query[metric] = {"$lt": limit}
+
+    for _ in range(2):
+        result = await db[USAGE_COLLECTION].update_one(query, {"$inc": {metric: 1}})
+        if result.matched_count:
+            return True
+        if await db[USAGE_COLLECTION].count_documents({"id": query["id"]}, limit=1):
+            return False  # the document exists, so the condition failed: limit reached
+        await _seed(db, company_id, period)
+    return False
+
+
+async def reserve_usage_up_to(db, company_id: str, metric: str, limit: int, wanted: int,
+                              period: Optional[str] = None) -> int:
+    """
+    Take as many of `wanted` units as still fit under `limit` (bulk writes).
+
+    Returns:
+        Number of units reserved (0..wanted)
+    """
+    if wanted <= 0:
+        return 0
+    period = _period_for(metric, period)
+    counter_id = _counter_id(company_id, period)
+
+    for _ in range(5):
+        doc = await db[USAGE_COLLECTION].find_one({"id": counter_id}, {"_id": 0, metric: 1})
+        if doc is None:
+            await _seed(db, company_id, period)
+            continue
+        granted = wanted if limit == -1 else min(wanted, limit - doc.get(metric, 0))
+        if granted <= 0:
+            return 0
+        query = {"id": counter_id}
+        if limit != -1:
+            query[metric] = {"$lte": limit - granted}
+        result = await db[USAGE_COLLECTION].update_one(query, {"$inc": {metric: granted}})
+        if result.matched_count:
+            return granted
+        # A concurrent request took units in between; look again
+    return 0
+
+
+async def release_usage(db, company_id: str, metric: str, period: Optional[str] = None, amount: int = 1):
+    """Give back units taken by reserve_usage (failed write, deleted invoice)"""
+    period = _period_for(metric, period)
+    await db[USAGE_COLLECTION].update_one(
+        {"id": _counter_id(company_id, period), metric: {"$gte": amount}},
+        {"$inc": {metric: -amount}}
+    )
+
+
+async def get_usage(db, company_id: str) -> dict:
+    """Current month's counters plus running totals, seeding any that are missing"""
+    period = current_period()
+    usage = {}
+    for counter_period in (period, "all"):
+        counter_id = _counter_id(company_id, counter_period)
+        doc = await db[USAGE_COLLECTION].find_one({"id": counter_id}, {"_id": 0})
+        if doc is None:
+            await _seed(db, company_id, counter_period)
+            doc = await db[USAGE_COLLECTION].find_one({"id": counter_id}, {"_id": 0})
+        usage.update({metric: doc.get(metric, 0) for metric in USAGE_METRICS if metric in doc})
+    return usage
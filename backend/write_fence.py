@@ -0,0 +1,110 @@
+"""
+Write Fences
+
+Running totals that writers $inc (financial rollups, GST period totals,
+invoice statistics) are rebuilt from their source collections while writes
+go on. The fence on the total's head document keeps a write that overlaps a
+rebuild from being lost (aggregated too late) or counted twice (aggregated
+and then $inc'ed):
+
+    {"seq": <writes and rebuilds so far>,
+     "writers": {"<token>": "<began at, ISO>"}, "built_at", ...}
+
+A writer calls begin_write before it touches the source collection, which
+bumps seq and registers its token, and removes the token (end_write) in the
+same update that $incs its delta. fenced_rebuild only aggregates once no
+writer is registered and only stores the snapshot if seq is unchanged
+afterwards, retrying otherwise. After REBUILD_ATTEMPTS it raises FenceBusy
+and stores nothing; callers serve an unstored snapshot or leave the rebuild
+to a later read.
+
+Tokens are only removed by their own writer, so no write in flight is ever
+forgotten. A token older than WRITER_LEASE_SECONDS belongs to a writer that
+died before end_write: it no longer holds rebuilds off and the next stored
+rebuild drops it.
+"""
+
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Iterable, Tuple
+
+from pymongo import ReturnDocument
+
+REBUILD_ATTEMPTS = 5
+REBUILD_RETRY_SECONDS = 0.05
+
+# How long a registered writer holds rebuilds off
+WRITER_LEASE_SECONDS = 300
+
+
+class FenceBusy(Exception):
+    """A rebuild found writes in flight on every attempt and stored nothing"""
+
+
+def _live(writers: Dict[str, str]) -> bool:
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=WRITER_LEASE_SECONDS)
+    return any(datetime.fromisoformat(began) > cutoff for began in writers.values())
+
+
+async def begin_write(collection, query: dict, on_insert: dict, fields: Iterable[str] = ()) -> Tuple[str, dict]:
+    """
+    Register a writer on the head document matching `query` (created with
+    `on_insert` if missing).
+
+    Returns:
+        (token for end_write, head document projected to seq and `fields`)
+    """
+    token = uuid.uuid4().hex
+    head = await collection.find_one_and_update(
+        query,
+        {"$inc": {"seq": 1}, "$set": {f"writers.{token}": datetime.now(timezone.utc).isoformat()},
+         "$setOnInsert": on_insert},
+        projection={"_id": 0, "seq": 1, **{field: 1 for field in fields}},
+        upsert=True, return_document=ReturnDocument.AFTER
+    )
+    return token, head
+
+
+def end_write(token: str) -> Dict[str, str]:
+    """The $unset that closes a begin_write, sent with the writer's delta"""
+    return {f"writers.{token}": ""}
+
+
+async def fenced_rebuild(collection, query: dict, on_insert: dict,
+                         compute: Callable[[dict], Awaitable[dict]], label: str) -> dict:
+    """
+    $set the fields `compute(fence)` returns on the head document matching
+    `query` once no writer overlapped the computation. The store also bumps
+    seq, so of two rebuilds that read the same fence only one is stored.
+
+    Returns:
+        The stored fields, with built_at and updated_at
+
+    Raises:
+        FenceBusy: writes overlapped every attempt
+    """
+    for attempt in range(REBUILD_ATTEMPTS):
+        fence = await collection.find_one_and_update(
+            query, {"$setOnInsert": {**on_insert, "seq": 0}},
+            projection={"_id": 0, "seq": 1, "writers": 1},
+            upsert=True, return_document=ReturnDocument.AFTER
+        )
+        writers = fence.get("writers") or {}
+        if not _live(writers):
+            fields = await compute(fence)
+            now = datetime.now(timezone.utc).isoformat()
+            fields.update({"built_at": now, "updated_at": now})
+            update = {"$set": fields, "$inc": {"seq": 1}}
+            if writers:
+                update["$unset"] = {f"writers.{token}": "" for token in writers}
+            result = await collection.update_one({**query, "seq": fence["seq"]}, update)
+            if result.matched_count == 1:
+                return fields
+        await asyncio.sleep(REBUILD_RETRY_SECONDS * (attempt + 1))
+    raise FenceBusy(f"{label}: writes overlapped all {REBUILD_ATTEMPTS} rebuild attempts")
+
+
+async def mark_unbuilt(collection, query: dict):
+    """Have the next read rebuild the total (after source writes that bypassed the deltas)"""
+    await collection.update_one(query, {"$unset": {"built_at": ""}})
@@ -42,35 +42,45 @@ export const updateCompany = (data) => api.put('/company', data);
 export const getSubscription = () => api.get('/subscription');
 
 // Customers
-export const getCustomers = () => api.get('/customers');
+export const getCustomers = (params) => api.get('/customers', { params });
 export const getCustomer = (id) => api.get(`/customers/${id}`);
 export const createCustomer = (data) => api.post('/customers', data);
 export const updateCustomer = (id, data) => api.put(`/customers/${id}`, data);
 export const deleteCustomer = (id) => api.delete(`/customers/${id}`);
 
 // Vendors
-export const getVendors = () => api.get('/vendors');
+export const getVendors = (params) => api.get('/vendors', { params });
 export const getVendor = (id) => api.get(`/vendors/${id}`);
 export const createVendor = (data) => api.post('/vendors', data);
 export const updateVendor = (id, data) => api.put(`/vendors/${id}`, data);
 export const deleteVendor = (id) => api.delete(`/vendors/${id}`);
 
 // Invoices
-export const getInvoices = () => api.get('/invoices');
+export const getInvoices = (params) => api.get('/invoices', { params });
 export const getInvoice = (id) => api.get(`/invoices/${id}`);
 export const createInvoice = (data) => api.post('/invoices', data);
 export const updateInvoice = (id, data) => api.put(`/invoices/${id}`, data);
 export const updateInvoiceStatus = (id, status) => api.patch(`/invoices/${id}/status`, null, { params: { status } });
 export const deleteInvoice = (id) => api.delete(`/invoices/${id}`);
+export const importInvoices = (file) => {
+  const formData = new FormData();
+  formData.append('file', file);
+  return api.post('/invoices/import', formData, {
+    headers: {
+      'Content-Type': 'multipart/form-data',
+    },
+  });
+};
 
 // Payments
-export const getPayments = () => api.get('/payments');
+export const getPayments = (params) => api.get('/payments', { params });
 export const getPayment = (id) => api.get(`/payments/${id}`);
 export const createPayment = (data) => api.post('/payments', data);
 export const deletePayment = (id) => api.delete(`/payments/${id}`);
+export const reconcileReceipts = (data) => api.post('/reconciliation/receipts', data);
 
 // Bills
-export const getBills = () => api.get('/bills');
+export const getBills = (params) => api.get('/bills', { params });
 export const getBill = (id) => api.get(`/bills/${id}`);
 export const createBill = (data) => api.post('/bills', data);
 export const updateBill = (id, data) => api.put(`/bills/${id}`, data);